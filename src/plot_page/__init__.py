@@ -1,6 +1,22 @@
-from dash import Input, Output, State
+import uuid
+from typing import Callable
 
-from plot_page.control.data_operation.management_data import prepare_upload_data
+import dash
+from dash import ClientsideFunction, Input, Output, State, ctx, html
+
+from plot_page.control.data_operation.chunked_upload import UPLOAD_ID, received_bytes
+from plot_page.control.data_operation.management_data import (
+    IngestCancelled,
+    IngestProgress,
+    clear_ingest_cancel,
+    create_ingest_filter,
+    ingest_cancel_requested,
+    ingest_chunked_uploads,
+    ingest_upload_data,
+    request_ingest_cancel,
+    shutdown_upload_pool,
+)
+from plot_page.data.panda_data import flush_persistence, read_catalog
 from plot_page.view.components import page_layout  # noqa: F811
 from plot_page.view.components.app import app
 from plot_page.view.pages.data_analyse import data_analyse_layout
@@ -37,20 +53,123 @@ def display_page(pathname: str) -> list:
         return upload_layout()
 
 
+#####################################################################################################################################################
+app.clientside_callback(
+    ClientsideFunction(namespace="chunked_upload", function_name="select_files"),
+    Output("chunked-upload-progress", "value"),
+    Input("chunked-upload-button", "n_clicks"),
+    prevent_initial_call=True,
+)
+
+
 #####################################################################################################################################################
 @app.callback(
     Output("table_data", "data", allow_duplicate=True),
+    Output("upload-status", "children"),
+    Output("chunked-upload-progress", "label"),
     Input("upload-plot", "contents"),
+    Input("chunked-upload-finished", "data"),
     State("upload-plot", "filename"),
     State("table_data", "data"),
+    State("upload-append", "value"),
+    State("upload-include-columns", "value"),
+    State("upload-exclude-columns", "value"),
+    State("upload-row-filter", "value"),
+    background=True,
+    progress=[Output("ingest-progress", "value"), Output("ingest-progress", "label"), Output("ingest-job", "data")],
+    running=[(Output("ingest-cancel", "disabled"), False, True), (Output("ingest-progress", "animated"), True, False)],
     prevent_initial_call=True,
 )
-def upload_data(contents: str, filenames: str, table_data: None | dict[str, dict]):
-    """Upload files to webpage.
+def upload_data(
+    set_progress: Callable[[tuple[int, str, str]], None],
+    contents: list[str] | None,
+    chunked_uploads: list[dict[str, str]] | None,
+    filenames: list[str] | None,
+    table_data: None | dict[str, dict],
+    append: bool | None,
+    include_columns: str | None,
+    exclude_columns: str | None,
+    row_filter: str | None,
+):
+    """Store uploaded files in a background job, that reports the parsed bytes and written rows and can be cancelled.
+
+    A cancelled job stops after the chunk it is storing, so that every stored chunk is complete and the write-behind tables are written.
 
     Args:
-        contents (str): The uploaded file content.
-        filenames (str): Name of the uploaded file.
+        set_progress (Callable[[tuple[int, str, str]], None]): Sets the value and label of the progress bar and the id of the job.
+        contents (list[str] | None): The uploaded file contents.
+        chunked_uploads (list[dict[str, str]] | None): Id and filename of every file that has been uploaded in chunks.
+        filenames (list[str] | None): Names of the uploaded files.
         table_data (None | dict[str, dict]): The current stored data.
+        append (bool | None): Append the uploaded rows to existing tables.
+        include_columns (str | None): Comma separated columns that should be stored, all columns if empty.
+        exclude_columns (str | None): Comma separated columns that should not be stored.
+        row_filter (str | None): Query that the stored rows have to fulfill.
+
+    Returns:
+        tuple[dict[str, dict], list[html.P], str]: The updated stored data, the error messages of the files that could not be uploaded and the
+            label of the chunked upload progress bar.
+    """
+    chunked = ctx.triggered_id == "chunked-upload-finished"
+    if chunked:
+        if not chunked_uploads:
+            return dash.no_update, dash.no_update, dash.no_update
+        total_bytes = sum(received_bytes(val["upload_id"]) for val in chunked_uploads if UPLOAD_ID.fullmatch(val.get("upload_id", "")))
+    else:
+        if contents is None or filenames is None:
+            return dash.no_update, dash.no_update, dash.no_update
+        total_bytes = sum(len(val.partition(",")[2]) * 3 // 4 for val in contents)
+
+    job_id = uuid.uuid4().hex
+
+    def report(parsed_bytes: int, rows: int) -> None:
+        value = 100 * parsed_bytes // total_bytes if total_bytes else 100
+        set_progress((value, f"{parsed_bytes / 1024**2:.1f} MB parsed, {rows} rows written", job_id))
+
+    report(0, 0)
+    progress = IngestProgress(report, lambda: ingest_cancel_requested(job_id))
+    ingest_filter = create_ingest_filter(include_columns, exclude_columns, row_filter)
+    store_data = table_data or {}
+    errors = []
+    try:
+        if chunked:
+            store_data, failures = ingest_chunked_uploads(chunked_uploads, store_data, bool(append), progress, ingest_filter)
+        else:
+            store_data, failures = ingest_upload_data(contents, filenames, store_data, bool(append), progress=progress, ingest_filter=ingest_filter)
+        label = "Upload finished" if not failures else "Upload finished with errors"
+    except IngestCancelled as error:
+        failures = {}
+        store_data = {key: val["columns"] for key, val in read_catalog().items()}
+        errors.append(html.P(f"{error}, the chunks stored before are kept", style={"color": "red"}))
+        label = "Upload cancelled"
+    finally:
+        clear_ingest_cancel(job_id)
+        # The job process ends with the callback, so the datasets that are stored write-behind have to be written before and the worker
+        # processes of the upload pool have to be stopped.
+        flush_persistence()
+        shutdown_upload_pool()
+    errors += [html.P(f"{filename}: {error}", style={"color": "red"}) for filename, error in failures.items()]
+    return store_data, errors, label if chunked else dash.no_update
+
+
+#####################################################################################################################################################
+@app.callback(
+    Output("ingest-cancel", "disabled", allow_duplicate=True),
+    Input("ingest-cancel", "n_clicks"),
+    State("ingest-job", "data"),
+    prevent_initial_call=True,
+)
+def cancel_upload(n_clicks: int | None, job_id: str | None) -> bool:
+    """Ask the running ingest job to stop.
+
+    Args:
+        n_clicks (int | None): Cancel click event.
+        job_id (str | None): Id of the running ingest job.
+
+    Returns:
+        bool: Disable the cancel button until the job has stopped.
     """
-    return prepare_upload_data(contents, filenames, table_data)
+    if n_clicks is None or job_id is None:
+        return dash.no_update
+    request_ingest_cancel(job_id)
+    return True
@@ -0,0 +1,68 @@
+"""Command line tools for the data operations.
+
+Run with `python -m plot_page.control.data_operation <command>`.
+"""
+
+import argparse
+import time
+
+from plot_page.control.base_functions import read_json
+from plot_page.control.data_operation.file_readers import INGEST_CHUNK_ROWS
+from plot_page.control.data_operation.generate_test_dataset import DEFAULT_COLUMNS, generate_chunks, write_chunks
+from plot_page.control.data_operation.management_data import store_chunks
+from plot_page.control.data_operation.modify_data import benchmark_flatten
+from plot_page.data.panda_data import create_index, drop_index, flush_persistence, get_indexes
+
+
+#####################################################################################################################################################
+def main() -> None:
+    """Parse the command line arguments and run the selected command."""
+    parser = argparse.ArgumentParser(prog="python -m plot_page.control.data_operation", description="Tools for the data operations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    flatten_parser = commands.add_parser("benchmark-flatten", help="Compare the throughput of flattening the records of a json-file.")
+    flatten_parser.add_argument("json_file", help="Path to a json-file with the structure {'table_name': list[dict]}.")
+    flatten_parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the fastest run is used.")
+    generate_parser = commands.add_parser("generate", help="Generate a random dataset for load and performance tests.")
+    generate_parser.add_argument("rows", type=int, help="Number of rows.")
+    generate_parser.add_argument("name", help="Name of the dataset in the store and of the table in a json-file.")
+    generate_parser.add_argument("--output", help="Write a .csv- or .json-file instead of storing the dataset in the dataset store.")
+    generate_parser.add_argument("--columns", help="Path to a json-file with the description of every column, e.g. {'ps': {'type': 'int'}}.")
+    generate_parser.add_argument("--seed", type=int, help="Seed of the random generator.")
+    generate_parser.add_argument("--chunk-rows", type=int, default=INGEST_CHUNK_ROWS, help="Number of rows that are generated at once.")
+    index_parser = commands.add_parser("index", help="Create or remove the index of a column of a stored dataset.")
+    index_parser.add_argument("name", help="Name of the dataset.")
+    index_parser.add_argument("column", help="Name of the column.")
+    index_parser.add_argument("--kind", choices=["sorted", "bitmap"], help="Kind of the index, the kind that fits the column is used by default.")
+    index_parser.add_argument("--drop", action="store_true", help="Remove the index instead of creating it.")
+    arguments = parser.parse_args()
+
+    if arguments.command == "benchmark-flatten":
+        print(f"{'table':<20}{'records':>10}{'per record [1/s]':>20}{'by columns [1/s]':>20}{'speedup':>10}")
+        for key, val in read_json(arguments.json_file).items():
+            if not val or not isinstance(val, list) or not all(isinstance(record, dict) for record in val):
+                continue
+            res = benchmark_flatten(val, arguments.repeat)
+            speedup = res["flatten_records"] / res["flatten_dictionary"]
+            print(f"{key:<20}{len(val):>10}{res['flatten_dictionary']:>20.0f}{res['flatten_records']:>20.0f}{speedup:>10.2f}")
+
+    if arguments.command == "generate":
+        columns = read_json(arguments.columns) if arguments.columns else DEFAULT_COLUMNS
+        chunks = generate_chunks(arguments.rows, arguments.chunk_rows, arguments.seed, **columns)
+        start = time.perf_counter()
+        if arguments.output:
+            write_chunks(chunks, arguments.output, arguments.name)
+        else:
+            store_chunks(chunks, arguments.name)
+            flush_persistence()
+        print(f"{arguments.rows} rows generated in {time.perf_counter() - start:.1f} s")
+
+    if arguments.command == "index":
+        if arguments.drop:
+            drop_index(arguments.name, arguments.column)
+        else:
+            create_index(arguments.name, arguments.column, arguments.kind)
+        print(f"Indexes of {arguments.name}: {get_indexes(arguments.name) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
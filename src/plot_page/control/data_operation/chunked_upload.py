@@ -0,0 +1,175 @@
+"""Functions for files that are uploaded in chunks.
+
+The browser asks for a new upload with the size of the file and gets a random upload id, then it sends the raw bytes of the file in chunks
+together with their offset. The chunks are written into a temporary file, that is read by the ingest when the upload is finished. A dropped
+upload is resumed by asking for the number of received bytes and sending the remaining chunks. Uploads are limited to UPLOAD_MAX_BYTES.
+"""
+
+import os
+import re
+import secrets
+import threading
+import time
+
+from plot_page.data.panda_data import DATAFRAME_STORE
+
+UPLOAD_DIRECTORY = os.path.join(DATAFRAME_STORE, "_uploads.tmp")
+UPLOAD_MAX_AGE = 24 * 60 * 60
+UPLOAD_MAX_BYTES = 16 * 1024**3
+CHUNK_MAX_BYTES = 64 * 1024**2
+UPLOAD_ID = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+UPLOAD_LOCKS: dict[str, threading.Lock] = {}
+UPLOAD_LOCKS_LOCK = threading.Lock()
+
+
+#####################################################################################################################################################
+def _upload_lock(upload_id: str) -> threading.Lock:
+    """Get the lock that serializes writes to an upload.
+
+    Args:
+        upload_id (str): Id of the upload.
+
+    Returns:
+        threading.Lock: The lock of the upload.
+    """
+    with UPLOAD_LOCKS_LOCK:
+        return UPLOAD_LOCKS.setdefault(upload_id, threading.Lock())
+
+
+#####################################################################################################################################################
+def upload_path(upload_id: str) -> str:
+    """Get the path of the temporary file of an upload.
+
+    Args:
+        upload_id (str): Id of the upload, issued by create_upload.
+
+    Raises:
+        ValueError: The id contains other characters than letters, digits, "_" and "-".
+
+    Returns:
+        str: Path of the temporary file.
+    """
+    if not UPLOAD_ID.fullmatch(upload_id):
+        raise ValueError(f"Invalid upload id: {upload_id!r}")
+    return os.path.join(UPLOAD_DIRECTORY, f"{upload_id}.part")
+
+
+#####################################################################################################################################################
+def create_upload(size: int) -> str:
+    """Start a new upload with a random id.
+
+    Args:
+        size (int): Size of the file in bytes.
+
+    Raises:
+        ValueError: The size is negative or larger than UPLOAD_MAX_BYTES.
+
+    Returns:
+        str: The id of the upload.
+    """
+    if size < 0 or size > UPLOAD_MAX_BYTES:
+        raise ValueError(f"Invalid upload size {size}, at most {UPLOAD_MAX_BYTES} bytes can be uploaded")
+    os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+    remove_stale_uploads()
+    upload_id = secrets.token_urlsafe(24)
+    open(upload_path(upload_id), mode="wb").close()
+    return upload_id
+
+
+#####################################################################################################################################################
+def upload_exists(upload_id: str) -> bool:
+    """Check if an upload has been created and not been removed yet.
+
+    Args:
+        upload_id (str): Id of the upload.
+
+    Raises:
+        ValueError: The id contains other characters than letters, digits, "_" and "-".
+
+    Returns:
+        bool: True if the upload exists.
+    """
+    return os.path.exists(upload_path(upload_id))
+
+
+#####################################################################################################################################################
+def received_bytes(upload_id: str) -> int:
+    """Get the number of bytes of an upload that have already been received.
+
+    Args:
+        upload_id (str): Id of the upload.
+
+    Returns:
+        int: The number of received bytes, 0 for a new or unknown upload.
+    """
+    file_path = upload_path(upload_id)
+    return os.path.getsize(file_path) if os.path.exists(file_path) else 0
+
+
+#####################################################################################################################################################
+def write_chunk(upload_id: str, offset: int, chunk: bytes) -> int:
+    """Write a chunk of an upload.
+
+    A chunk with an offset smaller than the number of received bytes overwrites the received bytes from this offset, so that a chunk can be
+    sent again if its response got lost. A chunk after the received bytes is rejected.
+
+    Args:
+        upload_id (str): Id of the upload, the upload has to be created with create_upload.
+        offset (int): Position of the chunk in the file.
+        chunk (bytes): The content of the chunk.
+
+    Raises:
+        FileNotFoundError: The upload does not exist.
+        ValueError: The offset is negative or behind the received bytes or the upload would exceed UPLOAD_MAX_BYTES.
+
+    Returns:
+        int: The number of received bytes.
+    """
+    file_path = upload_path(upload_id)
+    with _upload_lock(upload_id):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Unknown upload {upload_id}")
+        size = received_bytes(upload_id)
+        if offset < 0 or offset > size:
+            raise ValueError(f"Invalid offset {offset} for upload {upload_id}, {size} bytes have been received")
+        if offset + len(chunk) > UPLOAD_MAX_BYTES:
+            raise ValueError(f"Upload {upload_id} exceeds the maximum size of {UPLOAD_MAX_BYTES} bytes")
+        with open(file_path, mode="r+b") as upload_file:
+            upload_file.truncate(offset)
+            upload_file.seek(offset)
+            upload_file.write(chunk)
+        return offset + len(chunk)
+
+
+#####################################################################################################################################################
+def remove_upload(upload_id: str) -> None:
+    """Remove the temporary file of an upload.
+
+    Args:
+        upload_id (str): Id of the upload.
+    """
+    file_path = upload_path(upload_id)
+    with _upload_lock(upload_id):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    with UPLOAD_LOCKS_LOCK:
+        UPLOAD_LOCKS.pop(upload_id, None)
+
+
+#####################################################################################################################################################
+def remove_stale_uploads(max_age: float = UPLOAD_MAX_AGE) -> None:
+    """Remove the temporary files of uploads that have not been continued for a while.
+
+    Args:
+        max_age (float): Maximum time in seconds since the last chunk of an upload.
+    """
+    if not os.path.isdir(UPLOAD_DIRECTORY):
+        return
+    for file_name in os.listdir(UPLOAD_DIRECTORY):
+        file_path = os.path.join(UPLOAD_DIRECTORY, file_name)
+        try:
+            if time.time() - os.path.getmtime(file_path) > max_age:
+                os.remove(file_path)
+        except OSError:
+            continue
@@ -0,0 +1,472 @@
+"""Compilation of the queries that select the rows of a table.
+
+The queries use the syntax of DataFrame.query: comparisons, "and", "or", "not", "in", arithmetic, backticks around column names that are no
+identifiers, the functions in QUERY_FUNCTIONS and the column methods in COLUMN_METHODS and COLUMN_ACCESSORS. Every query is parsed once into
+an expression tree on the columns. The trees of a query list are joined with "&" and compiled to a single code object, that computes the
+boolean mask of all queries in one vectorized pass without intermediate dataframes. Both steps are cached by the query strings.
+
+The selected rows of a query list are cached in SELECTION_CACHE by dataset version and set of queries. The queries are joined with "&", so
+the selection of every cached subset of a query list can be reused and only the remaining queries are evaluated on the selected rows.
+"""
+
+import ast
+import functools
+import re
+import threading
+from collections import OrderedDict
+from types import CodeType
+
+import numpy as np
+import pandas as pd
+
+QUERY_FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "floor": np.floor,
+    "ceil": np.ceil,
+}
+COLUMN_METHODS = {"isna", "notna", "isnull", "notnull", "between", "isin", "abs", "round"}
+COLUMN_ACCESSORS = {
+    "str": {"contains", "startswith", "endswith", "len", "lower", "upper", "strip", "match", "fullmatch"},
+    "dt": {"year", "month", "day", "hour", "minute", "second", "dayofweek", "dayofyear"},
+}
+BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.BitAnd, ast.BitOr, ast.BitXor)
+UNARY_OPERATORS = (ast.Invert, ast.USub, ast.UAdd)
+COMPARE_OPERATORS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+BACKTICK_NAME = re.compile(r"`([^`]*)`")
+COLUMNS_NAME = "__columns__"
+ISIN_NAME = "__isin__"
+BOOLEAN_NAME = "__boolean__"
+SELECTION_CACHE_MAX_BYTES = 256 * 1024**2
+
+
+#####################################################################################################################################################
+def _isin(values: pd.Series | np.ndarray, options: list | pd.Series | np.ndarray) -> pd.Series | np.ndarray:
+    """Check which values are one of the options, it is used for "in" and for "==" with a list.
+
+    Args:
+        values (pd.Series | np.ndarray): The values of a column.
+        options (list | pd.Series | np.ndarray): The allowed values.
+
+    Returns:
+        pd.Series | np.ndarray: True for every value that is one of the options.
+    """
+    options = list(options) if isinstance(options, (list, tuple, set)) else options
+    return values.isin(options) if isinstance(values, pd.Series) else np.isin(values, options)
+
+
+#####################################################################################################################################################
+def _widen(values: pd.Series) -> pd.Series:
+    """Widen a downcasted integer column to 64 bits, so that arithmetic in the queries can not overflow the compacted dtype.
+
+    Args:
+        values (pd.Series): The values of a column.
+
+    Returns:
+        pd.Series: The column with a 64 bit integer dtype or the unchanged column if it is no narrower integer column.
+    """
+    dtype = values.dtype
+    if dtype.kind not in "iu" or dtype.itemsize >= 8:
+        return values
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return values.astype("Int64" if dtype.kind == "i" else "UInt64")
+    return values.astype(np.int64 if dtype.kind == "i" else np.uint64)
+
+
+#####################################################################################################################################################
+def _boolean(values: pd.Series | np.ndarray | bool) -> pd.Series | np.ndarray | bool:
+    """Check that a query results in True or False for every row, it wraps every query of a compiled query list.
+
+    Args:
+        values (pd.Series | np.ndarray | bool): The result of the query.
+
+    Raises:
+        TypeError: The result is not boolean.
+
+    Returns:
+        pd.Series | np.ndarray | bool: The unchanged result.
+    """
+    if not pd.api.types.is_bool_dtype(values.dtype if isinstance(values, pd.Series) else np.asarray(values).dtype):
+        raise TypeError("the result is not True or False for every row")
+    return values
+
+
+class QueryTransformer(ast.NodeTransformer):
+    """Check a parsed query and convert it to an expression on the columns.
+
+    Column names are replaced by lookups in the columns of the table, boolean operators by their element wise counterparts and "in" by a
+    call of _isin. Nodes that are not part of the query syntax are rejected.
+    """
+
+    def __init__(self, query: str, names: dict[str, str]) -> None:
+        """Create the transformer for a query.
+
+        Args:
+            query (str): The query, it is used for the error messages.
+            names (dict[str, str]): Column names that have been written in backticks, by their placeholder in the parsed query.
+        """
+        self.query = query
+        self.names = names
+        self.columns: dict[str, None] = {}
+
+    ###############################################################################################################################################
+    def error(self, node: ast.AST, reason: str) -> ValueError:
+        """Create the error for an unsupported part of the query.
+
+        Args:
+            node (ast.AST): The unsupported node.
+            reason (str): Why the node is not supported.
+
+        Returns:
+            ValueError: The error that names the query.
+        """
+        return ValueError(f"Invalid query {self.query!r}: {reason} ({ast.unparse(node)!r})")
+
+    ###############################################################################################################################################
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        """Reject all nodes without own visit method.
+
+        Args:
+            node (ast.AST): The node.
+
+        Raises:
+            ValueError: The node is not supported.
+
+        Returns:
+            ast.AST: Lists, tuples, sets, constants and keyword arguments with converted children.
+        """
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set, ast.Constant, ast.keyword, ast.Load)):
+            return super().generic_visit(node)
+        raise self.error(node, f"{type(node).__name__} is not supported")
+
+    ###############################################################################################################################################
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        """Replace a column name by the lookup of the column.
+
+        Args:
+            node (ast.Name): The column name.
+
+        Returns:
+            ast.AST: The lookup of the column.
+        """
+        column = self.names.get(node.id, node.id)
+        self.columns[column] = None
+        return ast.Subscript(value=ast.Name(id=COLUMNS_NAME, ctx=ast.Load()), slice=ast.Constant(value=column), ctx=ast.Load())
+
+    ###############################################################################################################################################
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        """Replace "and" and "or" by "&" and "|".
+
+        Args:
+            node (ast.BoolOp): The boolean operation.
+
+        Returns:
+            ast.AST: The element wise operation.
+        """
+        operator = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        values = [self.visit(val) for val in node.values]
+        return functools.reduce(lambda left, right: ast.BinOp(left=left, op=operator, right=right), values)
+
+    ###############################################################################################################################################
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        """Check an arithmetic or bitwise operation.
+
+        Args:
+            node (ast.BinOp): The operation.
+
+        Raises:
+            ValueError: The operator is not supported.
+
+        Returns:
+            ast.AST: The operation on the converted operands.
+        """
+        if not isinstance(node.op, BINARY_OPERATORS):
+            raise self.error(node, f"the operator {type(node.op).__name__} is not supported")
+        return ast.BinOp(left=self.visit(node.left), op=node.op, right=self.visit(node.right))
+
+    ###############################################################################################################################################
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        """Replace "not" by "~".
+
+        Args:
+            node (ast.UnaryOp): The operation.
+
+        Raises:
+            ValueError: The operator is not supported.
+
+        Returns:
+            ast.AST: The operation on the converted operand.
+        """
+        operator = ast.Invert() if isinstance(node.op, ast.Not) else node.op
+        if not isinstance(operator, UNARY_OPERATORS):
+            raise self.error(node, f"the operator {type(node.op).__name__} is not supported")
+        return ast.UnaryOp(op=operator, operand=self.visit(node.operand))
+
+    ###############################################################################################################################################
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        """Split a chained comparison into comparisons joined with "&" and replace "in" and "==" with a list by a call of _isin.
+
+        Args:
+            node (ast.Compare): The comparison.
+
+        Raises:
+            ValueError: The operator is not supported.
+
+        Returns:
+            ast.AST: The element wise comparison.
+        """
+        operands = [self.visit(val) for val in [node.left] + node.comparators]
+        res = []
+        for left, operator, right, source in zip(operands[:-1], node.ops, operands[1:], node.comparators):
+            negated = isinstance(operator, (ast.NotIn, ast.NotEq))
+            if isinstance(operator, (ast.In, ast.NotIn)) or isinstance(operator, (ast.Eq, ast.NotEq)) and isinstance(source, (ast.List, ast.Tuple)):
+                compare = ast.Call(func=ast.Name(id=ISIN_NAME, ctx=ast.Load()), args=[left, right], keywords=[])
+                res.append(ast.UnaryOp(op=ast.Invert(), operand=compare) if negated else compare)
+            elif isinstance(operator, COMPARE_OPERATORS):
+                res.append(ast.Compare(left=left, ops=[operator], comparators=[right]))
+            else:
+                raise self.error(node, f"the operator {type(operator).__name__} is not supported")
+        return functools.reduce(lambda left, right: ast.BinOp(left=left, op=ast.BitAnd(), right=right), res)
+
+    ###############################################################################################################################################
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        """Check the access of a column method or of an accessor method like name.str.contains.
+
+        Args:
+            node (ast.Attribute): The attribute.
+
+        Raises:
+            ValueError: The attribute is not one of COLUMN_METHODS and COLUMN_ACCESSORS.
+
+        Returns:
+            ast.AST: The attribute of the converted column.
+        """
+        if isinstance(node.value, ast.Name) and (node.attr in COLUMN_METHODS or node.attr in COLUMN_ACCESSORS):
+            return ast.Attribute(value=self.visit(node.value), attr=node.attr, ctx=ast.Load())
+        if (
+            isinstance(node.value, ast.Attribute)
+            and isinstance(node.value.value, ast.Name)
+            and node.attr in COLUMN_ACCESSORS.get(node.value.attr, set())
+        ):
+            return ast.Attribute(value=self.visit(node.value), attr=node.attr, ctx=ast.Load())
+        raise self.error(node, f"the attribute {node.attr} is not supported")
+
+    ###############################################################################################################################################
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        """Check the call of a function of QUERY_FUNCTIONS or of a column method.
+
+        Args:
+            node (ast.Call): The call.
+
+        Raises:
+            ValueError: The function is not supported.
+
+        Returns:
+            ast.AST: The call with converted arguments.
+        """
+        if isinstance(node.func, ast.Name) and node.func.id in QUERY_FUNCTIONS:
+            func = ast.Name(id=node.func.id, ctx=ast.Load())
+        elif isinstance(node.func, ast.Attribute):
+            func = self.visit(node.func)
+        else:
+            raise self.error(node, "only the functions " + ", ".join(QUERY_FUNCTIONS) + " can be called")
+        return ast.Call(func=func, args=[self.visit(val) for val in node.args], keywords=[self.visit(val) for val in node.keywords])
+
+
+#####################################################################################################################################################
+@functools.lru_cache(maxsize=1024)
+def parse_query(query: str) -> tuple[ast.expr, tuple[str, ...]]:
+    """Parse a query into an expression on the columns.
+
+    Args:
+        query (str): The query in the syntax of DataFrame.query.
+
+    Raises:
+        ValueError: The query is no valid expression or contains unsupported parts.
+
+    Returns:
+        tuple[ast.expr, tuple[str, ...]]: The expression and the columns that are used by the query.
+    """
+    names = {}
+
+    def replace_name(match: re.Match) -> str:
+        names[f"__column_{len(names)}__"] = match.group(1)
+        return f"__column_{len(names) - 1}__"
+
+    try:
+        tree = ast.parse(BACKTICK_NAME.sub(replace_name, query).strip(), mode="eval")
+    except SyntaxError as error:
+        raise ValueError(f"Invalid query {query!r}: {error.msg}") from error
+    transformer = QueryTransformer(query, names)
+    return transformer.visit(tree.body), tuple(transformer.columns)
+
+
+class CompiledQueries:
+    """The queries of a query list compiled to a single expression, see compile_queries."""
+
+    def __init__(self, queries: tuple[str, ...], code: CodeType | None, columns: tuple[str, ...]) -> None:
+        """Create the compiled queries.
+
+        Args:
+            queries (tuple[str, ...]): The queries.
+            code (CodeType | None): The compiled expression, None if there are no queries.
+            columns (tuple[str, ...]): The columns that are used by the queries.
+        """
+        self.queries = queries
+        self.code = code
+        self.columns = columns
+
+    ###############################################################################################################################################
+    def evaluate(self, data: pd.DataFrame) -> np.ndarray:
+        """Compute the mask of the rows that fulfill all queries.
+
+        Integer columns are widened to 64 bits before they are used, because the stored columns are downcasted, see compact_dtypes.
+
+        Args:
+            data (pd.DataFrame): The table, it has to contain the columns that are used by the queries.
+
+        Raises:
+            ValueError: A column is missing or a query can not be applied on the table or does not result in True or False for every row.
+
+        Returns:
+            np.ndarray: True for every row that fulfills all queries.
+        """
+        if self.code is None:
+            return np.ones(len(data), dtype=bool)
+        missing = [val for val in self.columns if val not in data.columns]
+        if missing:
+            raise ValueError(f"Unknown columns {missing} in the queries {list(self.queries)}")
+        namespace = {"__builtins__": {}, COLUMNS_NAME: {val: _widen(data[val]) for val in self.columns}, ISIN_NAME: _isin, BOOLEAN_NAME: _boolean}
+        namespace |= QUERY_FUNCTIONS
+        try:
+            res = eval(self.code, namespace)
+        except Exception as error:
+            failed = self.queries[0] if len(self.queries) == 1 else next((val for val in self.queries if _fails(val, data)), self.queries[0])
+            raise ValueError(f"Query {failed!r} can not be applied: {error}") from error
+        res = res.to_numpy(dtype=bool, na_value=False) if isinstance(res, pd.Series) else np.asarray(res, dtype=bool)
+        return np.full(len(data), bool(res)) if res.ndim == 0 else res
+
+
+#####################################################################################################################################################
+def _fails(query: str, data: pd.DataFrame) -> bool:
+    """Check if a single query can not be applied on a table, it is used to name the failing query of a query list.
+
+    Args:
+        query (str): The query.
+        data (pd.DataFrame): The table.
+
+    Returns:
+        bool: True if the query raises an error.
+    """
+    try:
+        compile_queries((query,)).evaluate(data)
+    except ValueError:
+        return True
+    return False
+
+
+#####################################################################################################################################################
+@functools.lru_cache(maxsize=256)
+def compile_queries(queries: tuple[str, ...]) -> CompiledQueries:
+    """Join the parsed queries with "&" and compile them to a single expression.
+
+    Args:
+        queries (tuple[str, ...]): The queries, rows have to fulfill all queries.
+
+    Raises:
+        ValueError: A query is invalid.
+
+    Returns:
+        CompiledQueries: The compiled queries.
+    """
+    if not queries:
+        return CompiledQueries(queries, None, ())
+    parsed = [parse_query(val) for val in queries]
+    checked = [ast.Call(func=ast.Name(id=BOOLEAN_NAME, ctx=ast.Load()), args=[val[0]], keywords=[]) for val in parsed]
+    body = functools.reduce(lambda left, right: ast.BinOp(left=left, op=ast.BitAnd(), right=right), checked)
+    code = compile(ast.fix_missing_locations(ast.Expression(body=body)), "<query>", "eval")
+    return CompiledQueries(queries, code, tuple(dict.fromkeys(column for val in parsed for column in val[1])))
+
+
+class SelectionCache:
+    """LRU cache for the rows that fulfill a set of queries, limited by the memory usage of the cached row numbers.
+
+    Every entry belongs to a dataset version, entries of an older version are never found again and are evicted over time.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_bytes (int): The maximal number of bytes that can be cached.
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int, frozenset[str]], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    ###############################################################################################################################################
+    def get(self, name_dataset: str, version: int, queries: list[str]) -> tuple[frozenset[str], np.ndarray] | None:
+        """Get the cached selection of the queries or of the subset of the queries that selects the fewest rows.
+
+        Args:
+            name_dataset (str): Name of the dataset.
+            version (int): The current version of the dataset.
+            queries (list[str]): The queries.
+
+        Returns:
+            tuple[frozenset[str], np.ndarray] | None: The cached queries and the row numbers they select or None if no subset is cached.
+        """
+        queries = frozenset(queries)
+        with self._lock:
+            candidates = [key for key in self._entries if key[0] == name_dataset and key[1] == version and key[2] <= queries]
+            if not candidates:
+                self.misses += 1
+                return None
+            key = min(candidates, key=lambda val: (len(self._entries[val]), -len(val[2])))
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return key[2], self._entries[key]
+
+    ###############################################################################################################################################
+    def put(self, name_dataset: str, version: int, queries: list[str], rows: np.ndarray) -> None:
+        """Add the selection of queries and evict the least recently used selections if the budget is exceeded.
+
+        Args:
+            name_dataset (str): Name of the dataset.
+            version (int): The version of the dataset the rows belong to.
+            queries (list[str]): The queries.
+            rows (np.ndarray): The numbers of the rows that fulfill all queries.
+        """
+        key = (name_dataset, version, frozenset(queries))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.nbytes
+            if rows.nbytes > self.max_bytes:
+                return
+            self._entries[key] = rows
+            self.current_bytes += rows.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+
+    ###############################################################################################################################################
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+SELECTION_CACHE = SelectionCache(SELECTION_CACHE_MAX_BYTES)
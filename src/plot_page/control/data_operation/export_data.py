@@ -0,0 +1,201 @@
+"""Writers that stream a dataset with applied queries as csv- or parquet-file.
+
+The queries are evaluated on one stored chunk at a time, see iter_dataframe_chunks, and every chunk is written as soon as it is selected,
+so that the memory usage does not depend on the size of the dataset. Csv-files are written in batches of CSV_BATCH_ROWS rows of a chunk.
+Parquet files can only be written if pyarrow is installed.
+"""
+
+import io
+import itertools
+import logging
+from typing import Iterator
+
+import pandas as pd
+
+from plot_page.control.data_operation.compiled_query import compile_queries
+from plot_page.control.data_operation.extract_information import get_query_filters, resolve_view
+from plot_page.data.panda_data import get_dataframe_columns, iter_dataframe_chunks
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+CSV_BATCH_ROWS = 50_000
+logger = logging.getLogger(__name__)
+
+
+#####################################################################################################################################################
+class StreamBuffer(io.RawIOBase):
+    """File object that collects written bytes until they are taken, used as target of the csv and parquet writers."""
+
+    def __init__(self) -> None:
+        """Create an empty buffer."""
+        super().__init__()
+        self.blocks: list[bytes] = []
+        self.position = 0
+
+    ###############################################################################################################################################
+    def writable(self) -> bool:
+        """Check if the buffer can be written.
+
+        Returns:
+            bool: Always True.
+        """
+        return True
+
+    ###############################################################################################################################################
+    def write(self, data: bytes) -> int:
+        """Collect written bytes.
+
+        Args:
+            data (bytes): The written bytes.
+
+        Returns:
+            int: Number of written bytes.
+        """
+        self.blocks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    ###############################################################################################################################################
+    def tell(self) -> int:
+        """Get the number of bytes written so far.
+
+        Returns:
+            int: The position in the written file.
+        """
+        return self.position
+
+    ###############################################################################################################################################
+    def take(self) -> bytes:
+        """Take the bytes that have been written since the last call.
+
+        Returns:
+            bytes: The collected bytes.
+        """
+        res = b"".join(self.blocks)
+        self.blocks.clear()
+        return res
+
+
+#####################################################################################################################################################
+def select_chunks(selected_table: str, queries: list[str]) -> Iterator[pd.DataFrame]:
+    """Apply queries on a dataset chunk by chunk.
+
+    Views are resolved to the dataset they are defined on. The queries are checked before the first chunk is read.
+
+    Args:
+        selected_table (str): The name of the dataset or view.
+        queries (list[str]): The queries that should be applied on the dataset.
+
+    Raises:
+        ValueError: A query is invalid or uses columns that do not exist.
+
+    Returns:
+        Iterator[pd.DataFrame]: The rows of every chunk that fulfill all queries, at least one possibly empty chunk.
+    """
+    selected_table, queries = resolve_view(selected_table, queries)
+    compiled = compile_queries(tuple(queries))
+    available_columns = get_dataframe_columns(selected_table)
+    missing_columns = [val for val in compiled.columns if val not in available_columns]
+    if missing_columns:
+        raise ValueError(f"The columns {missing_columns} of the queries do not exist in {selected_table}")
+    chunks = iter_dataframe_chunks(selected_table, filters=get_query_filters(queries, available_columns))
+    return (chunk[compiled.evaluate(chunk)] for chunk in chunks) if queries else chunks
+
+
+#####################################################################################################################################################
+def _write_csv(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Write chunks as csv-file in batches of CSV_BATCH_ROWS rows.
+
+    Args:
+        chunks (Iterator[pd.DataFrame]): The chunks of the dataset.
+
+    Yields:
+        bytes: The header and the rows of every batch.
+    """
+    buffer = StreamBuffer()
+    text = io.TextIOWrapper(buffer, encoding="utf-8", newline="", write_through=True)
+    header = True
+    for chunk in chunks:
+        # An empty first chunk still writes the header.
+        for start in range(0, max(len(chunk), int(header)), CSV_BATCH_ROWS):
+            chunk.iloc[start : start + CSV_BATCH_ROWS].to_csv(text, index=False, header=header)
+            text.flush()
+            header = False
+            yield buffer.take()
+
+
+#####################################################################################################################################################
+def _write_parquet(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Write chunks as parquet-file with one row group per chunk.
+
+    Args:
+        chunks (Iterator[pd.DataFrame]): The chunks of the dataset, the schema is taken from the first chunk.
+
+    Yields:
+        bytes: The header and every row group, followed by the footer.
+    """
+    buffer = StreamBuffer()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, schema=None if writer is None else writer.schema, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(buffer, table.schema)
+        if len(table):
+            writer.write_table(table)
+        yield buffer.take()
+    writer.close()
+    yield buffer.take()
+
+
+#####################################################################################################################################################
+def _log_failure(blocks: Iterator[bytes], selected_table: str) -> Iterator[bytes]:
+    """Log an error that occurs while a file is streamed and raise it again, so that the response is aborted instead of being completed.
+
+    Args:
+        blocks (Iterator[bytes]): The content of the file block by block.
+        selected_table (str): The name of the exported dataset or view.
+
+    Yields:
+        bytes: The unchanged blocks.
+    """
+    sent_bytes = 0
+    try:
+        for block in blocks:
+            sent_bytes += len(block)
+            yield block
+    except Exception:
+        logger.exception("Export of %s failed after %d bytes, the response is aborted", selected_table, sent_bytes)
+        raise
+
+
+#####################################################################################################################################################
+def export_dataset(selected_table: str, queries: list[str], export_format: str) -> Iterator[bytes]:
+    """Stream a dataset with applied queries as file.
+
+    The first block is written before the function returns, so that a query that can not be applied fails before the response is started.
+    An error in a later block is logged and aborts the stream, see _log_failure.
+
+    Args:
+        selected_table (str): The name of the dataset or view.
+        queries (list[str]): The queries that should be applied on the dataset.
+        export_format (str): "csv" or "parquet".
+
+    Raises:
+        ValueError: The format is not supported, pyarrow is not installed for parquet-files or a query is invalid or can not be applied.
+
+    Returns:
+        Iterator[bytes]: The content of the file block by block.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {export_format}, use {' or '.join(EXPORT_FORMATS)}")
+    if export_format == "parquet" and pq is None:
+        raise ValueError("Parquet files can only be exported if pyarrow is installed")
+    chunks = select_chunks(selected_table, queries)
+    blocks = _write_csv(chunks) if export_format == "csv" else _write_parquet(chunks)
+    return _log_failure(itertools.chain([next(blocks)], blocks), selected_table)
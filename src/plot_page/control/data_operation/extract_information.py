@@ -1,7 +1,7 @@
 """Functions for operations on data."""
 
-import base64
-import json
+import ast
+import re
 
 import pandas as pd
 
@@ -19,29 +19,430 @@ from plot_page.control.data_analyse.notlinear_function import (
 )
 from scipy.optimize import curve_fit
 
+from plot_page.control.data_operation.compiled_query import SELECTION_CACHE, compile_queries
+
+from plot_page.data.panda_data import (
+    format_bytes,
+    get_column_summary,
+    get_dataframe_columns,
+    get_dataset_version,
+    get_dependent_views,
+    get_index_rows,
+    get_memory_budget,
+    get_memory_usage,
+    get_resident_memory,
+    get_view,
+    load_dataframe,
+    read_catalog,
+    store_dataframe,
+    store_view,
+)
+
+VIEW_ACCESS_COUNTS: dict[str, int] = {}
+SPARKLINE = "▁▂▃▄▅▆▇█"
+TABLE_FILTER_OPERATORS = {
+    "=": "==",
+    "eq": "==",
+    "!=": "!=",
+    "ne": "!=",
+    "<": "<",
+    "lt": "<",
+    "<=": "<=",
+    "le": "<=",
+    ">": ">",
+    "gt": ">",
+    ">=": ">=",
+    "ge": ">=",
+}
+TABLE_FILTER_WORDS = ["eq", "ne", "lt", "le", "gt", "ge", "contains", "datestartswith"]
+TABLE_FILTER_PATTERN = re.compile(
+    r"^\s*\{(?P<column>[^}]+)\}\s*(?P<operator>is\s+not\s+(?:blank|nil)|is\s+(?:blank|nil)|[si]?(?:eq|ne|lt|le|gt|ge|contains|datestartswith)\b"
+    r"|!=|<=|>=|=|<|>)\s*(?P<value>\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'|`(?:[^`\\]|\\.)*`|[^\s\"'`]*)\s*$"
+)
+
+
+#####################################################################################################################################################
+def get_query_columns(queries: list[str], available_columns: list[str]) -> list[str]:
+    """Get the columns that might be used by the queries.
+
+    Args:
+        queries (list[str]): The queries that should be applied on the dataframe.
+        available_columns (list[str]): All columns of the dataframe.
+
+    Returns:
+        list[str]: Columns whose name appears in at least one query.
+    """
+    return [column for column in available_columns if any(str(column) in query for query in queries)]
+
+
+#####################################################################################################################################################
+def _parse_filter_expression(node: ast.AST, available_columns: list[str]) -> list[tuple] | None:
+    """Convert a parsed query to filters of column, operator and value.
+
+    Args:
+        node (ast.AST): The parsed query expression.
+        available_columns (list[str]): All columns of the dataframe.
+
+    Returns:
+        list[tuple] | None: The filters or None if the expression is not a conjunction of simple comparisons.
+    """
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And) or isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+        parts = [
+            _parse_filter_expression(val, available_columns) for val in (node.values if isinstance(node, ast.BoolOp) else [node.left, node.right])
+        ]
+        return None if any(val is None for val in parts) else [filter_value for val in parts for filter_value in val]
+    if not isinstance(node, ast.Compare):
+        return None
+
+    operators = {ast.Eq: "==", ast.Gt: ">", ast.GtE: ">=", ast.Lt: "<", ast.LtE: "<=", ast.In: "in"}
+    swapped_operators = {"==": "==", ">": "<", ">=": "<=", "<": ">", "<=": ">="}
+    res = []
+    operands = [node.left] + node.comparators
+    for left, compare_operator, right in zip(operands[:-1], node.ops, operands[1:]):
+        operator = operators.get(type(compare_operator))
+        if operator is None:
+            return None
+        if isinstance(right, ast.Name) and operator in swapped_operators:
+            left, right, operator = right, left, swapped_operators[operator]
+        if not isinstance(left, ast.Name) or left.id not in available_columns:
+            return None
+        try:
+            value = ast.literal_eval(right)
+        except ValueError:
+            return None
+        if isinstance(value, (list, tuple, set)):
+            if operator not in ["==", "in"]:
+                return None
+            operator = "in"
+        elif operator == "in":
+            return None
+        res.append((left.id, operator, value))
+    return res
+
+
+#####################################################################################################################################################
+def get_query_filters(queries: list[str], available_columns: list[str]) -> list[tuple]:
+    """Extract simple range and equality filters from the queries, so that the storage can skip data that can not match.
 
-from plot_page.data.panda_data import load_dataframe
+    Only queries that consist completely of comparisons between a column and a constant are used.
+
+    Args:
+        queries (list[str]): The queries that should be applied on the dataframe.
+        available_columns (list[str]): All columns of the dataframe.
+
+    Returns:
+        list[tuple]: Filters as tuples of column, operator and value.
+    """
+    res = []
+    for query in queries:
+        try:
+            filters = _parse_filter_expression(ast.parse(query, mode="eval").body, available_columns)
+        except (SyntaxError, ValueError):
+            continue
+        res += filters or []
+    return res
 
 
 #####################################################################################################################################################
-def query_table(selected_table: str, queries: list[str]) -> pd.DataFrame:
+def query_table(selected_table: str, queries: list[str], columns: list[str] | None = None) -> pd.DataFrame:
     """Aplly query on the current data.
 
+    Views are resolved by applying their queries on the parent dataset, see resolve_view. The queries are compiled to one expression, see
+    compiled_query, and the rows that fulfill all queries are selected with a single mask. Simple filters on indexed columns select the
+    candidate rows with the column indexes before the mask is evaluated. The selected rows are cached, if a subset of the queries has been
+    applied before, only the other queries are evaluated on the rows it selected.
+
     Args:
         selected_table (str): The name of the selected dataframe.
         queries (list[str]): The query that should be applied on the dataframe.
+        columns (list[str] | None): The columns of the result. All columns are returned if None.
+
+    Raises:
+        ValueError: A query is invalid or can not be applied on the dataframe.
 
     Returns:
         pd.DataFrame: The resulting dataframe
     """
-    data_table = load_dataframe(selected_table)
-    for query in queries:
+    selected_table, queries = resolve_view(selected_table, queries)
+    compiled = compile_queries(tuple(queries))
+    available_columns = get_dataframe_columns(selected_table)
+    missing_columns = [val for val in compiled.columns if val not in available_columns]
+    if missing_columns:
+        raise ValueError(f"The columns {missing_columns} of the queries do not exist in {selected_table}")
+    if not queries:
+        return load_dataframe(selected_table, columns)
+    load_columns = None if columns is None else list(dict.fromkeys(columns + list(compiled.columns)))
+
+    version = get_dataset_version(selected_table)
+    cached = None if version is None else SELECTION_CACHE.get(selected_table, version, queries)
+    if cached is None:
+        filters = get_query_filters(queries, available_columns)
+        index_rows = get_index_rows(selected_table, filters, version)
+        if index_rows is None:
+            data_table = load_dataframe(selected_table, load_columns, filters)
+        else:
+            data_table = load_dataframe(selected_table, load_columns).iloc[index_rows]
+        data_table = data_table[compiled.evaluate(data_table)]
+        rows = data_table.index.to_numpy()
+    else:
+        rows = cached[1]
+        remaining = compile_queries(tuple(val for val in dict.fromkeys(queries) if val not in cached[0]))
+        data_table = load_dataframe(selected_table, load_columns).iloc[rows]
+        if remaining.queries:
+            mask = remaining.evaluate(data_table)
+            data_table = data_table[mask]
+            rows = rows[mask]
+    if version is not None and get_dataset_version(selected_table) == version:
+        SELECTION_CACHE.put(selected_table, version, queries, rows)
+    return data_table if columns is None else data_table[columns]
+
+
+#####################################################################################################################################################
+def resolve_view(selected_table: str, queries: list[str]) -> tuple[str, list[str]]:
+    """Resolve a view to the stored dataset it is defined on and the queries that select the view from it.
+
+    The view is stored as normal dataset once it has been accessed as often as its materialize policy allows. Views on the materialized view
+    stay valid, because the data does not change.
+
+    Args:
+        selected_table (str): The name of the view or dataset.
+        queries (list[str]): Additional queries that should be applied on the view.
+
+    Raises:
+        ValueError: The parent dataset has been changed or removed since the view was saved.
+
+    Returns:
+        tuple[str, list[str]]: The name of the stored dataset and the queries of the view followed by the additional queries.
+    """
+    view = get_view(selected_table)
+    if view is None:
+        return selected_table, queries
+    if read_catalog().get(view["parent"], {}).get("version") != view["version"]:
+        raise ValueError(f"The dataset {view['parent']} has been changed since the view {selected_table} was saved")
+
+    VIEW_ACCESS_COUNTS[selected_table] = VIEW_ACCESS_COUNTS.get(selected_table, 0) + 1
+    if view["materialize_after"] is not None and VIEW_ACCESS_COUNTS[selected_table] >= view["materialize_after"]:
+        materialize_view(selected_table, view)
+        return selected_table, queries
+    return resolve_view(view["parent"], view["queries"] + queries)
+
+
+#####################################################################################################################################################
+def _table_filter_value(text: str) -> str | int | float:
+    """Convert the value of a DataTable filter expression.
+
+    Args:
+        text (str): The value as typed into the filter, quoted or not.
+
+    Returns:
+        str | int | float: The value without quotes, unquoted numbers are converted.
+    """
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'`":
+        return text[1:-1].replace(f"\\{text[0]}", text[0])
+    for convert in (int, float):
         try:
-            tmp_result = data_table.query(query)
-            data_table = tmp_result
-        except Exception:
+            return convert(text)
+        except ValueError:
             pass
-    return data_table
+    return text
+
+
+#####################################################################################################################################################
+def translate_table_filter(filter_query: str | None) -> list[str]:
+    """Translate the filter expression of a DataTable with filter_action="custom" to queries.
+
+    The expression consists of one filter per column joined with "&&", e.g. "{km} > 1000 && {type} contains BMW". The operators of the
+    column filters are supported: comparisons, contains, datestartswith and is blank, also with the prefix "i" for case insensitive and "s"
+    for case sensitive comparisons.
+
+    Args:
+        filter_query (str | None): The filter expression of the DataTable.
+
+    Raises:
+        ValueError: The expression contains an unsupported operator, e.g. "||" of the advanced filter syntax.
+
+    Returns:
+        list[str]: One query per column filter.
+    """
+    res = []
+    for part in filter(str.strip, (filter_query or "").split(" && ")):
+        match = TABLE_FILTER_PATTERN.match(part)
+        if match is None:
+            raise ValueError(f"Unsupported table filter {part.strip()}")
+        name = f"`{match['column']}`"
+        operator = re.sub(r"\s+", " ", match["operator"])
+        value = _table_filter_value(match["value"])
+        insensitive = operator[0] == "i" and operator[1:] in TABLE_FILTER_WORDS
+        if operator[0] in "si" and operator[1:] in TABLE_FILTER_WORDS:
+            operator = operator[1:]
+        if operator.startswith("is "):
+            res.append(f"{name}.{'notna' if 'not' in operator else 'isna'}()")
+        elif operator == "contains":
+            res.append(f"{name}.str.contains({str(value)!r}, case={not insensitive}, regex=False, na=False)")
+        elif operator == "datestartswith":
+            parts = str(value).split("-")
+            if not 1 <= len(parts) <= 3 or not all(val.isdigit() for val in parts):
+                raise ValueError(f"Unsupported date {value} in table filter {part.strip()}, use YYYY, YYYY-MM or YYYY-MM-DD")
+            res.append(" and ".join(f"{name}.dt.{key} == {int(val)}" for key, val in zip(["year", "month", "day"], parts)))
+        elif insensitive and isinstance(value, str):
+            res.append(f"{name}.str.lower() {TABLE_FILTER_OPERATORS[operator]} {value.lower()!r}")
+        else:
+            res.append(f"{name} {TABLE_FILTER_OPERATORS[operator]} {value!r}")
+    return res
+
+
+#####################################################################################################################################################
+def query_page(
+    selected_table: str, queries: list[str], page_current: int, page_size: int, sort_by: list[dict] | None = None
+) -> tuple[pd.DataFrame, int]:
+    """Apply queries and sorting on a dataset and select one page of the result.
+
+    Only the columns of the queries and the sort columns are loaded for all selected rows, all columns are only read from the chunks that
+    contain the rows of the page.
+
+    Args:
+        selected_table (str): The name of the selected dataframe.
+        queries (list[str]): The queries that should be applied on the dataframe.
+        page_current (int): The number of the page, starting with 0.
+        page_size (int): Number of rows per page.
+        sort_by (list[dict] | None): The sort_by property of a DataTable, dicts with column_id and direction "asc" or "desc".
+
+    Raises:
+        ValueError: A query is invalid or can not be applied on the dataframe.
+
+    Returns:
+        tuple[pd.DataFrame, int]: The rows of the page and the number of rows that fulfill the queries.
+    """
+    selected_table, queries = resolve_view(selected_table, queries)
+    sort_by = sort_by or []
+    selected = query_table(selected_table, queries, list(dict.fromkeys(val["column_id"] for val in sort_by)))
+    if sort_by:
+        ascending = [val["direction"] == "asc" for val in sort_by]
+        selected = selected.sort_values([val["column_id"] for val in sort_by], ascending=ascending, kind="stable")
+    labels = selected.index[page_current * page_size : (page_current + 1) * page_size]
+    return load_dataframe(selected_table, rows=labels.to_numpy()), len(selected)
+
+
+#####################################################################################################################################################
+def materialize_view(selected_table: str, view: dict) -> None:
+    """Store a view as normal dataset.
+
+    Views on the materialized view are saved again on the stored dataset, they stay valid because the data does not change.
+
+    Args:
+        selected_table (str): The name of the view.
+        view (dict): The definition of the view.
+    """
+    views = get_dependent_views(selected_table)
+    store_dataframe(query_table(view["parent"], view["queries"]), selected_table)
+    VIEW_ACCESS_COUNTS.pop(selected_table, None)
+    catalog = read_catalog()
+    for key in views:
+        store_view(key, selected_table, catalog[key]["view"]["queries"], catalog[key]["view"]["materialize_after"])
+
+
+#####################################################################################################################################################
+def materialize_dependent_views(name_dataset: str) -> None:
+    """Materialize the views on a dataset before the dataset is replaced, changed or removed, so that the views keep their data.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+    """
+    for key in get_dependent_views(name_dataset):
+        materialize_view(key, get_view(key))
+
+
+#####################################################################################################################################################
+def _sparkline(counts: list[int]) -> str:
+    """Draw the counts of a histogram as a line of block characters.
+
+    Args:
+        counts (list[int]): The counts of the histogram bins.
+
+    Returns:
+        str: One character per bin, the height is relative to the largest bin.
+    """
+    maximum = max(counts, default=0) or 1
+    return "".join(SPARKLINE[round(val / maximum * (len(SPARKLINE) - 1))] for val in counts)
+
+
+#####################################################################################################################################################
+def get_summary_records(selected_table: str) -> list[dict]:
+    """Get the stored summary statistics of a dataset as rows of a table.
+
+    Args:
+        selected_table (str): Name of the dataset.
+
+    Returns:
+        list[dict]: One row per column with the statistics and the histogram or the most frequent values, empty for views.
+    """
+    res = []
+    for column, summary in get_column_summary(selected_table).items():
+        record = {"column": column} | {key: summary.get(key) for key in ["dtype", "count", "nulls", "distinct", "min", "max", "mean", "std"]}
+        for key in ["mean", "std"]:
+            record[key] = None if record[key] is None else round(record[key], 6)
+        if summary.get("histogram"):
+            record["distribution"] = _sparkline(summary["histogram"]["counts"])
+        else:
+            record["distribution"] = ", ".join(f"{key} ({val})" for key, val in summary.get("top", {}).items())
+        res.append(record)
+    return res
+
+
+#####################################################################################################################################################
+def get_memory_records() -> tuple[list[dict], str]:
+    """Get the memory usage of every dataset as rows of a table, the largest dataset first.
+
+    The memory usage is the size of a dataset when it is loaded completely, the resident memory is the part it currently holds in memory and
+    counts against the memory budget, see check_memory_budget.
+
+    Returns:
+        tuple[list[dict], str]: One row per dataset with its memory usage, resident memory and share of the memory budget and a line with the
+            total resident memory.
+    """
+    budget = get_memory_budget()
+    resident = get_resident_memory()
+    usage = sorted(get_memory_usage().items(), key=lambda val: val[1], reverse=True)
+    records = [
+        {
+            "dataset": key,
+            "memory": format_bytes(val),
+            "resident": format_bytes(resident.get(key, 0)),
+            "budget [%]": round(100 * resident.get(key, 0) / budget, 2),
+        }
+        for key, val in usage
+    ]
+    total = sum(resident.values())
+    return records, f"{format_bytes(total)} of {format_bytes(budget)} held in memory ({100 * total / budget:.1f} %)"
+
+
+#####################################################################################################################################################
+def get_table_columns(selected_table: str) -> list[dict]:
+    """Get the columns of a dataset for a DataTable.
+
+    The column type selects the default operator of the column filter: "=" for numeric columns, "datestartswith" for datetime columns and
+    "contains" for all other columns.
+
+    Args:
+        selected_table (str): Name of the dataset.
+
+    Returns:
+        list[dict]: Name, id and type of every column.
+    """
+    entry = read_catalog().get(selected_table, {})
+    res = []
+    for column, dtype in zip(entry.get("columns", []), entry.get("dtypes", [])):
+        try:
+            dtype = pd.api.types.pandas_dtype(dtype)
+        except TypeError:
+            dtype = None
+        column_type = "text"
+        if dtype is not None and pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            column_type = "numeric"
+        elif dtype is not None and pd.api.types.is_datetime64_any_dtype(dtype):
+            column_type = "datetime"
+        res.append({"name": column, "id": column, "type": column_type})
+    return res
 
 
 #####################################################################################################################################################
@@ -66,21 +467,6 @@ def get_intersections_dict(selected_tables: list[str], table_data: dict) -> list
     return list(set(possible_keys[0]).intersection(*possible_keys[1:]))
 
 
-#####################################################################################################################################################
-def prepare_json(contents: str) -> dict[str, list[dict]]:
-    """Prepare uploaded json-file.
-
-    Args:
-        contents (str): The file content as str.
-
-    Returns:
-        dict[str, list[dict]]: File content that has been converted to the table structure.
-    """
-    _, content_string = contents.split(",")
-    decoded = base64.b64decode(content_string)
-    return {key: val for key, val in json.loads(decoded).items() if val and isinstance(val, list) and isinstance(val[0], dict)}
-
-
 #####################################################################################################################################################
 def calculate_correlation(selected_data: pd.DataFrame, main_attribute: str, second_attributes: list[str]) -> dict[str, float]:
     """Calculate the correlation factor.
@@ -0,0 +1,228 @@
+"""Readers for the supported upload formats.
+
+Every reader yields the tables of a file as name and iterator of dataframe chunks with at most INGEST_CHUNK_ROWS rows, so that files larger
+than the memory can be stored chunk by chunk. CSV, NDJSON and Parquet files contain a single table, that is named after the file. Parquet
+files can only be read if pyarrow is installed.
+
+An IngestFilter is applied while a file is read: CSV and Parquet readers skip the unused columns in the file, the rows are filtered chunk by
+chunk and chunks without selected rows are skipped.
+"""
+
+import base64
+import contextlib
+import itertools
+import json
+import os
+import tempfile
+from typing import BinaryIO, Callable, Iterator
+
+import pandas as pd
+
+from plot_page.control.data_operation.json_stream import BASE64_BLOCK_SIZE, read_json_tables, records_to_dataframe
+from plot_page.control.data_operation.modify_data import IngestFilter
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+INGEST_CHUNK_ROWS = 500_000
+SPOOL_MAX_BYTES = 64 * 1024**2
+
+
+#####################################################################################################################################################
+def open_upload(contents: str) -> BinaryIO:
+    """Decode an uploaded base64 data url block by block into a temporary file.
+
+    The file is kept in memory up to SPOOL_MAX_BYTES and moved to the disk for larger uploads.
+
+    Args:
+        contents (str): The uploaded file content as base64 data url.
+
+    Returns:
+        BinaryIO: The decoded file, positioned at the start.
+    """
+    _, _, content_string = contents.partition(",")
+    upload_file = tempfile.SpooledTemporaryFile(SPOOL_MAX_BYTES)
+    block_size = BASE64_BLOCK_SIZE - BASE64_BLOCK_SIZE % 4
+    for start in range(0, len(content_string), block_size):
+        upload_file.write(base64.b64decode(content_string[start : start + block_size]))
+    upload_file.seek(0)
+    return upload_file
+
+
+#####################################################################################################################################################
+def _open_source(source: BinaryIO | str) -> contextlib.AbstractContextManager[BinaryIO]:
+    """Open a file path, an opened file is used as it is and not closed.
+
+    Args:
+        source (BinaryIO | str): The opened file or its path.
+
+    Returns:
+        contextlib.AbstractContextManager[BinaryIO]: Context manager that provides the opened file.
+    """
+    return open(source, mode="rb") if isinstance(source, str) else contextlib.nullcontext(source)
+
+
+#####################################################################################################################################################
+def _filter_chunks(chunks: Iterator[pd.DataFrame], ingest_filter: IngestFilter | None) -> Iterator[pd.DataFrame]:
+    """Apply an ingest filter on every chunk and skip the chunks without selected rows.
+
+    Args:
+        chunks (Iterator[pd.DataFrame]): The chunks.
+        ingest_filter (IngestFilter | None): The filter, the chunks are not changed if None.
+
+    Yields:
+        pd.DataFrame: The filtered chunks.
+    """
+    if not ingest_filter:
+        yield from chunks
+        return
+    for chunk in chunks:
+        chunk = ingest_filter.filter_dataframe(chunk)
+        if len(chunk):
+            yield chunk
+
+
+#####################################################################################################################################################
+def read_csv_chunks(source: BinaryIO | str, chunk_rows: int = INGEST_CHUNK_ROWS, ingest_filter: IngestFilter | None = None) -> Iterator[pd.DataFrame]:
+    """Read a csv-file in chunks.
+
+    Args:
+        source (BinaryIO | str): The opened file or its path.
+        chunk_rows (int): Maximum number of rows of a chunk.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are read.
+
+    Yields:
+        pd.DataFrame: The chunks.
+    """
+    usecols = ingest_filter.reads_column if ingest_filter else None
+    with pd.read_csv(source, chunksize=chunk_rows, usecols=usecols) as reader:
+        yield from _filter_chunks(reader, ingest_filter)
+
+
+#####################################################################################################################################################
+def read_ndjson_chunks(
+    source: BinaryIO | str, chunk_rows: int = INGEST_CHUNK_ROWS, ingest_filter: IngestFilter | None = None
+) -> Iterator[pd.DataFrame]:
+    """Read a file with one json object per line in chunks, nested objects are flattened.
+
+    Args:
+        source (BinaryIO | str): The opened file or its path.
+        chunk_rows (int): Maximum number of rows of a chunk.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are read, chunks without selected rows are skipped.
+
+    Raises:
+        ValueError: A line is not a json object.
+
+    Yields:
+        pd.DataFrame: The chunks.
+    """
+    with _open_source(source) as ndjson_file:
+        lines = (line for line in ndjson_file if line.strip())
+        for number, batch in enumerate(iter(lambda: list(itertools.islice(lines, chunk_rows)), [])):
+            records = [json.loads(line) for line in batch]
+            if not all(isinstance(record, dict) for record in records):
+                raise ValueError(f"Invalid ndjson: every line has to be a json object, chunk {number} contains other values")
+            chunk = records_to_dataframe(records, ingest_filter)
+            if len(chunk):
+                yield chunk
+
+
+#####################################################################################################################################################
+def read_parquet_chunks(
+    source: BinaryIO | str, chunk_rows: int = INGEST_CHUNK_ROWS, ingest_filter: IngestFilter | None = None
+) -> Iterator[pd.DataFrame]:
+    """Read a parquet-file in batches of rows.
+
+    Args:
+        source (BinaryIO | str): The opened file or its path.
+        chunk_rows (int): Maximum number of rows of a chunk.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are read.
+
+    Raises:
+        ValueError: pyarrow is not installed.
+
+    Yields:
+        pd.DataFrame: The chunks.
+    """
+    if pq is None:
+        raise ValueError("Parquet files can only be uploaded if pyarrow is installed")
+    parquet_file = pq.ParquetFile(source)
+    columns = [val for val in parquet_file.schema_arrow.names if ingest_filter.reads_column(val)] if ingest_filter else None
+    yield from _filter_chunks((batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns)), ingest_filter)
+
+
+#####################################################################################################################################################
+def read_json_chunks(source: BinaryIO | str, ingest_filter: IngestFilter | None = None) -> Iterator[tuple[str, Iterator[pd.DataFrame]]]:
+    """Read the tables of a json-file with the structure {'table_name': list[dict]}, every table is a single chunk.
+
+    Args:
+        source (BinaryIO | str): The opened file or its path.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are read.
+
+    Yields:
+        tuple[str, Iterator[pd.DataFrame]]: Name and chunks of every table.
+    """
+    with _open_source(source) as json_file:
+        for key, val in read_json_tables(json_file, ingest_filter):
+            yield key, iter([val])
+
+
+TABLE_READERS: dict[str, Callable[[BinaryIO | str, int, IngestFilter | None], Iterator[pd.DataFrame]]] = {
+    ".csv": read_csv_chunks,
+    ".ndjson": read_ndjson_chunks,
+    ".jsonl": read_ndjson_chunks,
+    ".parquet": read_parquet_chunks,
+}
+
+
+#####################################################################################################################################################
+def supported_extensions() -> list[str]:
+    """List the file extensions that can be uploaded.
+
+    Returns:
+        list[str]: The file extensions.
+    """
+    return [".json"] + list(TABLE_READERS)
+
+
+#####################################################################################################################################################
+def check_file_type(filename: str) -> None:
+    """Check that a file can be read before its content is decoded.
+
+    Args:
+        filename (str): Name of the file.
+
+    Raises:
+        ValueError: The file type is not supported.
+    """
+    if os.path.splitext(filename)[1].lower() not in supported_extensions():
+        raise ValueError(f"Unsupported file type: {filename}, supported are {', '.join(supported_extensions())}")
+
+
+#####################################################################################################################################################
+def read_tables(
+    filename: str, source: BinaryIO | str, chunk_rows: int = INGEST_CHUNK_ROWS, ingest_filter: IngestFilter | None = None
+) -> Iterator[tuple[str, Iterator[pd.DataFrame]]]:
+    """Read the tables of a file with the reader for its extension.
+
+    Args:
+        filename (str): Name of the file, the extension selects the reader and single table files use the name without extension.
+        source (BinaryIO | str): The opened file or its path.
+        chunk_rows (int): Maximum number of rows of a chunk.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are read.
+
+    Raises:
+        ValueError: The file type is not supported.
+
+    Yields:
+        tuple[str, Iterator[pd.DataFrame]]: Name and chunks of every table.
+    """
+    check_file_type(filename)
+    name, extension = os.path.splitext(os.path.basename(filename))
+    extension = extension.lower()
+    if extension == ".json":
+        yield from read_json_chunks(source, ingest_filter)
+    else:
+        yield name, TABLE_READERS[extension](source, chunk_rows, ingest_filter)
@@ -1,52 +1,115 @@
-"""File to generate an example dataset."""
+"""File to generate example datasets.
 
-import os
-import random
+Every column is described by a dict: {"type": "float"} samples uniform floats between "start" (default 0) and "end" (default 1),
+{"type": "int"} samples integers between "start" and "end" including both ends and {"options": [...]} picks one of the options. The columns are
+sampled vectorized in chunks with numpy, so that datasets with tens of millions of rows can be written into the dataset store or into a file
+without holding them in memory. Run `python -m plot_page.control.data_operation generate --help` for the command line tool.
+"""
 
-from plot_page.control.base_functions import write_json
+import json
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from plot_page.control.data_operation.file_readers import INGEST_CHUNK_ROWS
+
+DEFAULT_COLUMNS = {
+    "type": {"options": ["BMW", "VW", "Audi"]},
+    "iteration": {"type": "int", "start": 0, "end": 30},
+    "ps": {"type": "int", "start": 50, "end": 150},
+    "km": {"type": "float", "start": 0, "end": 200000},
+    "backlights": {"type": "int"},
+    "wheels": {"type": "int"},
+}
 
 
 #####################################################################################################################################################
-def generate_data(id: int, **kwargs) -> dict:
-    """Generate a random dict.
+def generate_dataframe(number_elements: int, rng: np.random.Generator, start_id: int = 0, **kwargs) -> pd.DataFrame:
+    """Generate a random dataframe, every column is sampled at once.
 
     Args:
-        id (int): Id of the datapoint.
+        number_elements (int): Number of rows that should be created.
+        rng (np.random.Generator): The random generator that is used for all columns.
+        start_id (int): Id of the first row.
+        kwargs: The description of every column, columns without "type" or "options" are skipped.
 
     Returns:
-        dict: The created random dictionary.
+        pd.DataFrame: The created random dataframe with the column "id" and the described columns.
     """
-    result = {"id": id}
+    result = {"id": np.arange(start_id, start_id + number_elements, dtype=np.int64)}
     for key, value in kwargs.items():
-        if value.get("type", None) == "float":
-            result[key] = random.uniform(value.get("start", 0), value.get("end", 1))
-        if value.get("type", None) == "int":
-            result[key] = random.randint(value.get("start", 0), value.get("end", 1))
         if "options" in value:
-            result[key] = random.choice(value["options"])
-    return result
+            result[key] = np.asarray(value["options"], dtype=object)[rng.integers(0, len(value["options"]), number_elements)]
+        elif value.get("type", None) == "float":
+            result[key] = rng.uniform(value.get("start", 0), value.get("end", 1), number_elements)
+        elif value.get("type", None) == "int":
+            result[key] = rng.integers(value.get("start", 0), value.get("end", 1), number_elements, endpoint=True)
+    return pd.DataFrame(result)
+
+
+#####################################################################################################################################################
+def generate_chunks(number_elements: int, chunk_rows: int = INGEST_CHUNK_ROWS, seed: int | None = None, **kwargs) -> Iterator[pd.DataFrame]:
+    """Generate a random dataset in chunks.
+
+    The same seed and chunk size always create the same dataset.
+
+    Args:
+        number_elements (int): Number of rows that should be created.
+        chunk_rows (int): Maximum number of rows of a chunk.
+        seed (int | None): Seed of the random generator, a random seed is used if None.
+        kwargs: The description of every column.
+
+    Yields:
+        pd.DataFrame: The chunks of the dataset with ascending ids.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, number_elements, chunk_rows):
+        yield generate_dataframe(min(chunk_rows, number_elements - start), rng, start, **kwargs)
 
 
 #####################################################################################################################################################
-def generate_testdata(number_elements: int, **kwargs) -> list[dict]:
+def generate_testdata(number_elements: int, seed: int | None = None, **kwargs) -> list[dict]:
     """Function to generate a list of random data.
 
     Args:
         number_elements (int): Number of elements that should be created.
+        seed (int | None): Seed of the random generator, a random seed is used if None.
+        kwargs: The description of every column.
 
     Returns:
         list[dict]: The created random dataset.
     """
-    return [generate_data(i, **kwargs) for i in range(number_elements)]
-
-
-test = generate_testdata(
-    4000,
-    type={"options": ["BMW", "VW", "Audi"]},
-    iteration={"type": "int", "start": 0, "end": 30},
-    ps={"type": "int", "start": 50, "end": 150},
-    km={"type": "float", "start": 0, "end": 200000},
-    backlights={"type": "int"},
-    wheels={"type": "int"},
-)
-write_json(os.path.join(".", "test2.json"), {"input2": test})
+    return generate_dataframe(number_elements, np.random.default_rng(seed), **kwargs).to_dict("records")
+
+
+#####################################################################################################################################################
+def write_chunks(chunks: Iterator[pd.DataFrame], file_path: str, table_name: str) -> int:
+    """Write the chunks of a dataset into a csv-file or a json-file with the structure {'table_name': list[dict]}.
+
+    Args:
+        chunks (Iterator[pd.DataFrame]): The chunks of the dataset.
+        file_path (str): Path of the file, the format is selected by the extension ".csv" or ".json".
+        table_name (str): Name of the table in a json-file.
+
+    Raises:
+        ValueError: The file has another extension.
+
+    Returns:
+        int: The number of written rows.
+    """
+    if not file_path.endswith((".csv", ".json")):
+        raise ValueError(f"Unsupported file type of {file_path}, use .csv or .json")
+    rows = 0
+    with open(file_path, mode="w", encoding="utf-8", newline="") as output_file:
+        if file_path.endswith(".json"):
+            output_file.write(f"{{{json.dumps(table_name)}: [")
+        for chunk in chunks:
+            if file_path.endswith(".csv"):
+                chunk.to_csv(output_file, header=rows == 0, index=False)
+            elif len(chunk):
+                output_file.write(("," if rows else "") + chunk.to_json(orient="records", double_precision=15)[1:-1])
+            rows += len(chunk)
+        if file_path.endswith(".json"):
+            output_file.write("]}")
+    return rows
@@ -0,0 +1,399 @@
+"""Functions for reading uploaded json-files as a stream.
+
+The uploaded content is base64 decoded or read from a file in blocks and the structure {'table_name': list[dict]} is parsed record by
+record. The values of the records are appended to column buffers, numeric columns are kept in typed arrays, so that no list of dictionaries
+of the whole table is created.
+"""
+
+import base64
+import codecs
+import json
+import math
+import re
+from array import array
+from typing import Any, BinaryIO, Iterator
+
+import numpy as np
+import pandas as pd
+
+from plot_page.control.data_operation.modify_data import IngestFilter, flatten_records
+
+BASE64_BLOCK_SIZE = 4 * 1024 * 1024
+RECORD_BATCH_SIZE = 65536
+JSON_DECODER = json.JSONDecoder()
+ITEM_END = re.compile(r"\s*([,\]])\s*")
+
+
+class ColumnBuffer:
+    """Growing buffer for the values of a single column.
+
+    Integers and floats are stored in typed arrays, the buffer switches to floats for missing values in integer columns and to a list of
+    python objects for all other values.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty buffer."""
+        self.values: array | list | None = None
+        self.missing = 0
+
+    ###############################################################################################################################################
+    def __len__(self) -> int:
+        """Get the number of values in the buffer.
+
+        Returns:
+            int: Number of values.
+        """
+        return self.missing if self.values is None else len(self.values)
+
+    ###############################################################################################################################################
+    def pad(self, rows: int) -> None:
+        """Fill the buffer with missing values up to a number of rows.
+
+        Args:
+            rows (int): The number of rows the buffer should have.
+        """
+        missing = rows - len(self)
+        if missing <= 0:
+            return
+        if self.values is None:
+            self.missing += missing
+        elif isinstance(self.values, list):
+            self.values.extend([None] * missing)
+        else:
+            self._convert("d")
+            self.values.extend(array("d", [math.nan]) * missing)
+
+    ###############################################################################################################################################
+    def extend(self, values: list) -> None:
+        """Append values to the buffer.
+
+        Args:
+            values (list): The new values, None is a missing value.
+        """
+        types = set(map(type, values))
+        if self.values is None and types <= {type(None)}:
+            self.missing += len(values)
+            return
+        new_values = None
+        try:
+            if types <= {int}:
+                new_values = array("q", values)
+            elif types <= {int, float, type(None)}:
+                array("q", [val for val in values if type(val) is int])
+                new_values = array("d", [math.nan if val is None else val for val in values])
+        except OverflowError:
+            new_values = None
+
+        if self.values is None:
+            if new_values is None:
+                self.values = [None] * self.missing
+            else:
+                self.values = array("q") if new_values.typecode == "q" and not self.missing else array("d", [math.nan]) * self.missing
+        if new_values is None or isinstance(self.values, list):
+            self._convert(None)
+            self.values.extend(values)
+            return
+        if self.values.typecode != new_values.typecode:
+            self._convert("d")
+            new_values = array("d", new_values)
+        self.values.extend(new_values)
+
+    ###############################################################################################################################################
+    def to_series(self) -> pd.Series:
+        """Convert the buffer to a series.
+
+        Returns:
+            pd.Series: The values of the buffer.
+        """
+        if isinstance(self.values, array):
+            return pd.Series(np.frombuffer(self.values, dtype=np.int64 if self.values.typecode == "q" else np.float64), copy=False)
+        if self.values is None:
+            return pd.Series(np.full(self.missing, np.nan))
+        return pd.Series([np.nan if val is None else val for val in self.values])
+
+    ###############################################################################################################################################
+    def _convert(self, typecode: str | None) -> None:
+        """Convert the stored values to floats or python objects.
+
+        Args:
+            typecode (str | None): "d" for floats, None for python objects.
+        """
+        if isinstance(self.values, list):
+            return
+        if typecode is None:
+            self.values = self.values.tolist()
+        elif self.values.typecode != typecode:
+            self.values = array(typecode, self.values)
+
+
+#####################################################################################################################################################
+def decode_base64_blocks(content_string: str) -> Iterator[str]:
+    """Decode base64 content block by block.
+
+    Args:
+        content_string (str): The base64 encoded content.
+
+    Yields:
+        str: The decoded text.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    block_size = BASE64_BLOCK_SIZE - BASE64_BLOCK_SIZE % 4
+    for start in range(0, len(content_string), block_size):
+        yield decoder.decode(base64.b64decode(content_string[start : start + block_size]))
+    yield decoder.decode(b"", final=True)
+
+
+#####################################################################################################################################################
+def read_text_blocks(source: BinaryIO) -> Iterator[str]:
+    """Read utf-8 text from a binary file block by block.
+
+    Args:
+        source (BinaryIO): The file.
+
+    Yields:
+        str: The decoded text.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while block := source.read(BASE64_BLOCK_SIZE):
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+class JsonStream:
+    """Reader for json values from a stream of text blocks."""
+
+    def __init__(self, blocks: Iterator[str]) -> None:
+        """Create the reader.
+
+        Args:
+            blocks (Iterator[str]): The text blocks.
+        """
+        self.blocks = blocks
+        self.buffer = ""
+        self.position = 0
+        self.finished = False
+
+    ###############################################################################################################################################
+    def peek(self) -> str:
+        """Skip whitespace and get the next character.
+
+        Returns:
+            str: The next character or an empty string at the end of the stream.
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer) or not self._read():
+                return self.buffer[self.position : self.position + 1]
+
+    ###############################################################################################################################################
+    def expect(self, characters: str) -> str:
+        """Consume the next character.
+
+        Args:
+            characters (str): The allowed characters.
+
+        Raises:
+            ValueError: The next character is not allowed.
+
+        Returns:
+            str: The consumed character.
+        """
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Invalid json: expected one of {characters!r} at position {self.position}, found {character!r}")
+        self.position += 1
+        return character
+
+    ###############################################################################################################################################
+    def value(self) -> Any:
+        """Decode the next json value.
+
+        A value that ends at the end of the buffer is only accepted at the end of the stream, because a number could continue in the next
+        block.
+
+        Raises:
+            ValueError: The stream does not contain a valid json value.
+
+        Returns:
+            Any: The decoded value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = JSON_DECODER.raw_decode(self.buffer, self.position)
+                if end < len(self.buffer) or self.finished:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError as error:
+                if self.finished:
+                    raise ValueError(f"Invalid json: {error}") from error
+            self._read()
+
+    ###############################################################################################################################################
+    def items(self) -> Iterator[Any]:
+        """Decode the values of a list one by one, the stream has to be positioned after the opening bracket of the list.
+
+        Yields:
+            Any: The decoded values.
+        """
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            try:
+                value, end = JSON_DECODER.raw_decode(self.buffer, self.position)
+                match = ITEM_END.match(self.buffer, end)
+            except json.JSONDecodeError:
+                match = None
+            if match is None:
+                value = self.value()
+                separator = self.expect(",]")
+            else:
+                self.position = match.end()
+                separator = match.group(1)
+            yield value
+            if separator == "]":
+                return
+
+    ###############################################################################################################################################
+    def _read(self) -> bool:
+        """Read the next block and drop the consumed text.
+
+        Returns:
+            bool: False if the stream is finished.
+        """
+        for block in self.blocks:
+            self.buffer = self.buffer[self.position :] + block
+            self.position = 0
+            return True
+        self.finished = True
+        return False
+
+
+#####################################################################################################################################################
+def _add_records(buffers: dict[str, ColumnBuffer], records: list[dict], rows: int, ingest_filter: IngestFilter | None = None) -> int:
+    """Flatten a batch of records and append it to the column buffers.
+
+    Args:
+        buffers (dict[str, ColumnBuffer]): The column buffers, new columns are added.
+        records (list[dict]): The records.
+        rows (int): Number of rows before the batch.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are added to the buffers.
+
+    Returns:
+        int: Number of added rows.
+    """
+    columns = flatten_records(records)
+    added_rows = len(records)
+    if ingest_filter:
+        columns, added_rows = ingest_filter.filter_columns(columns, added_rows, list(buffers))
+    for key, values in columns.items():
+        if key not in buffers:
+            buffers[key] = ColumnBuffer()
+        buffers[key].pad(rows)
+        buffers[key].extend(values)
+    return added_rows
+
+
+#####################################################################################################################################################
+def _read_table(stream: JsonStream, ingest_filter: IngestFilter | None = None) -> pd.DataFrame | None:
+    """Read a list of records into column buffers.
+
+    The records are flattened by columns and added to the buffers in batches of RECORD_BATCH_SIZE records.
+
+    Args:
+        stream (JsonStream): The stream, positioned after the opening bracket of the list.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are read.
+
+    Returns:
+        pd.DataFrame | None: The table or None if the list is empty or does not start with a dictionary.
+    """
+    buffers: dict[str, ColumnBuffer] = {}
+    rows = 0
+    records = []
+    items = stream.items()
+    for record in items:
+        if not isinstance(record, dict):
+            if rows == 0 and not records:
+                for _ in items:
+                    pass
+                return None
+            continue
+        records.append(record)
+        if len(records) == RECORD_BATCH_SIZE:
+            rows += _add_records(buffers, records, rows, ingest_filter)
+            records = []
+    rows += _add_records(buffers, records, rows, ingest_filter)
+    if rows == 0:
+        return None
+
+    return _to_dataframe(buffers, rows)
+
+
+#####################################################################################################################################################
+def _to_dataframe(buffers: dict[str, ColumnBuffer], rows: int) -> pd.DataFrame:
+    """Create a dataframe from column buffers.
+
+    Args:
+        buffers (dict[str, ColumnBuffer]): The column buffers.
+        rows (int): The number of rows, shorter buffers are filled with missing values.
+
+    Returns:
+        pd.DataFrame: The dataframe.
+    """
+    for val in buffers.values():
+        val.pad(rows)
+    return pd.DataFrame({key: val.to_series() for key, val in buffers.items()}, copy=False)
+
+
+#####################################################################################################################################################
+def records_to_dataframe(records: list[dict], ingest_filter: IngestFilter | None = None) -> pd.DataFrame:
+    """Flatten records by columns and create a dataframe with typed columns.
+
+    Args:
+        records (list[dict]): The records.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are added to the dataframe.
+
+    Returns:
+        pd.DataFrame: The dataframe.
+    """
+    buffers: dict[str, ColumnBuffer] = {}
+    return _to_dataframe(buffers, _add_records(buffers, records, 0, ingest_filter))
+
+
+#####################################################################################################################################################
+def read_json_tables(contents: str | BinaryIO, ingest_filter: IngestFilter | None = None) -> Iterator[tuple[str, pd.DataFrame]]:
+    """Read the tables of an uploaded json-file with the structure {'table_name': list[dict]}.
+
+    Values that are no lists of dictionaries are skipped, as well as tables without rows after the ingest filter is applied.
+
+    Args:
+        contents (str | BinaryIO): The uploaded file content as base64 data url or the opened file.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows of every table are read.
+
+    Raises:
+        ValueError: The content is not valid json.
+
+    Yields:
+        tuple[str, pd.DataFrame]: Name and content of every table.
+    """
+    if isinstance(contents, str):
+        stream = JsonStream(decode_base64_blocks(contents.partition(",")[2]))
+    else:
+        stream = JsonStream(read_text_blocks(contents))
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if stream.peek() == "[":
+            stream.position += 1
+            table = _read_table(stream, ingest_filter)
+            if table is not None:
+                yield key, table
+        else:
+            stream.value()
+        if stream.expect(",}") == "}":
+            return
@@ -1,13 +1,186 @@
 """Functions for operations on data."""
 
-import base64
-import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Callable, Iterator
 
 import pandas as pd
 
 
-from plot_page.control.data_operation.modify_data import flatten_dictionary
-from plot_page.data.panda_data import store_dataframe
+from plot_page.control.data_operation.chunked_upload import UPLOAD_ID, received_bytes, remove_upload, upload_path
+from plot_page.control.data_operation.extract_information import materialize_dependent_views
+from plot_page.control.data_operation.file_readers import check_file_type, open_upload, read_tables
+from plot_page.control.data_operation.json_stream import read_json_tables
+from plot_page.control.data_operation.modify_data import IngestFilter, compact_dtypes
+from plot_page.data.panda_data import (
+    DATAFRAME_STORE,
+    append_dataframe,
+    check_dataset_name,
+    check_memory_budget,
+    get_dataframe_columns,
+    get_view,
+    read_catalog,
+    store_dataframe,
+    store_dataframe_async,
+)
+
+COMPACT_FLOAT32 = False
+UPLOAD_WORKERS = os.cpu_count() or 1
+UPLOAD_POOL: ProcessPoolExecutor | None = None
+UPLOAD_POOL_LOCK = threading.Lock()
+INGEST_CANCEL_DIRECTORY = os.path.join(DATAFRAME_STORE, "_cancel.tmp")
+
+logger = logging.getLogger(__name__)
+
+
+class IngestCancelled(Exception):
+    """The ingest has been cancelled between two stored chunks."""
+
+
+class IngestProgress:
+    """Counter of the parsed bytes and written rows of an ingest, every update is reported to a callback.
+
+    Updates happen after every stored chunk and file, so that is where a cancelled ingest stops. The stored chunks are complete at this point.
+    """
+
+    def __init__(self, report: Callable[[int, int], None] | None = None, cancelled: Callable[[], bool] | None = None) -> None:
+        """Create the counter.
+
+        Args:
+            report (Callable[[int, int], None] | None): Called with the number of parsed bytes and written rows after every update.
+            cancelled (Callable[[], bool] | None): Checked after every update, the ingest is stopped if it returns True.
+        """
+        self.report = report
+        self.cancelled = cancelled
+        self.finished_bytes = 0
+        self.file_bytes = 0
+        self.rows = 0
+
+    ###############################################################################################################################################
+    def update(self, file_bytes: int | None = None, rows: int = 0) -> None:
+        """Update the parsed bytes of the current file and add written rows.
+
+        Args:
+            file_bytes (int | None): The parsed bytes of the current file, unchanged if None.
+            rows (int): Number of new written rows.
+
+        Raises:
+            IngestCancelled: The ingest has been cancelled.
+        """
+        if file_bytes is not None:
+            self.file_bytes = file_bytes
+        self.rows += rows
+        if self.report is not None:
+            self.report(self.finished_bytes + self.file_bytes, self.rows)
+        if self.cancelled is not None and self.cancelled():
+            raise IngestCancelled(f"Ingest cancelled after {self.rows} rows")
+
+    ###############################################################################################################################################
+    def finish_file(self, size: int) -> None:
+        """Count a file as parsed.
+
+        Args:
+            size (int): Size of the file in bytes.
+        """
+        self.finished_bytes += size
+        self.file_bytes = 0
+        self.update()
+
+
+#####################################################################################################################################################
+def _cancel_path(job_id: str) -> str:
+    """Get the path of the file that marks an ingest job as cancelled.
+
+    Args:
+        job_id (str): Id of the ingest job.
+
+    Raises:
+        ValueError: The id contains other characters than letters, digits, "_" and "-".
+
+    Returns:
+        str: Path of the marker file.
+    """
+    if not UPLOAD_ID.fullmatch(job_id):
+        raise ValueError(f"Invalid job id: {job_id!r}")
+    return os.path.join(INGEST_CANCEL_DIRECTORY, job_id)
+
+
+#####################################################################################################################################################
+def request_ingest_cancel(job_id: str) -> None:
+    """Ask an ingest job to stop after the chunk it is storing, the job can run in another process.
+
+    Args:
+        job_id (str): Id of the ingest job.
+    """
+    os.makedirs(INGEST_CANCEL_DIRECTORY, exist_ok=True)
+    with open(_cancel_path(job_id), mode="w", encoding="utf-8"):
+        pass
+
+
+#####################################################################################################################################################
+def ingest_cancel_requested(job_id: str) -> bool:
+    """Check if an ingest job should stop.
+
+    Args:
+        job_id (str): Id of the ingest job.
+
+    Returns:
+        bool: True if the job has been cancelled.
+    """
+    return os.path.exists(_cancel_path(job_id))
+
+
+#####################################################################################################################################################
+def clear_ingest_cancel(job_id: str) -> None:
+    """Remove the cancel request of a finished ingest job.
+
+    Args:
+        job_id (str): Id of the ingest job.
+    """
+    if os.path.exists(_cancel_path(job_id)):
+        os.remove(_cancel_path(job_id))
+
+
+#####################################################################################################################################################
+def create_ingest_filter(include: str | None, exclude: str | None, row_filter: str | None) -> IngestFilter | None:
+    """Create the ingest filter from the inputs of the upload page.
+
+    Args:
+        include (str | None): Comma separated columns that should be stored, all columns are stored if empty.
+        exclude (str | None): Comma separated columns that should not be stored.
+        row_filter (str | None): Query that the stored rows have to fulfill, in the syntax of the queries of query_table.
+
+    Returns:
+        IngestFilter | None: The filter or None if all columns and rows should be stored.
+    """
+    include_columns = [val.strip() for val in (include or "").split(",") if val.strip()]
+    exclude_columns = [val.strip() for val in (exclude or "").split(",") if val.strip()]
+    queries = [row_filter.strip()] if row_filter and row_filter.strip() else []
+    ingest_filter = IngestFilter(include_columns or None, exclude_columns, queries)
+    return ingest_filter if ingest_filter else None
+
+
+#####################################################################################################################################################
+def prepare_dataframe(add_data: list[dict] | pd.DataFrame, name_dataset: str, downcast_integers: bool = True) -> pd.DataFrame:
+    """Create a dataframe from records and compact its dtypes.
+
+    Args:
+        add_data (list[dict] | pd.DataFrame): The records of the dataset.
+        name_dataset (str): Name of the dataset.
+        downcast_integers (bool): Downcast integer columns to the smallest integer width.
+
+    Returns:
+        pd.DataFrame: The created dataframe.
+    """
+    if not isinstance(add_data, pd.DataFrame):
+        add_data = pd.DataFrame.from_dict(add_data)
+    current_dataframe, saved_bytes = compact_dtypes(add_data, COMPACT_FLOAT32, downcast_integers)
+    for column, saved in saved_bytes.items():
+        logger.info("Dataset %s: compacted column %s to %s, saved %d bytes", name_dataset, column, current_dataframe[column].dtype, saved)
+    return current_dataframe
 
 
 #####################################################################################################################################################
@@ -26,35 +199,300 @@ def add_dataset(table_data: dict, add_data: list[dict], name_dataset: str) -> di
         return None
     if table_data is None:
         table_data = {}
-    current_dataframe = pd.DataFrame.from_dict(add_data)
+    current_dataframe = prepare_dataframe(add_data, name_dataset)
     store_dataframe(current_dataframe, name_dataset)
     table_data[name_dataset] = list(current_dataframe.columns)
     return table_data
 
 
 #####################################################################################################################################################
-def prepare_json(contents: str) -> dict[str, list[dict]]:
-    """Prepare uploaded json-file.
+def store_table(data: pd.DataFrame, name_dataset: str, append: bool = False) -> list[str]:
+    """Store a new table or append its rows to the existing table with the same name.
+
+    New tables are stored write-behind, so that the upload does not wait for the disk. Views on the existing table are materialized first, so
+    that they keep their data.
 
     Args:
-        contents (str): The file content as str.
+        data (pd.DataFrame): The new table.
+        name_dataset (str): Name of the dataset.
+        append (bool): Append the rows to an existing dataset instead of replacing it.
+
+    Raises:
+        ValueError: The name is invalid, the rows do not match the schema of the existing table or the table exceeds the memory budget.
 
     Returns:
-        dict[str, list[dict]]: File content that has been converted to the table structure.
+        list[str]: The columns of the stored dataset.
     """
-    _, content_string = contents.split(",")
-    decoded = base64.b64decode(content_string)
-    return {key: val for key, val in json.loads(decoded).items() if val and isinstance(val, list) and isinstance(val[0], dict)}
+    check_dataset_name(name_dataset)
+    append = append and name_dataset in read_catalog() and get_view(name_dataset) is None
+    check_memory_budget(name_dataset, int(data.memory_usage(index=False, deep=True).sum()), append)
+    materialize_dependent_views(name_dataset)
+    if append:
+        append_dataframe(data, name_dataset)
+        return get_dataframe_columns(name_dataset)
+    store_dataframe_async(data, name_dataset)
+    return list(data.columns)
 
 
 #####################################################################################################################################################
-def prepare_upload_data(contents: list[str] | None, filenames: list[str], store_data: None | dict[str, dict]) -> dict[str, dict]:
+def store_chunks(
+    chunks: Iterator[pd.DataFrame], name_dataset: str, append: bool = False, on_chunk: Callable[[int], None] | None = None
+) -> list[str] | None:
+    """Store a table that is read in chunks, chunk by chunk.
+
+    The dtypes are compacted on the first chunk, the following chunks are converted to the stored dtypes when they are appended. Integer
+    columns are not downcasted if more chunks follow, and stored columns that can not hold the values of a following chunk, e.g. integers with
+    missing values, are widened by append_dataframe. A table with a single chunk is stored write-behind like every other table. If the first
+    chunk is followed by more chunks, it is stored directly, so that the following chunks can be appended to it.
+
+    Args:
+        chunks (Iterator[pd.DataFrame]): The chunks of the table.
+        name_dataset (str): Name of the dataset.
+        append (bool): Append the rows to an existing dataset instead of replacing it.
+        on_chunk (Callable[[int], None] | None): Called with the number of rows after every stored chunk.
+
+    Raises:
+        ValueError: The name is invalid or a chunk exceeds the memory budget, the chunks before it stay stored.
+
+    Returns:
+        list[str] | None: The columns of the stored dataset or None if there are no chunks.
+    """
+    check_dataset_name(name_dataset)
+    columns = None
+    chunk = next(chunks, None)
+    next_chunk = next(chunks, None)
+    if chunk is not None:
+        chunk = prepare_dataframe(chunk, name_dataset, downcast_integers=next_chunk is None)
+    first = True
+    while chunk is not None:
+        if first and next_chunk is not None and not (append and name_dataset in read_catalog()):
+            check_memory_budget(name_dataset, int(chunk.memory_usage(index=False, deep=True).sum()))
+            materialize_dependent_views(name_dataset)
+            store_dataframe(chunk, name_dataset)
+            columns = list(chunk.columns)
+        else:
+            columns = store_table(chunk, name_dataset, append or not first)
+        if on_chunk is not None:
+            on_chunk(len(chunk))
+        chunk = next_chunk
+        next_chunk = next(chunks, None)
+        first = False
+    return columns
+
+
+#####################################################################################################################################################
+def store_file(
+    filename: str,
+    source: BinaryIO,
+    store_data: dict[str, dict],
+    append: bool = False,
+    progress: IngestProgress | None = None,
+    ingest_filter: IngestFilter | None = None,
+) -> dict[str, dict]:
+    """Read the tables of a file in chunks and store them.
+
+    Args:
+        filename (str): Name of the file, the extension selects the reader.
+        source (BinaryIO): The opened file.
+        store_data (dict[str, dict]): The current stored data, it is updated with the columns of the stored tables.
+        append (bool): Append the rows to existing tables with the same name.
+        progress (IngestProgress | None): Updated with the position in the file and the rows of every stored chunk.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are stored.
+
+    Raises:
+        ValueError: The file type is not supported or the content is invalid.
+
+    Returns:
+        dict[str, dict]: The updated stored data.
+    """
+    on_chunk = None if progress is None else lambda rows: progress.update(source.tell(), rows)
+    for key, chunks in read_tables(filename, source, ingest_filter=ingest_filter):
+        columns = store_chunks(chunks, key, append, on_chunk)
+        if columns is not None:
+            store_data[key] = columns
+    return store_data
+
+
+#####################################################################################################################################################
+def read_upload_file(filename: str, content: str, ingest_filter: IngestFilter | None = None) -> list[tuple[str, pd.DataFrame]]:
+    """Read the tables of an uploaded json-file and compact their dtypes.
+
+    Args:
+        filename (str): Name of the uploaded file.
+        content (str): The uploaded file content.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are read.
+
+    Raises:
+        ValueError: The file is no json-file or the content is invalid.
+
+    Returns:
+        list[tuple[str, pd.DataFrame]]: Name and content of every table.
+    """
+    if not filename.lower().endswith(".json"):
+        raise ValueError(f"Unsupported file type: {filename}")
+    return [(key, prepare_dataframe(val, key)) for key, val in read_json_tables(content, ingest_filter)]
+
+
+#####################################################################################################################################################
+def _get_upload_pool() -> ProcessPoolExecutor:
+    """Get the process pool for reading uploaded files, the pool is created with the first parallel upload.
+
+    Returns:
+        ProcessPoolExecutor: The process pool.
+    """
+    global UPLOAD_POOL
+    with UPLOAD_POOL_LOCK:
+        if UPLOAD_POOL is None:
+            UPLOAD_POOL = ProcessPoolExecutor(UPLOAD_WORKERS)
+        return UPLOAD_POOL
+
+
+#####################################################################################################################################################
+def shutdown_upload_pool(wait: bool = True) -> None:
+    """Shut the process pool for reading uploaded files down, a new pool is created with the next parallel upload.
+
+    Every background job runs in its own process, so the pool has to be shut down at the end of the job that created it.
+
+    Args:
+        wait (bool): Wait until the worker processes have exited, a broken pool is dropped without waiting.
+    """
+    global UPLOAD_POOL
+    with UPLOAD_POOL_LOCK:
+        if UPLOAD_POOL is not None:
+            UPLOAD_POOL.shutdown(wait=wait, cancel_futures=True)
+        UPLOAD_POOL = None
+
+
+#####################################################################################################################################################
+def ingest_upload_data(
+    contents: list[str],
+    filenames: list[str],
+    store_data: dict[str, dict],
+    append: bool = False,
+    parallel: bool | None = None,
+    progress: IngestProgress | None = None,
+    ingest_filter: IngestFilter | None = None,
+) -> tuple[dict[str, dict], dict[str, str]]:
+    """Read and store uploaded files, a file that can not be read does not abort the other files.
+
+    Json-files are read completely. In parallel mode they are read in a process pool and the tables are stored in the order of the files when
+    they are ready. All other formats are read in chunks of bounded size in this process and stored chunk by chunk, see file_readers.
+
+    Args:
+        contents (list[str]): The uploaded file contents.
+        filenames (list[str]): Names of the uploaded files.
+        store_data (dict[str, dict]): The current stored data, it is updated with the columns of the stored tables.
+        append (bool): Append the uploaded rows to existing tables with the same name.
+        parallel (bool | None): Read the json-files in a process pool. If None, the pool is used for more than one file and worker.
+        progress (IngestProgress | None): Updated with the parsed bytes and written rows.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are stored.
+
+    Raises:
+        IngestCancelled: The progress has been cancelled, store_data contains the tables that have been stored completely.
+
+    Returns:
+        tuple[dict[str, dict], dict[str, str]]: The updated stored data and the error message of every file that could not be read.
+    """
+    uploads = list(zip(filenames, contents))
+    if parallel is None:
+        parallel = len(uploads) > 1 and UPLOAD_WORKERS > 1
+
+    results: dict[int, Future] = {}
+    if parallel:
+        pool = _get_upload_pool()
+        results = {
+            index: pool.submit(read_upload_file, filename, content, ingest_filter)
+            for index, (filename, content) in enumerate(uploads)
+            if filename.lower().endswith(".json")
+        }
+
+    progress = progress or IngestProgress()
+    failures = {}
+    for index, (filename, content) in enumerate(uploads):
+        try:
+            if index in results:
+                for key, val in results[index].result():
+                    store_data[key] = store_table(val, key, append)
+                    progress.update(rows=len(val))
+            else:
+                check_file_type(filename)
+                with open_upload(content) as upload_file:
+                    store_file(filename, upload_file, store_data, append, progress, ingest_filter)
+        except IngestCancelled:
+            for future in results.values():
+                future.cancel()
+            raise
+        except BrokenProcessPool as error:
+            shutdown_upload_pool(wait=False)
+            failures[filename] = f"Worker process failed: {error}"
+        except Exception as error:
+            failures[filename] = str(error)
+        if filename in failures:
+            logger.warning("Upload %s failed: %s", filename, failures[filename])
+        progress.finish_file(len(content.partition(",")[2]) * 3 // 4)
+    return store_data, failures
+
+
+#####################################################################################################################################################
+def ingest_chunked_uploads(
+    uploads: list[dict[str, str]],
+    store_data: dict[str, dict],
+    append: bool = False,
+    progress: IngestProgress | None = None,
+    ingest_filter: IngestFilter | None = None,
+) -> tuple[dict[str, dict], dict[str, str]]:
+    """Store files that have been uploaded in chunks and remove their temporary files.
+
+    The files are read chunk by chunk, so only every chunk is checked against the memory budget with its real memory usage, see store_chunks.
+
+    Args:
+        uploads (list[dict[str, str]]): Id and filename of every finished upload.
+        store_data (dict[str, dict]): The current stored data, it is updated with the columns of the stored tables.
+        append (bool): Append the uploaded rows to existing tables with the same name.
+        progress (IngestProgress | None): Updated with the parsed bytes and written rows.
+        ingest_filter (IngestFilter | None): Only the selected columns and rows are stored.
+
+    Raises:
+        IngestCancelled: The progress has been cancelled, store_data contains the tables that have been stored completely.
+
+    Returns:
+        tuple[dict[str, dict], dict[str, str]]: The updated stored data and the error message of every file that could not be read.
+    """
+    progress = progress or IngestProgress()
+    failures = {}
+    for upload in uploads:
+        filename = upload.get("filename", "")
+        size = 0
+        try:
+            size = received_bytes(upload.get("upload_id", ""))
+            with open(upload_path(upload["upload_id"]), mode="rb") as upload_file:
+                store_file(filename, upload_file, store_data, append, progress, ingest_filter)
+        except IngestCancelled:
+            for val in uploads:
+                if UPLOAD_ID.fullmatch(val.get("upload_id", "")):
+                    remove_upload(val["upload_id"])
+            raise
+        except Exception as error:
+            failures[filename] = str(error)
+            logger.warning("Upload %s failed: %s", filename, error)
+        finally:
+            if UPLOAD_ID.fullmatch(upload.get("upload_id", "")):
+                remove_upload(upload["upload_id"])
+        progress.finish_file(size)
+    return store_data, failures
+
+
+#####################################################################################################################################################
+def prepare_upload_data(
+    contents: list[str] | None, filenames: list[str], store_data: None | dict[str, dict], append: bool = False
+) -> dict[str, dict]:
     """Prepare uploaded data and return it as dict.
 
     Args:
         contents (str): The uploaded file content.
         filenames (str): Name of the uploaded file.
         store_data (None | dict[str, dict]): The current stored data.
+        append (bool): Append the uploaded rows to existing tables with the same name.
 
     Returns:
         dict[str, dict]: The new data to store.
@@ -63,16 +501,5 @@ def prepare_upload_data(contents: list[str] | None, filenames: list[str], store_
     if contents is None or filenames is None:
         return store_data
 
-    new_data: dict[str, pd.DataFrame] = {}
-    for uploaded_data in zip(filenames, contents):
-        if uploaded_data[0].endswith(".json"):
-            json_data = prepare_json(uploaded_data[1])
-            if all(isinstance(values, list) for values in json_data.values()):
-                for key, val in json_data.items():
-                    new_data[key] = pd.DataFrame.from_dict([flatten_dictionary(v) for v in val])
-
-    for key, val in new_data.items():
-        store_dataframe(val, key)
-        store_data[key] = list(val.columns)
-
+    store_data, _ = ingest_upload_data(contents, filenames, store_data if store_data is not None else {}, append)
     return store_data
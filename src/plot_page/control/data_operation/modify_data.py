@@ -1,7 +1,18 @@
 """Functions for operations on data."""
 
+import itertools
+import math
+import timeit
 from typing import Any
 
+import numpy as np
+import pandas as pd
+
+from plot_page.control.data_operation.compiled_query import compile_queries
+from plot_page.data.panda_data import get_index_groups
+
+CATEGORY_MAX_RATIO = 0.5
+
 
 def filter_columns(selected_data: dict[str, list[dict]]) -> list[str]:
     """Filter common keys of all selected tables.
@@ -23,22 +34,90 @@ def filter_columns(selected_data: dict[str, list[dict]]) -> list[str]:
 
 
 def flatten_dictionary(current_dictionary: dict[str, Any], parent_key: str | None = None) -> dict[str, Any]:
+    """Flatten a nested dictionary, the keys of nested values are joined with their parent keys as parent_child.
+
+    Args:
+        current_dictionary (dict[str, Any]): The dictionary that should be flattened.
+        parent_key (str | None): Key of the parent dictionary.
+
+    Returns:
+        dict[str, Any]: The flattened dictionary.
+    """
     res = {}
     for key, val in current_dictionary.items():
-        new_key = f"{parent_key}_key" if parent_key is not None else key
+        new_key = f"{parent_key}_{key}" if parent_key is not None else key
         if isinstance(val, dict):
-            res = res | flatten_dictionary(val, new_key)
+            res.update(flatten_dictionary(val, new_key))
         else:
             res[new_key] = val
     return res
 
 
+#####################################################################################################################################################
+def flatten_records(records: list[dict[str, Any]], parent_key: str | None = None) -> dict[str, list]:
+    """Flatten a list of nested dictionaries into columns.
+
+    The keys are collected once for all records and every key is extracted across all records at once. Keys with dictionary values are
+    flattened recursively and joined with their parent keys as parent_child. Missing values are None. If a key has dictionaries in some
+    records and other values in other records, the other values are kept in the column of the key itself.
+
+    Args:
+        records (list[dict[str, Any]]): The records that should be flattened.
+        parent_key (str | None): Key of the parent dictionaries.
+
+    Raises:
+        ValueError: Two keys result in the same column name, e.g. {"a": {"b": 1}, "a_b": 2}.
+
+    Returns:
+        dict[str, list]: The flattened columns, every column has one value per record.
+    """
+    res = {}
+    for key in dict.fromkeys(key for record in records for key in record):
+        new_key = f"{parent_key}_{key}" if parent_key is not None else key
+        values = [record.get(key) for record in records]
+        nested = [isinstance(val, dict) for val in values]
+        columns = {}
+        if not any(nested):
+            columns[new_key] = values
+        else:
+            if not all(nested) and any(val is not None for val, is_nested in zip(values, nested) if not is_nested):
+                columns[new_key] = [None if is_nested else val for val, is_nested in zip(values, nested)]
+            columns.update(flatten_records([val if is_nested else {} for val, is_nested in zip(values, nested)], new_key))
+        duplicates = [val for val in columns if val in res]
+        if duplicates:
+            raise ValueError(f"The columns {duplicates} occur more than once after flattening the nested keys")
+        res.update(columns)
+    return res
+
+
+#####################################################################################################################################################
+def benchmark_flatten(records: list[dict[str, Any]], repeat: int = 3) -> dict[str, float]:
+    """Measure the throughput of flattening records per record and by columns.
+
+    Args:
+        records (list[dict[str, Any]]): The records that should be flattened.
+        repeat (int): Number of runs, the fastest run is used.
+
+    Returns:
+        dict[str, float]: Records per second of flatten_dictionary and flatten_records.
+    """
+    records_seconds = min(timeit.repeat(lambda: [flatten_dictionary(record) for record in records], number=1, repeat=repeat))
+    columns_seconds = min(timeit.repeat(lambda: flatten_records(records), number=1, repeat=repeat))
+    return {
+        "flatten_dictionary": len(records) / records_seconds if records_seconds else math.inf,
+        "flatten_records": len(records) / columns_seconds if columns_seconds else math.inf,
+    }
+
+
 #####################################################################################################################################################
 def split_data(data: dict, grouping: list[str] | None) -> dict:
     """Split dictionary of data in groups.
 
+    The rows of every group are taken from the bitmap index of the group column if the data is a complete stored dataset, otherwise the
+    rows are grouped in one pass over the column. Groups are skipped if a dataframe does not contain the column.
+
     Args:
-        data (dict): The dictionary that contaisn the data.
+        data (dict): The dictionary that contains the data, the names of the datasets and their dataframes.
         grouping (list[str] | None): List of attributes the data should be grouped.
 
     Returns:
@@ -49,11 +128,17 @@ def split_data(data: dict, grouping: list[str] | None) -> dict:
         return res
 
     for group in grouping:
-        try:
-            group_values = list(set(res[list(res.keys())[0]][group].tolist()))
-            res = {f"{key}_{attribute}": val[getattr(val, group_values) == attribute] for key, val in res.items() for attribute in group_values}
-        except Exception:
-            pass
+        if any(group not in val.columns for val in res.values()):
+            continue
+        splitted = {}
+        for key, val in res.items():
+            positions = None
+            if res is data and val.index.equals(pd.RangeIndex(len(val))):
+                positions = get_index_groups(key, group, len(val))
+            if positions is None:
+                positions = val.groupby(group, observed=True, sort=True).indices
+            splitted.update({f"{key}_{attribute}": val.iloc[rows] for attribute, rows in positions.items()})
+        res = splitted
 
     return res
 
@@ -69,3 +154,148 @@ def dictionary_values_to_string(input_dict: dict[str, Any]) -> list[dict[str, st
         list[dict[str, str]]: The resulting List of dictionary values.
     """
     return [{key: str(val) for key, val in dataset.items()} for dataset in input_dict]
+
+
+#####################################################################################################################################################
+def compact_dtypes(data: pd.DataFrame, use_float32: bool = False, downcast_integers: bool = True) -> tuple[pd.DataFrame, dict[str, int]]:
+    """Convert the columns of a dataframe to the smallest dtypes that can hold the values.
+
+    String columns with few distinct values are converted to categoricals and integer columns are downcasted to the smallest integer width.
+    Float columns are only converted to float32 if use_float32 is set, because this loses precision.
+
+    Args:
+        data (pd.DataFrame): The dataframe that should be compacted.
+        use_float32 (bool): Convert float64 columns to float32.
+        downcast_integers (bool): Downcast integer columns, disabled if more rows with possibly larger values follow.
+
+    Returns:
+        tuple[pd.DataFrame, dict[str, int]]: The compacted dataframe and the number of saved bytes for every converted column.
+    """
+    res = {}
+    saved_bytes = {}
+    for column in data.columns:
+        values = data[column]
+        compacted = values
+        if values.dtype.kind in "iu" and downcast_integers:
+            compacted = pd.to_numeric(values, downcast="integer")
+        elif values.dtype.kind == "f" and use_float32:
+            compacted = values.astype(np.float32)
+        elif pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype):
+            if pd.api.types.infer_dtype(values, skipna=True) == "string" and values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+                compacted = values.astype("category")
+
+        saved = int(values.memory_usage(index=False, deep=True) - compacted.memory_usage(index=False, deep=True))
+        if saved > 0:
+            saved_bytes[column] = saved
+            values = compacted
+        res[column] = values
+    return pd.DataFrame(res, index=data.index), saved_bytes
+
+
+class IngestFilter:
+    """Columns and rows of uploaded tables that should be stored.
+
+    The row filter consists of queries in the syntax of DataFrame.query, like the queries of query_table, rows are stored if they fulfill all
+    queries. Columns that are only used by the queries are read, but not stored. The filter is applied on every chunk or batch of records
+    while a file is read, so that dropped columns and rows are never collected for the whole table.
+    """
+
+    def __init__(self, include: list[str] | None = None, exclude: list[str] | None = None, queries: list[str] | None = None) -> None:
+        """Create the filter.
+
+        Args:
+            include (list[str] | None): Store only these columns. All columns are stored if None.
+            exclude (list[str] | None): Do not store these columns.
+            queries (list[str] | None): Store only the rows that fulfill all queries.
+        """
+        self.include = None if include is None else set(include)
+        self.exclude = set(exclude or [])
+        self.queries = list(queries or [])
+
+    ###############################################################################################################################################
+    def __bool__(self) -> bool:
+        """Check if the filter drops anything.
+
+        Returns:
+            bool: True if columns or rows can be dropped.
+        """
+        return self.include is not None or bool(self.exclude) or bool(self.queries)
+
+    ###############################################################################################################################################
+    def keeps_column(self, column: str) -> bool:
+        """Check if a column is stored.
+
+        Args:
+            column (str): Name of the column.
+
+        Returns:
+            bool: True if the column is stored.
+        """
+        return (self.include is None or column in self.include) and column not in self.exclude
+
+    ###############################################################################################################################################
+    def reads_column(self, column: str) -> bool:
+        """Check if a column has to be read, because it is stored or used by a query.
+
+        Args:
+            column (str): Name of the column.
+
+        Returns:
+            bool: True if the column has to be read.
+        """
+        return self.keeps_column(column) or column in compile_queries(tuple(self.queries)).columns
+
+    ###############################################################################################################################################
+    def row_mask(self, data: pd.DataFrame) -> np.ndarray | None:
+        """Evaluate the queries on a chunk.
+
+        Args:
+            data (pd.DataFrame): The chunk, it has to contain the columns that are used by the queries.
+
+        Raises:
+            ValueError: A query is invalid or does not result in a boolean value per row.
+
+        Returns:
+            np.ndarray | None: True for every row that should be stored or None if there are no queries.
+        """
+        if not self.queries:
+            return None
+        try:
+            return compile_queries(tuple(self.queries)).evaluate(data)
+        except ValueError as error:
+            raise ValueError(f"Invalid row filter: {error}") from error
+
+    ###############################################################################################################################################
+    def filter_dataframe(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Apply the filter on a chunk.
+
+        Args:
+            data (pd.DataFrame): The chunk.
+
+        Returns:
+            pd.DataFrame: The rows and columns that should be stored.
+        """
+        mask = self.row_mask(data)
+        if mask is not None:
+            data = data[mask].reset_index(drop=True)
+        return data[[column for column in data.columns if self.keeps_column(column)]]
+
+    ###############################################################################################################################################
+    def filter_columns(self, columns: dict[str, list], rows: int, known_columns: list[str]) -> tuple[dict[str, list], int]:
+        """Apply the filter on a batch of flattened records before a dataframe is created.
+
+        Args:
+            columns (dict[str, list]): The flattened columns of the batch.
+            rows (int): Number of records in the batch.
+            known_columns (list[str]): Columns of previous batches, they are missing in the batch if they are not in columns.
+
+        Returns:
+            tuple[dict[str, list], int]: The values of the stored columns for the rows that should be stored and the number of these rows.
+        """
+        if self.queries:
+            query_columns = compile_queries(tuple(self.queries)).columns
+            mask = self.row_mask(pd.DataFrame({key: columns.get(key, [np.nan] * rows) for key in query_columns}, index=pd.RangeIndex(rows)))
+            if not mask.all():
+                columns = {key: list(itertools.compress(val, mask)) for key, val in columns.items()}
+                rows = int(mask.sum())
+        return {key: val for key, val in columns.items() if self.keeps_column(key)}, rows
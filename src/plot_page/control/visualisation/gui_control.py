@@ -3,9 +3,17 @@
 from typing import Any
 
 
-from plot_page.control.data_operation.extract_information import calculate_correlation, calculate_notlinear_regression, check_line_config, query_table
+from plot_page.control.data_operation.extract_information import (
+    calculate_correlation,
+    calculate_notlinear_regression,
+    check_line_config,
+    materialize_dependent_views,
+    query_table,
+)
 from plot_page.control.visualisation.plot_function import plot_2d_data, plot_correlation_coefficient, plot_notlinear_regression
-from plot_page.data.panda_data import load_dataframe, store_dataframe
+from plot_page.data.panda_data import check_dataset_name, check_memory_budget, get_dataframe_columns, store_dataframe, store_view
+
+VIEW_MATERIALIZE_AFTER = 20
 
 
 #####################################################################################################################################################
@@ -38,6 +46,22 @@ def add_plot_data(
     return None
 
 
+#####################################################################################################################################################
+def get_plot_columns(plot_settings: list[dict], x_axis: str, y_axis: str) -> list[str]:
+    """Get the columns that are needed to create a plot.
+
+    Args:
+        plot_settings (list[dict]): The current plot settings.
+        x_axis (str): Selected attribute for the x_axis.
+        y_axis (str): Selected attribute for the y_axis.
+
+    Returns:
+        list[str]: The needed columns without duplicates.
+    """
+    group_attributes = [group for setting in plot_settings for group in setting.get("group_attributes") or []]
+    return list(dict.fromkeys([x_axis, y_axis] + group_attributes))
+
+
 #####################################################################################################################################################
 def create_2dplot(
     plot_settings: list[dict],
@@ -67,10 +91,11 @@ def create_2dplot(
     if title is None or x_axis is None or y_axis is None:
         return []
 
+    columns = get_plot_columns(plot_settings, x_axis, y_axis)
     data_to_plot = (
-        [{key: load_dataframe(key) for key in selected_tables}]
+        [{key: query_table(key, [], columns) for key in selected_tables}]
         if graph_type == "Combined Graphs"
-        else [{key: load_dataframe(key)} for key in selected_tables]
+        else [{key: query_table(key, [], columns)} for key in selected_tables]
     )
 
     return [plot_2d_data(data, plot_settings, title, x_axis, y_axis) for data in data_to_plot]
@@ -95,7 +120,7 @@ def correlation_evaluation(selected_table: str | None, main_attribute: str | Non
     if second_attributes is None or len(second_attributes) < 1:
         return []
 
-    loaded_selected_table = load_dataframe(selected_table)
+    loaded_selected_table = query_table(selected_table, [], list(dict.fromkeys([main_attribute] + second_attributes)))
     correlation_coefficient = calculate_correlation(loaded_selected_table, main_attribute, second_attributes)
     return [plot_correlation_coefficient(loaded_selected_table, main_attribute, key, factor) for key, factor in correlation_coefficient.items()]
 
@@ -124,7 +149,7 @@ def notlinear_regression_evaluation(
     if selected_function is None:
         return []
 
-    loaded_selected_table = load_dataframe(selected_table)
+    loaded_selected_table = query_table(selected_table, [], list(dict.fromkeys([main_attribute, second_attribute])))
     popt, pcov, res_string, model_func = calculate_notlinear_regression(loaded_selected_table, main_attribute, second_attribute, selected_function)
     return plot_notlinear_regression(loaded_selected_table, main_attribute, second_attribute, popt, pcov, res_string, model_func)
 
@@ -169,7 +194,12 @@ def plot2d_generate_additional_plot_setting(
 
 ####################################################################################################################################################
 def upload_create_filtered_dataset(
-    n_clicks: int | None, selected_table: str | None, table_name: str | None, query_list: list[str], table_data: dict[str, list]
+    n_clicks: int | None,
+    selected_table: str | None,
+    table_name: str | None,
+    query_list: list[str],
+    table_data: dict[str, list],
+    save_as_view: bool = False,
 ) -> tuple[dict[str, list], str]:
     """Save the modified dataset.
 
@@ -179,6 +209,10 @@ def upload_create_filtered_dataset(
         table_name (str | None): The name for the new dataset.
         query_list (list[str]): List of queries that where executed on the dataset.
         table_data (dict[str, list]): The existing dict of dataset.
+        save_as_view (bool): Only store the selected table and the queries instead of the resulting data.
+
+    Raises:
+        ValueError: The name is invalid, the view can not be stored with this name or the filtered dataset exceeds the memory budget.
 
     Returns:
         tuple[dict[str, list], str]: The updated dictionary of dataset and default value for input component.
@@ -189,8 +223,17 @@ def upload_create_filtered_dataset(
         return None, None
     if table_name is None or len(table_name) < 1:
         return None, None
+    check_dataset_name(table_name)
+
+    if save_as_view:
+        materialize_dependent_views(table_name)
+        store_view(table_name, selected_table, query_list, VIEW_MATERIALIZE_AFTER)
+        table_data[table_name] = get_dataframe_columns(table_name)
+        return table_data, ""
 
     res_dataframe = query_table(selected_table, query_list)
+    check_memory_budget(table_name, int(res_dataframe.memory_usage(index=False, deep=True).sum()))
+    materialize_dependent_views(table_name)
     store_dataframe(res_dataframe, table_name)
     table_data[table_name] = list(res_dataframe.columns)
     return table_data, ""
@@ -51,22 +51,22 @@ def plot_line(fig: go.Figure, splitted_data: dict[str, pd.DataFrame], x_axis: st
 
     if settings["value"] == "Min":
         for key, val in splitted_data.items():
-            plot_data = val.groupby(by=x_axis)[y_axis].min()
+            plot_data = val.groupby(by=x_axis, observed=True)[y_axis].min()
             fig.add_trace(go.Scatter(x=plot_data.index.values, y=plot_data, mode=settings["mode"], name=f"min_{key}"))
 
     if settings["value"] == "Max":
         for key, val in splitted_data.items():
-            plot_data = val.groupby(by=x_axis)[y_axis].max()
+            plot_data = val.groupby(by=x_axis, observed=True)[y_axis].max()
             fig.add_trace(go.Scatter(x=plot_data.index.values, y=plot_data, mode=settings["mode"], name=f"max_{key}"))
 
     if settings["value"] == "Median":
         for key, val in splitted_data.items():
-            plot_data = val.groupby(by=x_axis)[y_axis].median()
+            plot_data = val.groupby(by=x_axis, observed=True)[y_axis].median()
             fig.add_trace(go.Scatter(x=plot_data.index.values, y=plot_data, mode=settings["mode"], name=f"median_{key}"))
 
     if settings["value"] == "Mean":
         for key, val in splitted_data.items():
-            plot_data = val.groupby(by=x_axis)[y_axis].mean()
+            plot_data = val.groupby(by=x_axis, observed=True)[y_axis].mean()
             fig.add_trace(go.Scatter(x=plot_data.index.values, y=plot_data, mode=settings["mode"], name=f"mean_{key}"))
 
 
@@ -87,22 +87,22 @@ def plot_bar(fig: go.Figure, splitted_data: dict[str, pd.DataFrame], x_axis: str
 
     if settings["value"] == "Min":
         for key, val in splitted_data.items():
-            plot_data = val.groupby(by=x_axis)[y_axis].min()
+            plot_data = val.groupby(by=x_axis, observed=True)[y_axis].min()
             fig.add_trace(go.Bar(x=plot_data.index.values, y=plot_data, name=f"min_{key}"))
 
     if settings["value"] == "Max":
         for key, val in splitted_data.items():
-            plot_data = val.groupby(by=x_axis)[y_axis].max()
+            plot_data = val.groupby(by=x_axis, observed=True)[y_axis].max()
             fig.add_trace(go.Bar(x=plot_data.index.values, y=plot_data, name=f"max_{key}"))
 
     if settings["value"] == "Median":
         for key, val in splitted_data.items():
-            plot_data = val.groupby(by=x_axis)[y_axis].median()
+            plot_data = val.groupby(by=x_axis, observed=True)[y_axis].median()
             fig.add_trace(go.Bar(x=plot_data.index.values, y=plot_data, name=f"median_{key}"))
 
     if settings["value"] == "Mean":
         for key, val in splitted_data.items():
-            plot_data = val.groupby(by=x_axis)[y_axis].mean()
+            plot_data = val.groupby(by=x_axis, observed=True)[y_axis].mean()
             fig.add_trace(go.Bar(x=plot_data.index.values, y=plot_data, name=f"mean{key}"))
 
 
@@ -0,0 +1,37 @@
+"""Command line tools for the stored datasets.
+
+Run with `python -m plot_page.data <command>` from the directory that contains the Data folder.
+"""
+
+import argparse
+
+from plot_page.data.panda_data import benchmark_codecs, change_codec, rebuild_catalog
+
+
+#####################################################################################################################################################
+def main() -> None:
+    """Parse the command line arguments and run the selected command."""
+    parser = argparse.ArgumentParser(prog="python -m plot_page.data", description="Manage the datasets in the dataframe store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-catalog", help="Scan the stored datasets and repair the catalog file.")
+    benchmark_parser = commands.add_parser("benchmark-codecs", help="Compare write time, read time and size of all codecs for a dataset.")
+    benchmark_parser.add_argument("dataset", help="Name of the stored dataset.")
+    benchmark_parser.add_argument("--codecs", nargs="+", default=None, help="Only compare these codecs.")
+    codec_parser = commands.add_parser("set-codec", help="Store a dataset again with another codec.")
+    codec_parser.add_argument("dataset", help="Name of the stored dataset.")
+    codec_parser.add_argument("codec", help="Name of the codec or one of the aliases fast and dense.")
+    arguments = parser.parse_args()
+
+    if arguments.command == "rebuild-catalog":
+        print(f"Catalog contains {len(rebuild_catalog())} datasets")
+    if arguments.command == "benchmark-codecs":
+        print(f"{'codec':<8}{'write [s]':>12}{'read [s]':>12}{'size [MB]':>12}{'ratio':>8}")
+        for val in benchmark_codecs(arguments.dataset, arguments.codecs):
+            ratio = f"{val['ratio']:.2f}" if val["ratio"] else "-"
+            print(f"{val['codec']:<8}{val['write_seconds']:>12.3f}{val['read_seconds']:>12.3f}{val['bytes'] / 1024**2:>12.2f}{ratio:>8}")
+    if arguments.command == "set-codec":
+        change_codec(arguments.dataset, arguments.codec)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""This file contains the compression codecs that can be used for stored datasets.
+
+The standard library codecs are always available. lz4 and zstandard are used if they are installed, otherwise the "fast" and "dense" codec
+fall back to zlib and lzma.
+"""
+
+import bz2
+import lzma
+import zlib
+from typing import Callable
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+CODECS: dict[str, tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (lambda data: data, lambda data: data),
+    "zlib": (lambda data: zlib.compress(data, 1), zlib.decompress),
+    "bz2": (lambda data: bz2.compress(data, 9), bz2.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+if lz4 is not None:
+    CODECS["lz4"] = (lz4.frame.compress, lz4.frame.decompress)
+if zstandard is not None:
+    CODECS["zstd"] = (lambda data: zstandard.ZstdCompressor(level=9).compress(data), lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+CODEC_ALIASES = {"fast": "lz4" if "lz4" in CODECS else "zlib", "dense": "zstd" if "zstd" in CODECS else "lzma"}
+
+
+#####################################################################################################################################################
+def available_codecs() -> list[str]:
+    """List all codecs that can be used in this environment.
+
+    Returns:
+        list[str]: Names of the available codecs.
+    """
+    return list(CODECS)
+
+
+#####################################################################################################################################################
+def resolve_codec(codec: str) -> str:
+    """Get the name of the codec that is used for a codec name or alias.
+
+    Args:
+        codec (str): Name of a codec or one of the aliases "fast" and "dense".
+
+    Raises:
+        ValueError: The codec is not available.
+
+    Returns:
+        str: The name of the codec.
+    """
+    codec = CODEC_ALIASES.get(codec, codec)
+    if codec not in CODECS:
+        raise ValueError(f"Codec {codec} is not available, use one of {available_codecs() + list(CODEC_ALIASES)}")
+    return codec
+
+
+#####################################################################################################################################################
+def compress(codec: str, data: bytes) -> bytes:
+    """Compress data.
+
+    Args:
+        codec (str): Name of the codec.
+        data (bytes): The data that should be compressed.
+
+    Returns:
+        bytes: The compressed data.
+    """
+    return CODECS[codec][0](data)
+
+
+#####################################################################################################################################################
+def decompress(codec: str, data: bytes) -> bytes:
+    """Decompress data.
+
+    Args:
+        codec (str): Name of the codec that has been used to compress the data.
+        data (bytes): The compressed data.
+
+    Returns:
+        bytes: The decompressed data.
+    """
+    return CODECS[codec][1](data)
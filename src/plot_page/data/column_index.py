@@ -0,0 +1,230 @@
+"""This file contains the secondary indexes of single columns of stored datasets.
+
+A sorted index contains the values of a numeric column in ascending order and the row number of every value, so that the rows of a range or
+equality filter are found with a binary search. Missing values are sorted to the end and never match. A bitmap index contains one bit per
+row and distinct value, packed to bytes, so that the rows of an equality, "in" filter or group are found by combining the bitmaps of the
+values. It is used for columns with at most BITMAP_MAX_VALUES distinct values. Both indexes can be extended by appended rows without being
+built again.
+"""
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+BITMAP_MAX_VALUES = 256
+SORTED_DTYPE_KINDS = "biufmM"
+
+
+#####################################################################################################################################################
+def _row_dtype(rows: int) -> np.dtype:
+    """Get the smallest integer dtype for row numbers.
+
+    Args:
+        rows (int): Number of rows of the dataset.
+
+    Returns:
+        np.dtype: int32 if the row numbers fit, otherwise int64.
+    """
+    return np.dtype(np.int32) if rows < 2**31 else np.dtype(np.int64)
+
+
+#####################################################################################################################################################
+def _python_value(value: Any) -> Any:
+    """Convert a numpy scalar to a python value that can be written as json.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        Any: The python value.
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+
+#####################################################################################################################################################
+def index_kind(values: pd.Series) -> str | None:
+    """Select the index kind that fits a column.
+
+    Args:
+        values (pd.Series): The values of the column.
+
+    Returns:
+        str | None: "sorted" for numeric columns, "bitmap" for other columns with few distinct values or None if no index fits.
+    """
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in SORTED_DTYPE_KINDS and values.dtype.kind != "b":
+        return "sorted"
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return "bitmap" if len(values.cat.categories) <= BITMAP_MAX_VALUES else None
+    return "bitmap" if values.nunique(dropna=True) <= BITMAP_MAX_VALUES else None
+
+
+#####################################################################################################################################################
+def build_sorted_index(values: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Build the sorted index of a numeric column.
+
+    Args:
+        values (pd.Series): The values of the column.
+
+    Raises:
+        ValueError: The column is not numeric.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The values in ascending order and their row numbers.
+    """
+    if not isinstance(values.dtype, np.dtype) or values.dtype.kind not in SORTED_DTYPE_KINDS:
+        raise ValueError(f"A sorted index needs a numeric column, {values.name} has dtype {values.dtype}")
+    array = values.to_numpy()
+    rows = np.argsort(array, kind="stable").astype(_row_dtype(len(array)))
+    return array[rows], rows
+
+
+#####################################################################################################################################################
+def append_sorted_index(sorted_values: np.ndarray, rows: np.ndarray, values: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Extend a sorted index by appended rows.
+
+    The sorted new values are merged into the sorted stored values, a stable sort of two sorted runs takes linear time.
+
+    Args:
+        sorted_values (np.ndarray): The stored values in ascending order.
+        rows (np.ndarray): The row numbers of the stored values.
+        values (pd.Series): The values of the appended rows.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The values of all rows in ascending order and their row numbers.
+    """
+    new_values, new_rows = build_sorted_index(values)
+    merged_values = np.concatenate([sorted_values, new_values])
+    order = np.argsort(merged_values, kind="stable")
+    row_dtype = _row_dtype(len(rows) + len(new_rows))
+    return merged_values[order], np.concatenate([rows.astype(row_dtype), new_rows.astype(row_dtype) + len(rows)])[order]
+
+
+#####################################################################################################################################################
+def sorted_index_mask(sorted_values: np.ndarray, rows: np.ndarray, operator: str, value: Any) -> np.ndarray | None:
+    """Find the rows that fulfill a filter with a sorted index.
+
+    Args:
+        sorted_values (np.ndarray): The values in ascending order.
+        rows (np.ndarray): The row numbers of the values.
+        operator (str): One of "==", ">", ">=", "<", "<=" and "in".
+        value (Any): The value the column is compared to, a list of values for "in".
+
+    Returns:
+        np.ndarray | None: True for every row that fulfills the filter or None if the index can not be used for the value.
+    """
+    if sorted_values.dtype.kind in "mM" or not all(isinstance(val, (int, float, np.number)) for val in (value if operator == "in" else [value])):
+        return None
+    try:
+        valid = np.searchsorted(sorted_values, np.nan, side="left") if sorted_values.dtype.kind == "f" else len(sorted_values)
+        if operator == "in":
+            bounds = [(np.searchsorted(sorted_values[:valid], val, "left"), np.searchsorted(sorted_values[:valid], val, "right")) for val in value]
+        else:
+            start = np.searchsorted(sorted_values[:valid], value, side="right" if operator == ">" else "left") if operator[0] in "=>" else 0
+            stop = np.searchsorted(sorted_values[:valid], value, side="left" if operator == "<" else "right") if operator[0] in "=<" else valid
+            bounds = [(start, stop)]
+    except (TypeError, ValueError):
+        return None
+    mask = np.zeros(len(rows), dtype=bool)
+    for start, stop in bounds:
+        mask[rows[start:stop]] = True
+    return mask
+
+
+#####################################################################################################################################################
+def build_bitmap_index(values: pd.Series) -> tuple[list, np.ndarray]:
+    """Build the bitmap index of a column with few distinct values.
+
+    Args:
+        values (pd.Series): The values of the column.
+
+    Raises:
+        ValueError: The column has more than BITMAP_MAX_VALUES distinct values or values that can not be written as json.
+
+    Returns:
+        tuple[list, np.ndarray]: The distinct values and their bitmaps with one row per value, packed to bytes.
+    """
+    codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=True)
+    if len(uniques) > BITMAP_MAX_VALUES:
+        raise ValueError(f"A bitmap index supports at most {BITMAP_MAX_VALUES} distinct values, {values.name} has {len(uniques)}")
+    index_values = [_python_value(val) for val in uniques]
+    if not all(isinstance(val, (bool, int, float, str)) for val in index_values):
+        raise ValueError(f"A bitmap index supports only numbers and strings, {values.name} has dtype {values.dtype}")
+    bitmaps = np.zeros((len(uniques), (len(values) + 7) // 8), dtype=np.uint8)
+    for position in range(len(uniques)):
+        bitmaps[position] = np.packbits(codes == position)
+    return index_values, bitmaps
+
+
+#####################################################################################################################################################
+def append_bitmap_index(index_values: list, bitmaps: np.ndarray, rows: int, values: pd.Series) -> tuple[list, np.ndarray]:
+    """Extend a bitmap index by appended rows.
+
+    Only the last partially used byte of the stored bitmaps is unpacked, the new bits are packed behind it.
+
+    Args:
+        index_values (list): The distinct values of the stored rows.
+        bitmaps (np.ndarray): The bitmaps of the stored rows.
+        rows (int): Number of stored rows.
+        values (pd.Series): The values of the appended rows.
+
+    Raises:
+        ValueError: The column has more than BITMAP_MAX_VALUES distinct values after the append.
+
+    Returns:
+        tuple[list, np.ndarray]: The distinct values and the bitmaps of all rows.
+    """
+    new_values, new_bitmaps = build_bitmap_index(values)
+    all_values = sorted(set(index_values) | set(new_values), key=lambda val: (str(type(val)), val))
+    if len(all_values) > BITMAP_MAX_VALUES:
+        raise ValueError(f"A bitmap index supports at most {BITMAP_MAX_VALUES} distinct values, {values.name} has {len(all_values)}")
+    full_bytes = rows // 8
+    res = np.zeros((len(all_values), (rows + len(values) + 7) // 8), dtype=np.uint8)
+    stored = {val: position for position, val in enumerate(index_values)}
+    added = {val: position for position, val in enumerate(new_values)}
+    for position, val in enumerate(all_values):
+        tail = np.zeros(rows % 8, dtype=np.uint8)
+        if val in stored:
+            res[position, :full_bytes] = bitmaps[stored[val], :full_bytes]
+            tail = np.unpackbits(bitmaps[stored[val], full_bytes:], count=rows % 8)
+        new_bits = np.unpackbits(new_bitmaps[added[val]], count=len(values)) if val in added else np.zeros(len(values), dtype=np.uint8)
+        res[position, full_bytes:] = np.packbits(np.concatenate([tail, new_bits]))
+    return all_values, res
+
+
+#####################################################################################################################################################
+def bitmap_index_mask(index_values: list, bitmaps: np.ndarray, rows: int, operator: str, value: Any) -> np.ndarray | None:
+    """Find the rows that fulfill an equality or "in" filter with a bitmap index.
+
+    Args:
+        index_values (list): The distinct values.
+        bitmaps (np.ndarray): The bitmaps of the values.
+        rows (int): Number of rows.
+        operator (str): The filter operator, only "==" and "in" can use the index.
+        value (Any): The value the column is compared to, a list of values for "in".
+
+    Returns:
+        np.ndarray | None: True for every row that fulfills the filter or None if the index can not be used for the operator.
+    """
+    if operator not in ["==", "in"]:
+        return None
+    selected = set(value) if operator == "in" else {value}
+    positions = [position for position, val in enumerate(index_values) if val in selected]
+    combined = np.bitwise_or.reduce(bitmaps[positions], axis=0) if positions else np.zeros(bitmaps.shape[1], dtype=np.uint8)
+    return np.unpackbits(combined, count=rows).astype(bool)
+
+
+#####################################################################################################################################################
+def bitmap_index_groups(index_values: list, bitmaps: np.ndarray, rows: int) -> dict[Any, np.ndarray]:
+    """Get the rows of every distinct value from a bitmap index.
+
+    Args:
+        index_values (list): The distinct values.
+        bitmaps (np.ndarray): The bitmaps of the values.
+        rows (int): Number of rows.
+
+    Returns:
+        dict[Any, np.ndarray]: The row numbers of every value that occurs.
+    """
+    res = {val: np.flatnonzero(np.unpackbits(bitmaps[position], count=rows)) for position, val in enumerate(index_values)}
+    return {key: val for key, val in res.items() if len(val)}
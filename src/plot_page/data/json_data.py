@@ -21,12 +21,16 @@ def read_json(json_path: str) -> dict:
 
 
 #####################################################################################################################################################
-def write_json(json_path: str, data: dict) -> None:
+def write_json(json_path: str, data: dict, sync: bool = False) -> None:
     """Write dict as json-File.
 
     Args:
         json_path (str): JSON-File path to store json-File.
         data (dict): The data that should be stored.
+        sync (bool): Wait until the file has been written to the disk.
     """
     with open(json_path, mode="w", encoding="utf-8") as json_file:
         json.dump(data, json_file)
+        if sync:
+            json_file.flush()
+            os.fsync(json_file.fileno())
@@ -1,48 +1,2040 @@
-"""This file is used for storing and loading panda dataframes."""
+"""This file is used for storing and loading panda dataframes.
 
+Every dataset is stored in its own directory inside DATAFRAME_STORE. The directory contains a meta file that describes the columns and one
+file per column, so that a dataset can be loaded partially by selecting only the needed columns. Loaded columns are kept in a memory bounded
+LRU cache, so that following callbacks on the same dataset do not read the files again. A catalog file describes all stored datasets, so
+that listing the datasets never needs to read the data itself.
+
+The rows of a dataset are stored in chunks with per column statistics (minimum, maximum, missing values), so that simple filters can skip
+whole chunks before any data is read. Every chunk can be compressed with the codec that has been selected for the dataset. New rows can be
+appended as additional chunks, small chunks are merged by a background compaction.
+
+Datasets can be stored with memory mapping enabled. Their numeric columns are then mapped into memory with numpy.memmap instead of being read,
+so that all server worker processes share the same pages of the operating system page cache.
+
+Uploaded datasets can be persisted write-behind: they are served from memory while a background writer thread stores them, all queued writes
+are flushed when the interpreter exits.
+"""
+
+import atexit
+import contextlib
+import copy
+import functools
+import itertools
+import logging
 import os
+import pickle
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from plot_page.data.codecs import available_codecs, compress, decompress, resolve_codec
+from plot_page.data.column_index import (
+    BITMAP_MAX_VALUES,
+    append_bitmap_index,
+    append_sorted_index,
+    bitmap_index_groups,
+    bitmap_index_mask,
+    build_bitmap_index,
+    build_sorted_index,
+    index_kind,
+    sorted_index_mask,
+)
+from plot_page.data.json_data import read_json, write_json
+from plot_page.data.summary import column_summary, merge_summaries, public_summary
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+DATAFRAME_STORE = os.path.join(".", "Data")
+os.makedirs(DATAFRAME_STORE, exist_ok=True)
+
+META_FILE = "_meta.json"
+SUMMARY_FILE = "_summary.json"
+CATALOG_FILE = os.path.join(DATAFRAME_STORE, "_catalog.json")
+CATALOG_LOCK_FILE = f"{CATALOG_FILE}.lock"
+LEGACY_SUFFIX = ".pkl"
+REPLACED_SUFFIX = ".old.tmp"
+RAW_DTYPE_KINDS = "biufcmM"
+CACHE_MAX_BYTES = 1024**3
+MEMORY_MAP_DEFAULT = os.name != "nt"
+CHUNK_ROWS = 1_000_000
+CODEC_DEFAULT = "none"
+COMPACTION_SMALL_CHUNKS = 8
+PERSISTENCE_QUEUE_DEPTH = 8
+try:
+    MEMORY_BUDGET_BYTES = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2
+except (AttributeError, OSError, ValueError):
+    MEMORY_BUDGET_BYTES = 8 * 1024**3
+FILTER_OPERATORS = {
+    "==": lambda min_value, max_value, value: min_value <= value <= max_value,
+    ">": lambda min_value, max_value, value: max_value > value,
+    ">=": lambda min_value, max_value, value: max_value >= value,
+    "<": lambda min_value, max_value, value: min_value < value,
+    "<=": lambda min_value, max_value, value: min_value <= value,
+    "in": lambda min_value, max_value, value: any(min_value <= val <= max_value for val in value),
+}
+
+
+#####################################################################################################################################################
+class DataFrameCache:
+    """LRU cache for loaded columns that is limited by the memory usage of the cached values.
+
+    Every entry belongs to a dataset version, entries of an older version are treated as missing.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_bytes (int): The maximal number of bytes that can be cached.
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[int, pd.Series | np.ndarray, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name_dataset: str, column: str, version: int) -> pd.Series | np.ndarray | None:
+        """Get a cached column.
+
+        Args:
+            name_dataset (str): Name of the dataset.
+            column (str): Name of the column.
+            version (int): The current version of the dataset.
+
+        Returns:
+            pd.Series | np.ndarray | None: The cached values or None if the column is not cached in this version.
+        """
+        with self._lock:
+            entry = self._entries.get((name_dataset, column))
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((name_dataset, column))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, name_dataset: str, column: str, version: int, values: pd.Series | np.ndarray) -> None:
+        """Add a column to the cache and evict the least recently used columns if the budget is exceeded.
+
+        Args:
+            name_dataset (str): Name of the dataset.
+            column (str): Name of the column.
+            version (int): The version of the dataset the values belong to.
+            values (pd.Series | np.ndarray): The loaded values.
+        """
+        size = int(pd.Series(values, copy=False).memory_usage(index=False, deep=True))
+        with self._lock:
+            self._remove((name_dataset, column))
+            if size > self.max_bytes:
+                return
+            self._entries[(name_dataset, column)] = (version, values, size)
+            self.current_bytes += size
+            self._evict()
+
+    def invalidate(self, name_dataset: str) -> None:
+        """Remove all cached columns of a dataset.
+
+        Args:
+            name_dataset (str): Name of the dataset.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == name_dataset]:
+                self._remove(key)
+
+    def resize(self, max_bytes: int) -> None:
+        """Change the memory budget of the cache.
+
+        Args:
+            max_bytes (int): The maximal number of bytes that can be cached.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def statistics(self) -> dict[str, int]:
+        """Get the counters of the cache.
+
+        Returns:
+            dict[str, int]: Hits, misses, evictions, number of entries and the used and available bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def dataset_bytes(self) -> dict[str, int]:
+        """Get the number of bytes the cached columns of every dataset use.
+
+        Returns:
+            dict[str, int]: The cached bytes of every dataset with cached columns.
+        """
+        res: dict[str, int] = {}
+        with self._lock:
+            for (name_dataset, _), (_, _, size) in self._entries.items():
+                res[name_dataset] = res.get(name_dataset, 0) + size
+        return res
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+    def _evict(self) -> None:
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+
+class PersistenceQueue:
+    """Bounded queue of datasets that are stored by a background writer thread.
+
+    Queued datasets are served from memory until they have been written. Adding a dataset blocks while the queue is full, so that the
+    memory used by datasets that have not been written yet stays bounded.
+    """
+
+    def __init__(self, max_depth: int) -> None:
+        """Create the queue, the writer thread is started with the first dataset.
+
+        Args:
+            max_depth (int): Maximum number of queued datasets.
+        """
+        self.queue: queue.Queue = queue.Queue(max_depth)
+        self.frames: dict[str, pd.DataFrame] = {}
+        self.sizes: dict[str, int] = {}
+        self.states: dict[str, str] = {}
+        self.condition = threading.Condition()
+        self.writer: threading.Thread | None = None
+
+    ###############################################################################################################################################
+    def submit(self, data: pd.DataFrame, name_dataset: str, memory_map: bool | None, codec: str | None) -> None:
+        """Queue a dataset for storing.
+
+        Args:
+            data (pd.DataFrame): The dataframe that should be stored.
+            name_dataset (str): The name that should be used to store the data.
+            memory_map (bool | None): Passed to store_dataframe.
+            codec (str | None): Passed to store_dataframe.
+        """
+        with self.condition:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._write, name="dataframe-writer", daemon=True)
+                self.writer.start()
+            self.frames[name_dataset] = data
+            self.sizes[name_dataset] = _frame_memory(data)
+            self.states[name_dataset] = "queued"
+        self.queue.put((data, name_dataset, memory_map, codec))
+
+    ###############################################################################################################################################
+    def get(self, name_dataset: str) -> pd.DataFrame | None:
+        """Get a dataset that has not been written yet.
+
+        Args:
+            name_dataset (str): Name of the dataset.
+
+        Returns:
+            pd.DataFrame | None: The dataset or None if it is not queued.
+        """
+        with self.condition:
+            return self.frames.get(name_dataset)
+
+    ###############################################################################################################################################
+    def pending_bytes(self) -> dict[str, int]:
+        """Get the number of bytes the datasets use that have not been written yet.
+
+        Returns:
+            dict[str, int]: The memory usage of every queued dataset.
+        """
+        with self.condition:
+            return {key: self.sizes[key] for key in self.frames}
+
+    ###############################################################################################################################################
+    def state(self, name_dataset: str) -> str | None:
+        """Get the persistence state of a dataset.
+
+        Args:
+            name_dataset (str): Name of the dataset.
+
+        Returns:
+            str | None: "queued", "writing", "persisted" or "failed" or None if the dataset has never been queued.
+        """
+        with self.condition:
+            return self.states.get(name_dataset)
+
+    ###############################################################################################################################################
+    def wait(self, name_dataset: str, timeout: float | None = None) -> bool:
+        """Wait until a dataset has been written. Returns at once if it is called by the writer thread.
+
+        Args:
+            name_dataset (str): Name of the dataset.
+            timeout (float | None): Maximum time to wait in seconds, wait without limit if None.
+
+        Returns:
+            bool: True if the dataset is not queued anymore.
+        """
+        if threading.current_thread() is self.writer:
+            return True
+        with self.condition:
+            return self.condition.wait_for(lambda: self.states.get(name_dataset) not in ("queued", "writing"), timeout)
+
+    ###############################################################################################################################################
+    def flush(self) -> None:
+        """Wait until all queued datasets have been written."""
+        if self.writer is not None:
+            self.queue.join()
+
+    ###############################################################################################################################################
+    def _write(self) -> None:
+        """Store the queued datasets, runs in the writer thread."""
+        while True:
+            data, name_dataset, memory_map, codec = self.queue.get()
+            with self.condition:
+                if self.frames.get(name_dataset) is data:
+                    self.states[name_dataset] = "writing"
+            try:
+                store_dataframe(data, name_dataset, memory_map, codec)
+                state = "persisted"
+            except Exception:
+                logging.getLogger(__name__).exception("Dataset %s could not be stored", name_dataset)
+                state = "failed"
+            with self.condition:
+                if self.frames.get(name_dataset) is data:
+                    self.states[name_dataset] = state
+                    if state == "persisted":
+                        del self.frames[name_dataset]
+                        del self.sizes[name_dataset]
+                self.condition.notify_all()
+            self.queue.task_done()
+
+
+DATAFRAME_CACHE = DataFrameCache(CACHE_MAX_BYTES)
+PERSISTENCE_QUEUE = PersistenceQueue(PERSISTENCE_QUEUE_DEPTH)
+atexit.register(PERSISTENCE_QUEUE.flush)
+CATALOG_LOCK = threading.Lock()
+DATASET_LOCKS: dict[str, threading.RLock] = {}
+DATASET_LOCKS_LOCK = threading.Lock()
+LOAD_RETRIES = 3
+LOAD_RETRY_DELAY = 0.01
+
+
+#####################################################################################################################################################
+def check_dataset_name(name_dataset: str) -> None:
+    """Check that a dataset name can be used as directory name inside DATAFRAME_STORE.
+
+    Names that start with "_" or end with ".tmp" are reserved for the catalog, the temporary directories and the job directories of the store.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Raises:
+        ValueError: The name is empty, "." or "..", contains a path separator or is reserved.
+    """
+    if not isinstance(name_dataset, str) or name_dataset.strip() in ["", ".", ".."]:
+        raise ValueError(f"Invalid dataset name {name_dataset!r}")
+    if any(val in name_dataset for val in ["/", "\\", "\0"]):
+        raise ValueError(f"Invalid dataset name {name_dataset!r}, it must not contain path separators")
+    if name_dataset.startswith("_") or name_dataset.endswith(".tmp"):
+        raise ValueError(f"Invalid dataset name {name_dataset!r}, names that start with '_' or end with '.tmp' are reserved")
+
+
+#####################################################################################################################################################
+def _dataset_path(name_dataset: str) -> str:
+    """Get the directory of a stored dataset.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        str: Path of the dataset directory.
+    """
+    return os.path.join(DATAFRAME_STORE, name_dataset)
+
+
+#####################################################################################################################################################
+def _legacy_path(name_dataset: str) -> str:
+    """Get the path of a dataset that has been stored as a single pickle file.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        str: Path of the pickle file.
+    """
+    return os.path.join(DATAFRAME_STORE, f"{name_dataset}{LEGACY_SUFFIX}")
+
+
+#####################################################################################################################################################
+def _dataset_lock(name_dataset: str) -> threading.RLock:
+    """Get the lock that serializes writes to a dataset.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        threading.RLock: The lock of the dataset.
+    """
+    with DATASET_LOCKS_LOCK:
+        return DATASET_LOCKS.setdefault(name_dataset, threading.RLock())
+
+
+#####################################################################################################################################################
+def _dataset_version(name_dataset: str) -> int:
+    """Get the version of a stored dataset.
+
+    The version is the modification time of the meta file, it changes every time the dataset is stored again.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        int: The version of the dataset.
+    """
+    meta_path = os.path.join(_dataset_path(name_dataset), META_FILE)
+    return os.stat(meta_path if os.path.exists(meta_path) else _legacy_path(name_dataset)).st_mtime_ns
+
+
+#####################################################################################################################################################
+@functools.lru_cache(maxsize=256)
+def _read_meta(name_dataset: str, version: int) -> dict:
+    """Read the meta file of a dataset.
+
+    The parsed meta file is cached for every version, because it contains the chunk statistics and can become large.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        version (int): The current version of the dataset.
+
+    Returns:
+        dict: The content of the meta file or an empty dict if the dataset is stored as legacy pickle file.
+    """
+    return read_json(os.path.join(_dataset_path(name_dataset), META_FILE))
+
+
+#####################################################################################################################################################
+@functools.lru_cache(maxsize=256)
+def _read_summary(name_dataset: str, version: int) -> list[dict] | None:
+    """Read the column summaries of a dataset, see plot_page.data.summary.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        version (int): The current version of the dataset.
+
+    Returns:
+        list[dict] | None: The summary of every column in the order of the meta file or None if the dataset has no summary file.
+    """
+    summary_path = os.path.join(_dataset_path(name_dataset), SUMMARY_FILE)
+    return read_json(summary_path)["columns"] if os.path.exists(summary_path) else None
+
+
+#####################################################################################################################################################
+def _write_summary(dataset_path: str, summaries: list[dict]) -> None:
+    """Replace the summary file of a dataset.
+
+    Args:
+        dataset_path (str): The directory of the dataset.
+        summaries (list[dict]): The summary of every column in the order of the meta file.
+    """
+    tmp_path = os.path.join(dataset_path, f"{SUMMARY_FILE}.tmp")
+    write_json(tmp_path, {"columns": summaries}, sync=True)
+    os.replace(tmp_path, os.path.join(dataset_path, SUMMARY_FILE))
+
+
+#####################################################################################################################################################
+def _write_meta(dataset_path: str, meta: dict) -> None:
+    """Replace the meta file of a dataset, this changes the version of the dataset.
+
+    Args:
+        dataset_path (str): The directory of the dataset.
+        meta (dict): The new meta file content.
+    """
+    write_json(os.path.join(dataset_path, f"{META_FILE}.tmp"), meta, sync=True)
+    os.replace(os.path.join(dataset_path, f"{META_FILE}.tmp"), os.path.join(dataset_path, META_FILE))
+    _sync_directory(dataset_path)
+
+
+#####################################################################################################################################################
+def _link_file(source_path: str, file_path: str) -> None:
+    """Link a file into another directory or copy it if it can not be linked.
+
+    Args:
+        source_path (str): The existing file.
+        file_path (str): The path of the linked file.
+    """
+    try:
+        os.link(source_path, file_path)
+    except OSError:
+        shutil.copyfile(source_path, file_path)
+        with open(file_path, mode="rb") as copied_file:
+            os.fsync(copied_file.fileno())
+
+
+#####################################################################################################################################################
+@functools.lru_cache(maxsize=64)
+def _read_index(name_dataset: str, version: int, column: str) -> tuple[dict, list[np.ndarray]] | None:
+    """Read the index of a column, see plot_page.data.column_index.
+
+    The index files are memory mapped if the dataset uses memory mapping, so only the searched parts are read.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        version (int): The current version of the dataset.
+        column (str): Name of the column.
+
+    Returns:
+        tuple[dict, list[np.ndarray]] | None: The index entry of the meta file and the index arrays or None if the column has no index.
+    """
+    meta = _read_meta(name_dataset, version)
+    entry = next((val for val in meta.get("indexes", []) if val["column"] == column), None)
+    if entry is None:
+        return None
+    dataset_path = _dataset_path(name_dataset)
+    mmap_mode = "r" if meta["memory_map"] else None
+    return entry, [np.load(os.path.join(dataset_path, val), mmap_mode=mmap_mode, allow_pickle=False) for val in entry["files"]]
+
+
+#####################################################################################################################################################
+def _write_index(values: pd.Series, dataset_path: str, position: int, kind: str, stored: tuple | None = None, rows: int = 0) -> dict:
+    """Build the index of a column or extend a stored index by appended rows and write it to new files.
+
+    Args:
+        values (pd.Series): All values of the column or the values of the appended rows if stored is set.
+        dataset_path (str): The directory of the dataset.
+        position (int): Position of the column in the dataset.
+        kind (str): "sorted" or "bitmap".
+        stored (tuple | None): The stored index as returned by _read_index, a new index is built if None.
+        rows (int): Number of stored rows.
+
+    Raises:
+        ValueError: The kind is unknown or does not fit the column.
+
+    Returns:
+        dict: The index entry of the meta file.
+    """
+    entry = {"column": values.name, "kind": kind}
+    if kind == "sorted":
+        arrays = build_sorted_index(values) if stored is None else append_sorted_index(*stored[1], values)
+    elif kind == "bitmap":
+        entry["values"], bitmaps = (
+            build_bitmap_index(values) if stored is None else append_bitmap_index(stored[0]["values"], stored[1][0], rows, values)
+        )
+        arrays = [bitmaps]
+    else:
+        raise ValueError(f"Unknown index kind {kind}, use 'sorted' or 'bitmap'")
+    entry["files"] = []
+    for part, array in enumerate(arrays):
+        file_name = f"{position}.{time.time_ns()}.{kind}{part}.npy"
+        with open(os.path.join(dataset_path, file_name), mode="wb") as index_file:
+            np.save(index_file, np.ascontiguousarray(array), allow_pickle=False)
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        entry["files"].append(file_name)
+    return entry
+
+
+#####################################################################################################################################################
+def _is_raw_dtype(dtype) -> bool:
+    """Check if a column can be stored as raw numpy array.
+
+    Args:
+        dtype: The dtype of the column.
+
+    Returns:
+        bool: True if the values can be written without pickle.
+    """
+    return isinstance(dtype, np.dtype) and dtype.kind in RAW_DTYPE_KINDS
+
+
+#####################################################################################################################################################
+def _chunk_bounds(chunks: list[int]) -> list[int]:
+    """Get the first row of every chunk and the total number of rows.
+
+    Args:
+        chunks (list[int]): Number of rows of every chunk.
+
+    Returns:
+        list[int]: The start rows of the chunks followed by the number of rows.
+    """
+    return [0] + list(itertools.accumulate(chunks))
+
+
+#####################################################################################################################################################
+def _column_statistics(values: pd.Series) -> dict:
+    """Calculate the statistics of a column chunk that are used to skip chunks when loading filtered data.
+
+    Args:
+        values (pd.Series): The values of the chunk.
+
+    Returns:
+        dict: Number of missing values and the minimal and maximal value, if they can be compared.
+    """
+    res = {"nulls": int(values.isna().sum()), "min": None, "max": None}
+    if res["nulls"] == len(values):
+        return res
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        values = pd.Series(values.cat.categories[np.unique(codes[codes >= 0])])
+    if not (values.dtype.kind in "biuf" or pd.api.types.is_string_dtype(values.dtype)):
+        return res
+    try:
+        min_value, max_value = values.min(), values.max()
+    except TypeError:
+        return res
+    min_value = min_value.item() if isinstance(min_value, np.generic) else min_value
+    max_value = max_value.item() if isinstance(max_value, np.generic) else max_value
+    if isinstance(min_value, (bool, int, float, str)) and isinstance(max_value, (bool, int, float, str)):
+        res["min"], res["max"] = min_value, max_value
+    return res
+
+
+#####################################################################################################################################################
+def _sync_directory(directory: str) -> None:
+    """Wait until the entries of a directory, e.g. a renamed file, have been written to the disk.
+
+    Directories can not be opened on Windows, the entries are written with the files there.
+
+    Args:
+        directory (str): Path of the directory.
+    """
+    if os.name == "nt":
+        return
+    file_descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(file_descriptor)
+    finally:
+        os.close(file_descriptor)
+
+
+#####################################################################################################################################################
+def _write_column(column: pd.Series, file_path: str, chunks: list[int], codec: str, append: bool = False) -> dict:
+    """Write a single column to a file.
+
+    Uncompressed raw columns are written as one contiguous array. All other columns are written chunk by chunk, the byte offsets of the chunks
+    are stored in the returned description. The function returns after the file has been written to the disk.
+
+    Args:
+        column (pd.Series): The column that should be stored.
+        file_path (str): The path of the column file.
+        chunks (list[int]): Number of rows of every chunk.
+        codec (str): The compression codec of the dataset.
+        append (bool): Append the chunks to an existing column file.
+
+    Returns:
+        dict: Description of the stored column for the meta file.
+    """
+    bounds = _chunk_bounds(chunks)
+    stats = [_column_statistics(column.iloc[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])]
+    raw = _is_raw_dtype(column.dtype)
+    if raw and codec == "none":
+        with open(file_path, mode="ab" if append else "wb") as column_file:
+            np.ascontiguousarray(column.to_numpy()).tofile(column_file)
+            column_file.flush()
+            os.fsync(column_file.fileno())
+        return {"dtype": column.dtype.str, "kind": "raw", "stats": stats}
+
+    with open(file_path, mode="ab" if append else "wb") as column_file:
+        offsets = [column_file.tell()]
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if raw:
+                block = np.ascontiguousarray(column.iloc[start:stop].to_numpy()).tobytes()
+            else:
+                block = pickle.dumps(column.iloc[start:stop].reset_index(drop=True), protocol=pickle.HIGHEST_PROTOCOL)
+            column_file.write(compress(codec, block))
+            offsets.append(column_file.tell())
+        column_file.flush()
+        os.fsync(column_file.fileno())
+    return {"dtype": column.dtype.str if raw else str(column.dtype), "kind": "raw" if raw else "pickle", "offsets": offsets, "stats": stats}
+
+
+#####################################################################################################################################################
+def _read_column(file_path: str, column_meta: dict, chunks: list[int], selected_chunks: list[int] | None, memory_map: bool, codec: str):
+    """Read a single column file.
+
+    Args:
+        file_path (str): The path of the column file.
+        column_meta (dict): Description of the column from the meta file.
+        chunks (list[int]): Number of rows of every chunk.
+        selected_chunks (list[int] | None): Only read these chunks. All chunks are read if None.
+        memory_map (bool): Map uncompressed raw columns into memory instead of reading them.
+        codec (str): The compression codec of the dataset.
+
+    Returns:
+        np.ndarray | pd.api.extensions.ExtensionArray: The loaded column values, raw columns are read-only.
+    """
+    selected_chunks = list(range(len(chunks))) if selected_chunks is None else selected_chunks
+    if "offsets" in column_meta:
+        offsets = column_meta["offsets"]
+        with open(file_path, mode="rb") as column_file:
+            blocks = []
+            for chunk in selected_chunks or [0]:
+                column_file.seek(offsets[chunk])
+                blocks.append(decompress(codec, column_file.read(offsets[chunk + 1] - offsets[chunk])))
+        if column_meta["kind"] == "raw":
+            parts = [np.frombuffer(block, dtype=np.dtype(column_meta["dtype"])) for block in blocks]
+            values = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            values.setflags(write=False)
+            return values if selected_chunks else values[:0]
+        parts = [pickle.loads(block) for block in blocks]
+        if len(parts) > 1 and all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            values = pd.Series(union_categoricals(parts))
+        else:
+            values = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        return values.array if selected_chunks else values.array[:0]
+
+    dtype = np.dtype(column_meta["dtype"])
+    ranges = _chunk_ranges(chunks, selected_chunks)
+    if memory_map and sum(chunks) > 0:
+        mapped_values = np.memmap(file_path, dtype=dtype, mode="r", shape=(sum(chunks),))
+        parts = [mapped_values[start:stop] for start, stop in ranges]
+    else:
+        with open(file_path, mode="rb") as column_file:
+            parts = []
+            for start, stop in ranges:
+                column_file.seek(start * dtype.itemsize)
+                parts.append(np.fromfile(column_file, dtype=dtype, count=stop - start))
+    values = parts[0] if len(parts) == 1 else np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+    values.setflags(write=False)
+    return values
+
+
+#####################################################################################################################################################
+def _chunk_ranges(chunks: list[int], selected_chunks: list[int]) -> list[tuple[int, int]]:
+    """Merge the selected chunks to contiguous row ranges.
+
+    Args:
+        chunks (list[int]): Number of rows of every chunk.
+        selected_chunks (list[int]): The selected chunks in ascending order.
+
+    Returns:
+        list[tuple[int, int]]: Start and stop row of every contiguous range.
+    """
+    bounds = _chunk_bounds(chunks)
+    res = []
+    for chunk in selected_chunks:
+        if res and res[-1][1] == bounds[chunk]:
+            res[-1] = (res[-1][0], bounds[chunk + 1])
+        else:
+            res.append((bounds[chunk], bounds[chunk + 1]))
+    return res
+
+
+#####################################################################################################################################################
+def _chunk_may_match(stats: dict | None, chunk_rows: int, operator: str, value: Any) -> bool:
+    """Check if a chunk might contain rows that fulfill the filter.
+
+    Args:
+        stats (dict | None): The statistics of the column chunk.
+        chunk_rows (int): Number of rows of the chunk.
+        operator (str): The filter operator, one of FILTER_OPERATORS.
+        value (Any): The value the column is compared to.
+
+    Returns:
+        bool: False if no row of the chunk can fulfill the filter.
+    """
+    if stats is None or value is None:
+        return True
+    if stats["nulls"] == chunk_rows:
+        return False
+    if stats["min"] is None:
+        return True
+    try:
+        return FILTER_OPERATORS[operator](stats["min"], stats["max"], value)
+    except TypeError:
+        return True
+
+
+#####################################################################################################################################################
+def _select_chunks(meta: dict, column_meta: dict[str, dict], filters: list[tuple[str, str, Any]] | None) -> list[int] | None:
+    """Select the chunks that might contain rows which fulfill all filters.
+
+    Args:
+        meta (dict): The meta file content of the dataset.
+        column_meta (dict[str, dict]): Description of every column.
+        filters (list[tuple[str, str, Any]] | None): Filters as tuples of column, operator and value.
+
+    Returns:
+        list[int] | None: The selected chunks or None if all chunks are needed.
+    """
+    if not filters:
+        return None
+    selected_chunks = [
+        chunk
+        for chunk, chunk_rows in enumerate(meta["chunks"])
+        if all(
+            _chunk_may_match(column_meta[column]["stats"][chunk], chunk_rows, operator, value)
+            for column, operator, value in filters
+            if column in column_meta
+        )
+    ]
+    return None if len(selected_chunks) == len(meta["chunks"]) else selected_chunks
+
+
+#####################################################################################################################################################
+def _row_chunks(chunks: list[int], rows: np.ndarray) -> list[int]:
+    """Select the chunks that contain the given row numbers.
+
+    Args:
+        chunks (list[int]): Number of rows of every chunk.
+        rows (np.ndarray): Row numbers inside the dataset.
+
+    Returns:
+        list[int]: The chunks of the rows in ascending order.
+    """
+    return np.unique(np.searchsorted(_chunk_bounds(chunks), rows, side="right") - 1).tolist()
+
+
+#####################################################################################################################################################
+def _frame_memory(data: pd.DataFrame) -> int:
+    """Get the number of bytes a dataframe uses in memory, including the values of strings and objects.
+
+    Args:
+        data (pd.DataFrame): The dataframe.
+
+    Returns:
+        int: The memory usage without the index.
+    """
+    return int(data.memory_usage(index=False, deep=True).sum())
+
+
+#####################################################################################################################################################
+def _meta_memory(meta: dict, dataset_path: str) -> int:
+    """Get the number of bytes a stored dataset uses when it is loaded.
+
+    Datasets that have been stored without their memory usage are estimated by the size of the raw columns and the file size of all other
+    columns.
+
+    Args:
+        meta (dict): The meta file of the dataset.
+        dataset_path (str): The directory of the dataset.
+
+    Returns:
+        int: The memory usage of the loaded dataset.
+    """
+    if "memory_bytes" in meta:
+        return meta["memory_bytes"]
+    return sum(
+        meta["rows"] * np.dtype(val["dtype"]).itemsize if val["kind"] == "raw" else os.path.getsize(os.path.join(dataset_path, val["file"]))
+        for val in meta["columns"]
+    )
+
+
+#####################################################################################################################################################
+def _write_dataset(data: pd.DataFrame, dataset_path: str, memory_map: bool, codec: str, indexes: dict[str, str] | None = None) -> dict:
+    """Write the columns, the column summaries, the column indexes and the meta file of a dataset into a directory.
+
+    Args:
+        data (pd.DataFrame): The dataframe that should be stored.
+        dataset_path (str): The directory the dataset is written to.
+        memory_map (bool): Load the uncompressed numeric columns of this dataset with numpy.memmap.
+        codec (str): The compression codec of the dataset.
+        indexes (dict[str, str] | None): The index kind of every column that should be indexed. Indexes that do not fit are skipped.
+
+    Returns:
+        dict: The written meta file content.
+    """
+    os.makedirs(dataset_path)
+    chunks = [min(CHUNK_ROWS, len(data) - start) for start in range(0, len(data), CHUNK_ROWS)] or [0]
+    columns = []
+    for position, column_name in enumerate(data.columns):
+        column_file = f"{position}.col"
+        column_meta = _write_column(data.iloc[:, position], os.path.join(dataset_path, column_file), chunks, codec)
+        columns.append({"name": column_name, "file": column_file} | column_meta)
+    _write_summary(dataset_path, [column_summary(data.iloc[:, position]) for position in range(len(data.columns))])
+    meta = {"rows": len(data), "chunks": chunks, "memory_map": memory_map, "codec": codec, "columns": columns, "memory_bytes": _frame_memory(data)}
+    for column_name, kind in (indexes or {}).items():
+        if column_name not in data.columns:
+            continue
+        try:
+            index_entry = _write_index(data[column_name], dataset_path, data.columns.get_loc(column_name), kind)
+        except ValueError as error:
+            logging.getLogger(__name__).warning("Index of column %s is dropped: %s", column_name, error)
+            continue
+        meta.setdefault("indexes", []).append(index_entry)
+    write_json(os.path.join(dataset_path, META_FILE), meta, sync=True)
+    _sync_directory(dataset_path)
+    return meta
+
+
+#####################################################################################################################################################
+def _replace_dataset(name_dataset: str, tmp_path: str) -> None:
+    """Replace a stored dataset by a completely written dataset directory.
+
+    The old directory is renamed aside before the new one is moved into place and is only removed afterwards, so that the dataset always
+    exists either in its old or in its new version. The new directory has to be written to the disk already. An old directory that is left
+    over after an interruption is restored or removed by _recover_replaced_datasets. Has to be called while the lock of the dataset is held.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        tmp_path (str): The directory that contains the new version of the dataset.
+    """
+    dataset_path = _dataset_path(name_dataset)
+    old_path = f"{dataset_path}{REPLACED_SUFFIX}"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.isdir(dataset_path):
+        os.replace(dataset_path, old_path)
+    os.replace(tmp_path, dataset_path)
+    _sync_directory(DATAFRAME_STORE)
+    if os.path.exists(_legacy_path(name_dataset)):
+        os.remove(_legacy_path(name_dataset))
+    shutil.rmtree(old_path, ignore_errors=True)
+    DATAFRAME_CACHE.invalidate(name_dataset)
+    _update_catalog(name_dataset, _catalog_entry(name_dataset))
+
+
+#####################################################################################################################################################
+def _recover_replaced_datasets() -> None:
+    """Clean up datasets whose replacement has been interrupted.
+
+    An old directory is moved back if the new directory has not been moved into place yet, otherwise it is removed.
+    """
+    for file_name in os.listdir(DATAFRAME_STORE):
+        if not file_name.endswith(REPLACED_SUFFIX):
+            continue
+        old_path = os.path.join(DATAFRAME_STORE, file_name)
+        dataset_path = old_path[: -len(REPLACED_SUFFIX)]
+        with _dataset_lock(os.path.basename(dataset_path)):
+            if os.path.isdir(dataset_path):
+                shutil.rmtree(old_path, ignore_errors=True)
+            elif os.path.isdir(old_path):
+                os.replace(old_path, dataset_path)
+
+
+#####################################################################################################################################################
+def store_dataframe(data: pd.DataFrame, name_dataset: str, memory_map: bool | None = None, codec: str | None = None) -> None:
+    """This function is used to store data column by column.
+
+    The rows are split in chunks of CHUNK_ROWS rows and the minimum, maximum and number of missing values of every column chunk are stored,
+    so that chunks can be skipped when filtered data is loaded. The index of the dataframe is not stored, a loaded dataframe always has a
+    default index. Memory mapping is disabled by default on Windows, because mapped files can not be replaced or removed there while a process
+    still uses them. A dataset that is stored again keeps its codec and memory mapping unless they are given, and its column indexes are built
+    again for the new data, see create_index.
+
+    Args:
+        data (pd.DataFrame): The dataframe that should be stored.
+        name_dataset (str): The name that should be used to store the data.
+        memory_map (bool | None): Load the numeric columns of this dataset with numpy.memmap. The setting of the existing dataset or
+            MEMORY_MAP_DEFAULT is used if None.
+        codec (str | None): Compression codec or codec alias, see plot_page.data.codecs. The codec of the existing dataset or CODEC_DEFAULT is
+            used if None.
+
+    Raises:
+        ValueError: The name of the dataset is invalid, see check_dataset_name.
+    """
+    check_dataset_name(name_dataset)
+    PERSISTENCE_QUEUE.wait(name_dataset)
+    dataset_path = _dataset_path(name_dataset)
+    tmp_path = f"{dataset_path}.tmp"
+    with _dataset_lock(name_dataset):
+        meta = _stored_meta(name_dataset)
+        memory_map = meta.get("memory_map", MEMORY_MAP_DEFAULT) if memory_map is None else memory_map
+        codec = meta.get("codec", CODEC_DEFAULT) if codec is None else codec
+        indexes = {val["column"]: val["kind"] for val in meta.get("indexes", [])}
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        _write_dataset(data, tmp_path, memory_map, resolve_codec(codec), indexes)
+
+        _replace_dataset(name_dataset, tmp_path)
+
+
+#####################################################################################################################################################
+def store_dataframe_async(data: pd.DataFrame, name_dataset: str, memory_map: bool | None = None, codec: str | None = None) -> None:
+    """Store a dataframe write-behind.
+
+    The dataframe is served from memory until the background writer has stored it. The call blocks only while PERSISTENCE_QUEUE_DEPTH
+    datasets are already waiting to be written.
+
+    Args:
+        data (pd.DataFrame): The dataframe that should be stored.
+        name_dataset (str): The name that should be used to store the data.
+        memory_map (bool | None): Load the numeric columns of this dataset with numpy.memmap, see store_dataframe.
+        codec (str | None): Compression codec or codec alias, see store_dataframe.
+
+    Raises:
+        ValueError: The name of the dataset is invalid, see check_dataset_name.
+    """
+    check_dataset_name(name_dataset)
+    PERSISTENCE_QUEUE.submit(data.reset_index(drop=True), name_dataset, memory_map, codec)
+
+
+#####################################################################################################################################################
+def get_persistence_state(name_dataset: str) -> str | None:
+    """Get whether a dataset has already been written to disk.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        str | None: "queued", "writing", "persisted" or "failed" or None if the dataset does not exist.
+    """
+    state = PERSISTENCE_QUEUE.state(name_dataset)
+    if state is None and name_dataset in read_catalog():
+        return "persisted"
+    return state
+
+
+#####################################################################################################################################################
+def flush_persistence(timeout: float | None = None) -> bool:
+    """Wait until all datasets that are stored write-behind have been written.
+
+    Args:
+        timeout (float | None): Maximum time to wait in seconds, wait without limit if None.
+
+    Returns:
+        bool: True if all datasets have been written.
+    """
+    if timeout is None:
+        PERSISTENCE_QUEUE.flush()
+        return True
+    flush_thread = threading.Thread(target=PERSISTENCE_QUEUE.flush, daemon=True)
+    flush_thread.start()
+    flush_thread.join(timeout)
+    return not flush_thread.is_alive()
+
+
+#####################################################################################################################################################
+def _cast_to_schema(data: pd.DataFrame, meta: dict, name_dataset: str) -> pd.DataFrame:
+    """Convert new rows to the dtypes of a stored dataset.
+
+    Args:
+        data (pd.DataFrame): The new rows.
+        meta (dict): The meta file content of the stored dataset.
+        name_dataset (str): Name of the stored dataset.
+
+    Raises:
+        ValueError: The columns differ or a column can not be converted without losing information.
+
+    Returns:
+        pd.DataFrame: The converted rows.
+    """
+    column_names = [val["name"] for val in meta["columns"]]
+    if sorted(map(str, data.columns)) != sorted(map(str, column_names)):
+        raise ValueError(f"Columns {list(data.columns)} do not match the columns {column_names} of dataset {name_dataset}")
+
+    res = {}
+    for column_meta in meta["columns"]:
+        values = data[column_meta["name"]]
+        if column_meta["kind"] == "raw":
+            dtype = np.dtype(column_meta["dtype"])
+            compatible = len(values) == 0 or isinstance(values.dtype, np.dtype) and np.can_cast(values.dtype, dtype, casting="safe")
+            if not compatible and values.dtype.kind in "iu" and dtype.kind in "iu":
+                compatible = np.iinfo(dtype).min <= values.min() and values.max() <= np.iinfo(dtype).max
+            if not compatible and values.dtype.kind in "iuf" and dtype.kind == "f":
+                compatible = True
+            if not compatible:
+                raise ValueError(f"Column {column_meta['name']} with dtype {values.dtype} can not be appended to dtype {dtype}")
+            res[column_meta["name"]] = values.astype(dtype)
+            continue
+        try:
+            res[column_meta["name"]] = values.astype(pd.api.types.pandas_dtype(column_meta["dtype"]))
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"Column {column_meta['name']} with dtype {values.dtype} can not be appended to dtype {column_meta['dtype']}") from error
+    return pd.DataFrame(res)
+
+
+#####################################################################################################################################################
+def _widen_columns(data: pd.DataFrame, meta: dict, name_dataset: str) -> tuple[dict, list[str]]:
+    """Widen the stored numeric columns whose dtype can not hold the new rows, e.g. integers that get missing values.
+
+    Only the affected columns are written again, with the common dtype of the stored and the new values. They are written to new files, so
+    that the stored dataset stays valid until the returned meta file content is written.
+
+    Args:
+        data (pd.DataFrame): The new rows.
+        meta (dict): The meta file content of the stored dataset.
+        name_dataset (str): Name of the stored dataset.
+
+    Returns:
+        tuple[dict, list[str]]: The meta file content with the widened columns and the paths of the replaced column files.
+    """
+    dataset_path = _dataset_path(name_dataset)
+    new_meta = copy.deepcopy(meta)
+    replaced_files = []
+    for position, column_meta in enumerate(new_meta["columns"]):
+        values = data.get(column_meta["name"])
+        if column_meta["kind"] != "raw" or values is None or len(values) == 0 or not isinstance(values.dtype, np.dtype):
+            continue
+        dtype = np.dtype(column_meta["dtype"])
+        if dtype.kind not in "biuf" or values.dtype.kind not in "biuf" or np.can_cast(values.dtype, dtype, casting="safe"):
+            continue
+        if values.dtype.kind in "iu" and dtype.kind in "iu" and np.iinfo(dtype).min <= values.min() and values.max() <= np.iinfo(dtype).max:
+            continue
+        if dtype.kind == "f":
+            continue
+        column_path = os.path.join(dataset_path, column_meta["file"])
+        stored_values = _read_column(column_path, column_meta, meta["chunks"], None, False, meta.get("codec", "none"))
+        column_file = f"{position}.{time.time_ns()}.col"
+        widened = pd.Series(stored_values).astype(np.result_type(dtype, values.dtype))
+        column_meta.clear()
+        column_meta.update({"name": values.name, "file": column_file})
+        column_meta.update(_write_column(widened, os.path.join(dataset_path, column_file), meta["chunks"], meta.get("codec", "none")))
+        replaced_files.append(column_path)
+        logging.getLogger(__name__).info("Dataset %s: widened column %s from %s to %s", name_dataset, values.name, dtype, widened.dtype)
+    return new_meta, replaced_files
+
+
+#####################################################################################################################################################
+def append_dataframe(data: pd.DataFrame, name_dataset: str) -> None:
+    """Append rows to a stored dataset as new chunks without rewriting the existing chunks.
+
+    Numeric columns whose dtype can not hold the new values are widened, only these columns are written again. The column indexes are extended
+    by the new rows. A background compaction merges the chunks once more than COMPACTION_SMALL_CHUNKS chunks are smaller than CHUNK_ROWS.
+
+    Args:
+        data (pd.DataFrame): The new rows.
+        name_dataset (str): Name of the stored dataset.
+
+    Raises:
+        ValueError: The name is invalid, the dataset is a view or legacy file or the new rows do not match the schema of the dataset.
+    """
+    check_dataset_name(name_dataset)
+    PERSISTENCE_QUEUE.wait(name_dataset)
+    with _dataset_lock(name_dataset):
+        version = _dataset_version(name_dataset)
+        meta = _read_meta(name_dataset, version)
+        if not meta or "view" in meta:
+            raise ValueError(f"Rows can only be appended to datasets that are stored column by column, {name_dataset} is a view or legacy file")
+        _cast_to_schema(data.iloc[:0], meta, name_dataset)
+        new_meta, replaced_files = _widen_columns(data, meta, name_dataset)
+        data = _cast_to_schema(data, new_meta, name_dataset)
+        if len(data) == 0:
+            return
+
+        dataset_path = _dataset_path(name_dataset)
+        chunks = [min(CHUNK_ROWS, len(data) - start) for start in range(0, len(data), CHUNK_ROWS)]
+        for column_meta in new_meta["columns"]:
+            column_path = os.path.join(dataset_path, column_meta["file"])
+            if "offsets" in column_meta:
+                os.truncate(column_path, column_meta["offsets"][-1])
+            else:
+                os.truncate(column_path, new_meta["rows"] * np.dtype(column_meta["dtype"]).itemsize)
+            new_column_meta = _write_column(data[column_meta["name"]], column_path, chunks, new_meta.get("codec", "none"), append=True)
+            column_meta["stats"] += new_column_meta["stats"]
+            if "offsets" in column_meta:
+                column_meta["offsets"] += new_column_meta["offsets"][1:]
+        widened_bytes = sum(
+            meta["rows"] * (np.dtype(new["dtype"]).itemsize - np.dtype(old["dtype"]).itemsize)
+            for old, new in zip(meta["columns"], new_meta["columns"])
+            if new["kind"] == "raw" and new["dtype"] != old["dtype"]
+        )
+        new_meta["memory_bytes"] = _meta_memory(meta, dataset_path) + widened_bytes + _frame_memory(data)
+        column_names = [val["name"] for val in new_meta["columns"]]
+        for index_entry in new_meta.pop("indexes", []):
+            replaced_files += [os.path.join(dataset_path, val) for val in index_entry["files"]]
+            stored = _read_index(name_dataset, version, index_entry["column"])
+            position = column_names.index(index_entry["column"])
+            try:
+                new_entry = _write_index(data[index_entry["column"]], dataset_path, position, index_entry["kind"], stored, new_meta["rows"])
+            except ValueError as error:
+                logging.getLogger(__name__).warning("Dataset %s: index of column %s is dropped: %s", name_dataset, index_entry["column"], error)
+                continue
+            new_meta.setdefault("indexes", []).append(new_entry)
+        new_meta["rows"] += len(data)
+        new_meta["chunks"] += chunks
+
+        summaries = _read_summary(name_dataset, version)
+        _write_meta(dataset_path, new_meta)
+        for file_path in replaced_files:
+            os.remove(file_path)
+        if summaries is not None:
+            _write_summary(
+                dataset_path, [merge_summaries(val, column_summary(data[key["name"]])) for val, key in zip(summaries, new_meta["columns"])]
+            )
+        DATAFRAME_CACHE.invalidate(name_dataset)
+        _update_catalog(name_dataset, _catalog_entry(name_dataset))
+
+    if sum(val < CHUNK_ROWS for val in new_meta["chunks"]) > COMPACTION_SMALL_CHUNKS:
+        threading.Thread(target=compact_dataframe, args=(name_dataset,), daemon=True).start()
+
+
+#####################################################################################################################################################
+def compact_dataframe(name_dataset: str) -> None:
+    """Merge the chunks at the end of a dataset, that are smaller than CHUNK_ROWS, to chunks of CHUNK_ROWS rows.
+
+    Only the rows from the first small chunk on are read and written again. The compacted dataset is written into a temporary directory that
+    replaces the dataset, the unchanged start of every column file is copied byte by byte. Uncompressed raw columns and the column indexes are
+    linked, because the merged chunks contain the same bytes.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+    """
+    with _dataset_lock(name_dataset):
+        meta = _read_meta(name_dataset, _dataset_version(name_dataset))
+        if not meta or "view" in meta or sum(val < CHUNK_ROWS for val in meta["chunks"]) <= 1:
+            return
+        first_chunk = next(position for position, val in enumerate(meta["chunks"]) if val < CHUNK_ROWS)
+        tail_chunks = list(range(first_chunk, len(meta["chunks"])))
+        prefix_rows = sum(meta["chunks"][:first_chunk])
+        tail_rows = meta["rows"] - prefix_rows
+        chunks = [min(CHUNK_ROWS, tail_rows - start) for start in range(0, tail_rows, CHUNK_ROWS)]
+        bounds = _chunk_bounds(chunks)
+        codec = meta.get("codec", "none")
+
+        views = get_dependent_views(name_dataset)
+        dataset_path = _dataset_path(name_dataset)
+        tmp_path = f"{dataset_path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        new_meta = copy.deepcopy(meta)
+        new_meta["chunks"] = meta["chunks"][:first_chunk] + chunks
+        for column_meta in new_meta["columns"]:
+            source_path = os.path.join(dataset_path, column_meta["file"])
+            column_path = os.path.join(tmp_path, column_meta["file"])
+            tail = pd.Series(_read_column(source_path, column_meta, meta["chunks"], tail_chunks, False, codec))
+            if "offsets" not in column_meta:
+                _link_file(source_path, column_path)
+                stats = [_column_statistics(tail.iloc[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])]
+                column_meta["stats"] = column_meta["stats"][:first_chunk] + stats
+                continue
+            shutil.copyfile(source_path, column_path)
+            os.truncate(column_path, column_meta["offsets"][first_chunk])
+            new_column_meta = _write_column(tail, column_path, chunks, codec, append=True)
+            column_meta["stats"] = column_meta["stats"][:first_chunk] + new_column_meta["stats"]
+            column_meta["offsets"] = column_meta["offsets"][:first_chunk] + new_column_meta["offsets"]
+        if os.path.exists(os.path.join(dataset_path, SUMMARY_FILE)):
+            shutil.copyfile(os.path.join(dataset_path, SUMMARY_FILE), os.path.join(tmp_path, SUMMARY_FILE))
+        # The order of the rows does not change, so the column indexes stay valid.
+        for file_name in [val for index_entry in meta.get("indexes", []) for val in index_entry["files"]]:
+            _link_file(os.path.join(dataset_path, file_name), os.path.join(tmp_path, file_name))
+        write_json(os.path.join(tmp_path, META_FILE), new_meta, sync=True)
+        _sync_directory(tmp_path)
+
+        _replace_dataset(name_dataset, tmp_path)
+        _store_views_again(name_dataset, views)
+
+
+#####################################################################################################################################################
+def change_codec(name_dataset: str, codec: str) -> None:
+    """Store an existing dataset again with another compression codec.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        codec (str): The new compression codec or codec alias.
+    """
+    meta = _read_meta(name_dataset, _dataset_version(name_dataset))
+    views = get_dependent_views(name_dataset)
+    store_dataframe(load_dataframe(name_dataset), name_dataset, meta.get("memory_map"), codec)
+    _store_views_again(name_dataset, views)
 
-import pandas as pd
 
+#####################################################################################################################################################
+def benchmark_codecs(name_dataset: str, codecs: list[str] | None = None) -> list[dict]:
+    """Measure write time, read time and size of a stored dataset for every codec.
 
-DATAFRAME_STORE = os.path.join(".", "Data")
-os.makedirs(DATAFRAME_STORE, exist_ok=True)
+    The dataset is written into a temporary directory. The read time is measured directly after writing, so the files are usually still in
+    the page cache of the operating system and only the decoding costs are measured.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        codecs (list[str] | None): The codecs that should be compared. All available codecs are compared if None.
+
+    Returns:
+        list[dict]: Codec, write and read time in seconds, size in bytes and compression ratio for every codec.
+    """
+    data = load_dataframe(name_dataset)
+    res = []
+    with tempfile.TemporaryDirectory(suffix=".tmp", dir=DATAFRAME_STORE) as tmp_path:
+        for codec in [resolve_codec(val) for val in codecs or available_codecs()]:
+            dataset_path = os.path.join(tmp_path, codec)
+            start = time.perf_counter()
+            meta = _write_dataset(data, dataset_path, False, codec)
+            write_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for column_meta in meta["columns"]:
+                _read_column(os.path.join(dataset_path, column_meta["file"]), column_meta, meta["chunks"], None, False, codec)
+            read_seconds = time.perf_counter() - start
+
+            size = sum(os.path.getsize(os.path.join(dataset_path, file_name)) for file_name in os.listdir(dataset_path))
+            res.append({"codec": codec, "write_seconds": write_seconds, "read_seconds": read_seconds, "bytes": size})
+    uncompressed_size = next((val["bytes"] for val in res if val["codec"] == "none"), None)
+    for val in res:
+        val["ratio"] = uncompressed_size / val["bytes"] if uncompressed_size and val["bytes"] else None
+    return res
 
 
 #####################################################################################################################################################
-def store_dataframe(data: pd.DataFrame, name_dataset: str) -> None:
-    """This function is used to store data in pickle.
+def store_view(name_dataset: str, parent_dataset: str, queries: list[str], materialize_after: int | None = None) -> None:
+    """Store a dataset as view on another dataset.
 
     Args:
-        data (pd.DataFrame): The dataframe that should be stored.
-        name_dataset (str): The name that should be used to store the data.
+        name_dataset (str): The name that should be used to store the view.
+        parent_dataset (str): The dataset the queries are applied on.
+        queries (list[str]): The queries that define the view.
+        materialize_after (int | None): Replace the view by a stored dataset after it has been loaded this often. Never if None.
+
+    Raises:
+        ValueError: The name is invalid or the view would depend on itself, because it has the name of the parent dataset or of a dataset the
+            parent depends on.
+    """
+    check_dataset_name(name_dataset)
+    PERSISTENCE_QUEUE.wait(parent_dataset)
+    PERSISTENCE_QUEUE.wait(name_dataset)
+    catalog = read_catalog()
+    parent_entry = catalog[parent_dataset]
+    ancestor = parent_dataset
+    while ancestor is not None:
+        if ancestor == name_dataset:
+            raise ValueError(f"The view {name_dataset} can not be stored on {parent_dataset}, because {parent_dataset} depends on {name_dataset}")
+        ancestor = catalog.get(ancestor, {}).get("view", {}).get("parent")
+    dataset_path = _dataset_path(name_dataset)
+    tmp_path = f"{dataset_path}.tmp"
+    view = {"parent": parent_dataset, "version": parent_entry["version"], "queries": queries, "materialize_after": materialize_after}
+    columns = [{"name": column, "dtype": dtype} for column, dtype in zip(parent_entry["columns"], parent_entry["dtypes"])]
+    with _dataset_lock(name_dataset):
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        write_json(os.path.join(tmp_path, META_FILE), {"view": view, "columns": columns}, sync=True)
+        _sync_directory(tmp_path)
+
+        _replace_dataset(name_dataset, tmp_path)
+
+
+#####################################################################################################################################################
+def get_dependent_views(name_dataset: str) -> list[str]:
+    """Get the views that are stored on the current version of a dataset.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        list[str]: Names of the views whose parent is the dataset.
+    """
+    catalog = read_catalog()
+    version = catalog.get(name_dataset, {}).get("version")
+    return [key for key, val in catalog.items() if val.get("view") and val["view"]["parent"] == name_dataset and val["view"]["version"] == version]
+
+
+#####################################################################################################################################################
+def _store_views_again(name_dataset: str, views: list[str]) -> None:
+    """Store views on a dataset again after the dataset has been rewritten without changing its data.
+
+    Args:
+        name_dataset (str): Name of the rewritten dataset.
+        views (list[str]): The views on the previous version of the dataset.
+    """
+    catalog = read_catalog()
+    for key in views:
+        view = catalog[key]["view"]
+        store_view(key, name_dataset, view["queries"], view["materialize_after"])
+
+
+#####################################################################################################################################################
+def get_view(name_dataset: str) -> dict | None:
+    """Get the definition of a view.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        dict | None: Parent, parent version, queries and materialize policy of the view or None if the dataset is not a view.
+    """
+    return read_catalog().get(name_dataset, {}).get("view")
+
+
+#####################################################################################################################################################
+def get_dataset_version(name_dataset: str) -> int | None:
+    """Get the version of a dataset that is stored column by column, it changes every time the dataset is stored or changed.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        int | None: The version or None if the dataset is not written yet, is a legacy file or does not exist.
     """
-    data.to_pickle(os.path.join(DATAFRAME_STORE, f"{name_dataset}.pkl"))
+    if PERSISTENCE_QUEUE.get(name_dataset) is not None or not os.path.exists(os.path.join(_dataset_path(name_dataset), META_FILE)):
+        return None
+    try:
+        return _dataset_version(name_dataset)
+    except FileNotFoundError:
+        return None
 
 
 #####################################################################################################################################################
-def load_dataframe(name_dataset: str) -> pd.DataFrame:
+def load_dataframe(
+    name_dataset: str, columns: list[str] | None = None, filters: list[tuple[str, str, Any]] | None = None, rows: np.ndarray | None = None
+) -> pd.DataFrame:
     """Load data from file.
 
+    The filters are only used to skip chunks that can not contain matching rows, the loaded dataframe still has to be filtered. The index of
+    the loaded dataframe contains the row numbers inside the stored dataset. Datasets that are not written yet are served from memory.
+    If rows are given, only the chunks that contain them are read and the filters are not used.
+
+    Args:
+        name_dataset (str): Name of the dataframe that should be used.
+        columns (list[str] | None): Only load these columns. All columns are loaded if None.
+        filters (list[tuple[str, str, Any]] | None): Tuples of column, operator and value, e.g. ("iteration", ">", 25).
+        rows (np.ndarray | None): Only load these row numbers, in this order. All rows are loaded if None.
+
+    Returns:
+        pd.DataFrame: The loaded dataframe.
+    """
+    if name_dataset.endswith(LEGACY_SUFFIX):
+        name_dataset = name_dataset[: -len(LEGACY_SUFFIX)]
+    pending = PERSISTENCE_QUEUE.get(name_dataset)
+    if pending is not None:
+        missing_columns = [val for val in columns or [] if val not in pending.columns]
+        if missing_columns:
+            raise KeyError(f"Columns {missing_columns} do not exist in dataset {name_dataset}")
+        pending = pending if columns is None else pending[columns]
+        return pending if rows is None else pending.loc[rows]
+    for attempt in range(LOAD_RETRIES):
+        try:
+            return _load_stored_dataframe(name_dataset, columns, filters, rows)
+        except FileNotFoundError:
+            # The dataset may have been replaced while it was read, the new version is read again.
+            if attempt == LOAD_RETRIES - 1:
+                raise
+            time.sleep(LOAD_RETRY_DELAY)
+
+
+#####################################################################################################################################################
+def _load_stored_dataframe(
+    name_dataset: str, columns: list[str] | None, filters: list[tuple[str, str, Any]] | None, rows: np.ndarray | None = None
+) -> pd.DataFrame:
+    """Load a dataset from its files, see load_dataframe.
+
+    Args:
+        name_dataset (str): Name of the dataframe that should be used.
+        columns (list[str] | None): Only load these columns. All columns are loaded if None.
+        filters (list[tuple[str, str, Any]] | None): Tuples of column, operator and value.
+        rows (np.ndarray | None): Only load these row numbers. All rows are loaded if None.
+
+    Returns:
+        pd.DataFrame: The loaded dataframe.
+    """
+    version = _dataset_version(name_dataset)
+    meta = _read_meta(name_dataset, version)
+    if not meta:
+        data = _load_legacy_dataframe(name_dataset, version, columns)
+        return data if rows is None else data.loc[rows]
+    if "view" in meta:
+        raise ValueError(f"Dataset {name_dataset} is a view on {meta['view']['parent']} and has to be resolved with its queries")
+
+    column_meta = {val["name"]: val for val in meta["columns"]}
+    selected_columns = list(column_meta) if columns is None else columns
+    missing_columns = [val for val in selected_columns if val not in column_meta]
+    if missing_columns:
+        raise KeyError(f"Columns {missing_columns} do not exist in dataset {name_dataset}")
+
+    selected_chunks = _select_chunks(meta, column_meta, filters) if rows is None else _row_chunks(meta["chunks"], rows)
+    if selected_chunks is None:
+        index = pd.RangeIndex(meta["rows"])
+    else:
+        index = pd.Index(
+            np.concatenate([np.arange(start, stop) for start, stop in _chunk_ranges(meta["chunks"], selected_chunks)] or [[]]), dtype=np.int64
+        )
+
+    dataset_path = _dataset_path(name_dataset)
+    memory_map = meta["memory_map"]
+    codec = meta.get("codec", "none")
+    res = {}
+    for key in selected_columns:
+        column_path = os.path.join(dataset_path, column_meta[key]["file"])
+        if memory_map and column_meta[key]["kind"] == "raw" and "offsets" not in column_meta[key]:
+            res[key] = _read_column(column_path, column_meta[key], meta["chunks"], selected_chunks, memory_map, codec)
+            continue
+        values = DATAFRAME_CACHE.get(name_dataset, key, version)
+        if values is not None:
+            res[key] = values if selected_chunks is None else values[index.to_numpy()]
+        elif selected_chunks is None:
+            res[key] = _read_column(column_path, column_meta[key], meta["chunks"], None, memory_map, codec)
+            DATAFRAME_CACHE.put(name_dataset, key, version, res[key])
+        else:
+            res[key] = _read_column(column_path, column_meta[key], meta["chunks"], selected_chunks, memory_map, codec)
+    data = pd.DataFrame(res, index=index, copy=False)
+    return data if rows is None else data.loc[rows]
+
+
+#####################################################################################################################################################
+def iter_dataframe_chunks(
+    name_dataset: str, columns: list[str] | None = None, filters: list[tuple[str, str, Any]] | None = None
+) -> Iterator[pd.DataFrame]:
+    """Load a dataset chunk by chunk, so that only one chunk of CHUNK_ROWS rows is held in memory.
+
+    The chunks are read from the files and not added to the cache. Chunks that can not contain rows which fulfill the filters are skipped,
+    the yielded chunks still have to be filtered. At least one chunk is yielded, so that the columns and dtypes are known even if no chunk
+    can match. Datasets that are not written yet and legacy files are sliced in memory.
+
     Args:
         name_dataset (str): Name of the dataframe that should be used.
+        columns (list[str] | None): Only load these columns. All columns are loaded if None.
+        filters (list[tuple[str, str, Any]] | None): Tuples of column, operator and value, e.g. ("iteration", ">", 25).
+
+    Raises:
+        ValueError: The dataset is a view.
+        KeyError: A column does not exist.
+
+    Yields:
+        pd.DataFrame: The chunks, their index contains the row numbers inside the stored dataset.
+    """
+    if name_dataset.endswith(LEGACY_SUFFIX):
+        name_dataset = name_dataset[: -len(LEGACY_SUFFIX)]
+    version = get_dataset_version(name_dataset)
+    meta = {} if version is None else _read_meta(name_dataset, version)
+    if "view" in meta:
+        raise ValueError(f"Dataset {name_dataset} is a view on {meta['view']['parent']} and has to be resolved with its queries")
+    if not meta:
+        data = load_dataframe(name_dataset, columns)
+        for start in range(0, max(len(data), 1), CHUNK_ROWS):
+            yield data.iloc[start : start + CHUNK_ROWS]
+        return
+
+    column_meta = {val["name"]: val for val in meta["columns"]}
+    selected_columns = list(column_meta) if columns is None else columns
+    missing_columns = [val for val in selected_columns if val not in column_meta]
+    if missing_columns:
+        raise KeyError(f"Columns {missing_columns} do not exist in dataset {name_dataset}")
+    selected_chunks = _select_chunks(meta, column_meta, filters)
+    selected_chunks = range(len(meta["chunks"])) if selected_chunks is None else selected_chunks
+    bounds = _chunk_bounds(meta["chunks"])
+    dataset_path = _dataset_path(name_dataset)
+    codec = meta.get("codec", "none")
+    for chunk in selected_chunks or [0]:
+        res = {
+            key: _read_column(os.path.join(dataset_path, column_meta[key]["file"]), column_meta[key], meta["chunks"], [chunk], False, codec)
+            for key in selected_columns
+        }
+        data = pd.DataFrame(res, index=pd.RangeIndex(bounds[chunk], bounds[chunk + 1]), copy=False)
+        yield data if selected_chunks else data.iloc[:0]
+
+
+#####################################################################################################################################################
+def _load_legacy_dataframe(name_dataset: str, version: int, columns: list[str] | None) -> pd.DataFrame:
+    """Load a dataset that has been stored as a single pickle file.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        version (int): The current version of the dataset.
+        columns (list[str] | None): Only return these columns. All columns are returned if None.
 
     Returns:
         pd.DataFrame: The loaded dataframe.
     """
-    if not name_dataset.endswith(".pkl"):
-        name_dataset = f"{name_dataset}.pkl"
-    return pd.read_pickle(os.path.join(DATAFRAME_STORE, name_dataset))
+    if columns:
+        cached = {key: DATAFRAME_CACHE.get(name_dataset, key, version) for key in columns}
+        if all(val is not None for val in cached.values()):
+            return pd.DataFrame(cached)
+
+    data = pd.read_pickle(_legacy_path(name_dataset))
+    for key in data.columns:
+        DATAFRAME_CACHE.put(name_dataset, key, version, data[key])
+    return data if columns is None else data[columns]
+
+
+#####################################################################################################################################################
+def get_column_summary(name_dataset: str) -> dict[str, dict]:
+    """Get the summary statistics of every column of a dataset without loading its data.
+
+    The summaries are computed when a dataset is stored or rows are appended, see plot_page.data.summary. Datasets that are not written yet
+    are summarized from memory. Datasets that have been stored without summary get their summary file with the first call.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        dict[str, dict]: The summary of every column, empty for views and legacy files.
+    """
+    pending = PERSISTENCE_QUEUE.get(name_dataset)
+    if pending is not None:
+        return {key: public_summary(column_summary(pending[key])) for key in pending.columns}
+    meta = _read_meta(name_dataset, _dataset_version(name_dataset))
+    if not meta or "view" in meta:
+        return {}
+    summaries = _read_summary(name_dataset, _dataset_version(name_dataset))
+    if summaries is None:
+        with _dataset_lock(name_dataset):
+            data = load_dataframe(name_dataset)
+            summaries = [column_summary(data[val["name"]]) for val in meta["columns"]]
+            _write_summary(_dataset_path(name_dataset), summaries)
+    return {column["name"]: public_summary(val) for column, val in zip(meta["columns"], summaries)}
+
+
+#####################################################################################################################################################
+def get_indexes(name_dataset: str) -> dict[str, str]:
+    """Get the indexed columns of a dataset.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        dict[str, str]: The index kind of every indexed column, empty for views, legacy files and datasets that do not exist.
+    """
+    return {val["column"]: val["kind"] for val in _stored_meta(name_dataset).get("indexes", [])}
+
+
+#####################################################################################################################################################
+def _stored_meta(name_dataset: str) -> dict:
+    """Read the meta file of a stored dataset.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        dict: The meta file content, empty for legacy files and datasets that do not exist.
+    """
+    if not os.path.exists(os.path.join(_dataset_path(name_dataset), META_FILE)):
+        return {}
+    try:
+        return _read_meta(name_dataset, _dataset_version(name_dataset))
+    except FileNotFoundError:
+        return {}
+
+
+#####################################################################################################################################################
+def _replace_indexes(name_dataset: str, meta: dict, indexes: list[dict]) -> None:
+    """Write the meta file with new column indexes and remove the files of replaced indexes.
+
+    Has to be called while the lock of the dataset is held.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        meta (dict): The current meta file content.
+        indexes (list[dict]): The index entries of the new meta file.
+    """
+    dataset_path = _dataset_path(name_dataset)
+    new_meta = {key: val for key, val in meta.items() if key != "indexes"}
+    if indexes:
+        new_meta["indexes"] = indexes
+    _write_meta(dataset_path, new_meta)
+    kept_files = {val for index_entry in indexes for val in index_entry["files"]}
+    for file_name in [val for index_entry in meta.get("indexes", []) for val in index_entry["files"]]:
+        if file_name not in kept_files:
+            os.remove(os.path.join(dataset_path, file_name))
+    DATAFRAME_CACHE.invalidate(name_dataset)
+    _update_catalog(name_dataset, _catalog_entry(name_dataset))
+
+
+#####################################################################################################################################################
+def create_index(name_dataset: str, column: str, kind: str | None = None) -> str:
+    """Create or replace the index of a column, see plot_page.data.column_index.
+
+    The index is stored next to the columns and kept up to date when the dataset is stored again or rows are appended. Queries that compare
+    the column with constants and group splits by the column use the index instead of scanning the column.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        column (str): Name of the column.
+        kind (str | None): "sorted" for range and equality filters on numeric columns or "bitmap" for equality filters and groups on columns
+            with at most BITMAP_MAX_VALUES distinct values. The kind that fits the column is selected if None.
+
+    Raises:
+        ValueError: The dataset is not stored column by column, the column does not exist or no index fits the column.
+
+    Returns:
+        str: The kind of the created index.
+    """
+    PERSISTENCE_QUEUE.wait(name_dataset)
+    with _dataset_lock(name_dataset):
+        meta_exists = os.path.exists(os.path.join(_dataset_path(name_dataset), META_FILE))
+        meta = _read_meta(name_dataset, _dataset_version(name_dataset)) if meta_exists else {}
+        if not meta or "view" in meta:
+            raise ValueError(f"Indexes can only be created on datasets that are stored column by column, {name_dataset} is a view or legacy file")
+        column_names = [val["name"] for val in meta["columns"]]
+        if column not in column_names:
+            raise ValueError(f"Column {column} does not exist in dataset {name_dataset}")
+        values = load_dataframe(name_dataset, [column])[column]
+        kind = index_kind(values) if kind is None else kind
+        if kind is None:
+            raise ValueError(f"No index fits column {column}, it is not numeric and has more than {BITMAP_MAX_VALUES} distinct values")
+        index_entry = _write_index(values, _dataset_path(name_dataset), column_names.index(column), kind)
+        _replace_indexes(name_dataset, meta, [val for val in meta.get("indexes", []) if val["column"] != column] + [index_entry])
+    return kind
+
+
+#####################################################################################################################################################
+def drop_index(name_dataset: str, column: str) -> None:
+    """Remove the index of a column.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        column (str): Name of the column.
+    """
+    PERSISTENCE_QUEUE.wait(name_dataset)
+    with _dataset_lock(name_dataset):
+        if column not in get_indexes(name_dataset):
+            return
+        meta = _read_meta(name_dataset, _dataset_version(name_dataset))
+        _replace_indexes(name_dataset, meta, [val for val in meta["indexes"] if val["column"] != column])
+
+
+#####################################################################################################################################################
+def get_index_rows(name_dataset: str, filters: list[tuple[str, str, Any]], version: int | None) -> np.ndarray | None:
+    """Find the rows that fulfill filters with the column indexes of a dataset.
+
+    Filters on columns without index or with operators that the index does not support are ignored, the result can contain rows that do
+    not fulfill them.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        filters (list[tuple[str, str, Any]]): Tuples of column, operator and value, e.g. ("iteration", ">", 25).
+        version (int | None): The version of the dataset the rows are used for, see get_dataset_version.
+
+    Returns:
+        np.ndarray | None: The ascending row numbers that fulfill all indexed filters or None if no filter can use an index or the dataset
+            has another version.
+    """
+    if version is None or not filters:
+        return None
+    mask = None
+    try:
+        if _dataset_version(name_dataset) != version:
+            return None
+        rows = _read_meta(name_dataset, version)["rows"]
+        for column, operator, value in filters:
+            index = _read_index(name_dataset, version, column)
+            if index is None:
+                continue
+            if index[0]["kind"] == "sorted":
+                column_mask = sorted_index_mask(*index[1], operator, value)
+            else:
+                column_mask = bitmap_index_mask(index[0]["values"], index[1][0], rows, operator, value)
+            if column_mask is not None:
+                mask = column_mask if mask is None else mask & column_mask
+    except FileNotFoundError:
+        return None
+    return None if mask is None else np.flatnonzero(mask)
+
+
+#####################################################################################################################################################
+def get_index_groups(name_dataset: str, column: str, rows: int) -> dict[Any, np.ndarray] | None:
+    """Get the rows of every value of a column from its bitmap index.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        column (str): Name of the column.
+        rows (int): Number of rows of the data the groups are used for, it has to match the stored dataset.
+
+    Returns:
+        dict[Any, np.ndarray] | None: The row numbers of every value that occurs or None if the column has no bitmap index or the number of
+            rows differs.
+    """
+    version = get_dataset_version(name_dataset)
+    if version is None:
+        return None
+    try:
+        meta = _read_meta(name_dataset, version)
+        index = _read_index(name_dataset, version, column)
+    except FileNotFoundError:
+        return None
+    if index is None or index[0]["kind"] != "bitmap" or meta.get("rows") != rows:
+        return None
+    return bitmap_index_groups(index[0]["values"], index[1][0], rows)
+
+
+#####################################################################################################################################################
+def get_cache_statistics() -> dict[str, int]:
+    """Get the hit, miss and eviction counters of the dataframe cache.
+
+    Returns:
+        dict[str, int]: The current cache statistics.
+    """
+    return DATAFRAME_CACHE.statistics()
+
+
+#####################################################################################################################################################
+def set_cache_budget(max_bytes: int) -> None:
+    """Change the number of bytes the dataframe cache is allowed to use.
+
+    Args:
+        max_bytes (int): The new memory budget, 0 disables the cache.
+    """
+    DATAFRAME_CACHE.resize(max_bytes)
+
+
+#####################################################################################################################################################
+def set_memory_budget(max_bytes: int) -> None:
+    """Change the number of bytes all datasets together are allowed to hold in memory.
+
+    Args:
+        max_bytes (int): The new memory budget.
+    """
+    global MEMORY_BUDGET_BYTES
+    MEMORY_BUDGET_BYTES = max_bytes
+
+
+#####################################################################################################################################################
+def get_memory_budget() -> int:
+    """Get the number of bytes all datasets together are allowed to hold in memory.
+
+    Returns:
+        int: The current memory budget.
+    """
+    return MEMORY_BUDGET_BYTES
+
+
+#####################################################################################################################################################
+def get_memory_usage() -> dict[str, int]:
+    """Get the number of bytes every dataset uses when it is loaded, views use no memory of their own.
+
+    Returns:
+        dict[str, int]: The memory usage of every dataset.
+    """
+    return {key: val.get("memory", val["bytes"]) for key, val in read_catalog().items()}
+
+
+#####################################################################################################################################################
+def get_resident_memory() -> dict[str, int]:
+    """Get the number of bytes every dataset currently holds in memory.
+
+    A dataset holds the columns that are cached in DATAFRAME_CACHE and its dataframe while it waits in PERSISTENCE_QUEUE to be written,
+    datasets that are only stored on the disk hold no memory.
+
+    Returns:
+        dict[str, int]: The resident memory of every dataset that holds memory.
+    """
+    res = DATAFRAME_CACHE.dataset_bytes()
+    for key, val in PERSISTENCE_QUEUE.pending_bytes().items():
+        res[key] = res.get(key, 0) + val
+    return res
+
+
+#####################################################################################################################################################
+def format_bytes(number_bytes: int) -> str:
+    """Format a number of bytes for messages.
+
+    Args:
+        number_bytes (int): The number of bytes.
+
+    Returns:
+        str: The number with the largest unit that keeps it at least 1, e.g. "1.5 GB".
+    """
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(number_bytes) < 1024:
+            return f"{number_bytes:.1f} {unit}" if unit != "B" else f"{number_bytes} B"
+        number_bytes /= 1024
+    return f"{number_bytes:.1f} TB"
+
+
+#####################################################################################################################################################
+def check_memory_budget(name_dataset: str, number_bytes: int, append: bool = False) -> None:
+    """Check that new data can be held in memory without exceeding MEMORY_BUDGET_BYTES.
+
+    The resident memory of the datasets, see get_resident_memory, and the new data have to fit into the budget. Data that is stored in chunks
+    is checked chunk by chunk, because only one chunk is held in memory at a time.
+
+    Args:
+        name_dataset (str): Name of the dataset, the memory of an existing dataset with this name is released if it is replaced.
+        number_bytes (int): The memory usage of the new data.
+        append (bool): The data is appended to the existing dataset instead of replacing it.
+
+    Raises:
+        ValueError: The memory budget would be exceeded.
+    """
+    resident = get_resident_memory()
+    used = sum(val for key, val in resident.items() if append or key != name_dataset)
+    if used + number_bytes > MEMORY_BUDGET_BYTES:
+        free = max(MEMORY_BUDGET_BYTES - used, 0)
+        raise ValueError(
+            f"{name_dataset} needs {format_bytes(number_bytes)} of memory, but only {format_bytes(free)} of the memory budget of"
+            f" {format_bytes(MEMORY_BUDGET_BYTES)} are free. Remove datasets, filter the data while it is uploaded or save it as view."
+        )
+
+
+#####################################################################################################################################################
+def _catalog_entry(name_dataset: str) -> dict:
+    """Create the catalog entry of a stored dataset.
+
+    Only the meta file is read for datasets that are stored column by column, legacy pickle files have to be loaded.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+
+    Returns:
+        dict: Columns, dtypes, number of rows, size in bytes, memory usage when loaded, version and indexed columns of the dataset and the
+            view definition for views.
+    """
+    dataset_path = _dataset_path(name_dataset)
+    meta = _read_meta(name_dataset, _dataset_version(name_dataset))
+    if "view" in meta:
+        return {
+            "columns": [val["name"] for val in meta["columns"]],
+            "dtypes": [val["dtype"] for val in meta["columns"]],
+            "rows": None,
+            "bytes": os.path.getsize(os.path.join(dataset_path, META_FILE)),
+            "memory": 0,
+            "version": _dataset_version(name_dataset),
+            "view": meta["view"],
+        }
+    if meta:
+        return {
+            "columns": [val["name"] for val in meta["columns"]],
+            "dtypes": [str(np.dtype(val["dtype"])) if val["kind"] == "raw" else val["dtype"] for val in meta["columns"]],
+            "rows": meta["rows"],
+            "bytes": sum(os.path.getsize(os.path.join(dataset_path, file_name)) for file_name in os.listdir(dataset_path)),
+            "memory": _meta_memory(meta, dataset_path),
+            "version": _dataset_version(name_dataset),
+            "codec": meta.get("codec", "none"),
+            "indexes": {val["column"]: val["kind"] for val in meta.get("indexes", [])},
+        }
+    data = pd.read_pickle(_legacy_path(name_dataset))
+    return {
+        "columns": list(data.columns),
+        "dtypes": [str(val) for val in data.dtypes],
+        "rows": len(data),
+        "bytes": os.path.getsize(_legacy_path(name_dataset)),
+        "memory": _frame_memory(data),
+        "version": _dataset_version(name_dataset),
+    }
+
+
+#####################################################################################################################################################
+def _write_catalog(catalog: dict[str, dict]) -> None:
+    """Replace the catalog file.
+
+    Args:
+        catalog (dict[str, dict]): The new catalog.
+    """
+    tmp_path = f"{CATALOG_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write_json(tmp_path, catalog, sync=True)
+    os.replace(tmp_path, CATALOG_FILE)
+    _sync_directory(DATAFRAME_STORE)
+
+
+#####################################################################################################################################################
+@contextlib.contextmanager
+def _catalog_lock() -> Iterator[None]:
+    """Serialize changes of the catalog file between the threads of this process and between the server worker processes.
+
+    The lock between processes is an exclusive lock on CATALOG_LOCK_FILE, it is only taken where fcntl is available.
+
+    Yields:
+        None: The catalog can be changed while the context is active.
+    """
+    with CATALOG_LOCK:
+        if fcntl is None:
+            yield
+            return
+        with open(CATALOG_LOCK_FILE, mode="a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+#####################################################################################################################################################
+def _update_catalog(name_dataset: str, entry: dict | None) -> None:
+    """Add, replace or remove a single catalog entry.
+
+    Args:
+        name_dataset (str): Name of the dataset.
+        entry (dict | None): The new entry of the dataset, the entry is removed if None.
+    """
+    with _catalog_lock():
+        catalog = read_json(CATALOG_FILE) if os.path.exists(CATALOG_FILE) else _scan_store()
+        if entry is None:
+            catalog.pop(name_dataset, None)
+        else:
+            catalog[name_dataset] = entry
+        _write_catalog(catalog)
+
+
+#####################################################################################################################################################
+def _scan_store() -> dict[str, dict]:
+    """Create the catalog entries of all datasets in DATAFRAME_STORE.
+
+    Returns:
+        dict[str, dict]: Catalog entry for every dataset name.
+    """
+    catalog = {}
+    for file_name in sorted(os.listdir(DATAFRAME_STORE)):
+        if file_name.endswith(".tmp"):
+            continue
+        if os.path.exists(os.path.join(DATAFRAME_STORE, file_name, META_FILE)):
+            catalog[file_name] = _catalog_entry(file_name)
+        elif file_name.endswith(LEGACY_SUFFIX):
+            catalog[file_name[: -len(LEGACY_SUFFIX)]] = _catalog_entry(file_name[: -len(LEGACY_SUFFIX)])
+    return catalog
+
+
+#####################################################################################################################################################
+def rebuild_catalog() -> dict[str, dict]:
+    """Scan DATAFRAME_STORE and write a new catalog of all stored datasets.
+
+    Returns:
+        dict[str, dict]: The rebuilt catalog.
+    """
+    with _catalog_lock():
+        catalog = _scan_store()
+        _write_catalog(catalog)
+    return catalog
+
+
+#####################################################################################################################################################
+def read_catalog() -> dict[str, dict]:
+    """Read the catalog of all stored datasets.
+
+    The catalog is rebuilt if the catalog file does not exist yet. Datasets that are not written yet are listed with their persistence state
+    and without version.
+
+    Returns:
+        dict[str, dict]: Catalog entry for every dataset name.
+    """
+    catalog = rebuild_catalog() if not os.path.exists(CATALOG_FILE) else read_json(CATALOG_FILE)
+    with PERSISTENCE_QUEUE.condition:
+        pending = dict(PERSISTENCE_QUEUE.frames)
+    for name_dataset, data in pending.items():
+        catalog[name_dataset] = {
+            "columns": list(data.columns),
+            "dtypes": [str(val) for val in data.dtypes],
+            "rows": len(data),
+            "bytes": int(data.memory_usage(index=False).sum()),
+            "memory": _frame_memory(data),
+            "version": None,
+            "persistence": PERSISTENCE_QUEUE.state(name_dataset),
+        }
+    return catalog
+
+
+#####################################################################################################################################################
+def get_dataframe_columns(name_dataset: str) -> list[str]:
+    """Get the column names of a stored dataframe without loading the data.
+
+    Args:
+        name_dataset (str): Name of the dataframe.
+
+    Returns:
+        list[str]: The column names of the dataframe.
+    """
+    entry = read_catalog().get(name_dataset)
+    return entry["columns"] if entry else _catalog_entry(name_dataset)["columns"]
 
 
 #####################################################################################################################################################
 def list_dataframes() -> list[str]:
-    """List all dataframe files.
+    """List all stored dataframes.
 
     Returns:
-        list[str]: A list of all dataframe files in DATAFRAME_STORE.
+        list[str]: A list of the names of all dataframes in the catalog.
     """
-    return os.listdir(DATAFRAME_STORE)
+    return sorted(read_catalog())
 
 
 #####################################################################################################################################################
@@ -51,7 +2043,21 @@ def remove_dataframe(name_dataset: str) -> None:
 
     Args:
         name_dataset (str): Name of the dataset that should be deleted.
+
+    Raises:
+        ValueError: The name of the dataset is invalid, see check_dataset_name.
     """
-    file_path = os.path.join(DATAFRAME_STORE, f"{name_dataset}.pkl")
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    check_dataset_name(name_dataset)
+    PERSISTENCE_QUEUE.wait(name_dataset)
+    dataset_path = _dataset_path(name_dataset)
+    with _dataset_lock(name_dataset):
+        if os.path.isdir(dataset_path):
+            shutil.rmtree(dataset_path)
+        file_path = _legacy_path(name_dataset)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        DATAFRAME_CACHE.invalidate(name_dataset)
+        _update_catalog(name_dataset, None)
+
+
+_recover_replaced_datasets()
@@ -0,0 +1,173 @@
+"""This file contains the summary statistics of the columns of stored datasets.
+
+A summary is computed for every column when a dataset is stored and merged with the summary of new rows when rows are appended, so that
+the statistics of a dataset are available without loading its data. Numeric columns get count, missing values, minimum, maximum, mean,
+standard deviation and a histogram, all other columns get count, missing values, minimum and maximum if the values can be compared and their
+most frequent values. The number of distinct values is estimated with a k minimum values sketch of the hashed values.
+"""
+
+import math
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+HISTOGRAM_BINS = 20
+TOP_VALUES = 10
+SKETCH_SIZE = 256
+HASH_RANGE = 2.0**64
+
+
+#####################################################################################################################################################
+def _python_value(value: Any) -> Any:
+    """Convert a numpy scalar to a python value that can be written as json.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        Any: The python value, None for missing or infinite values.
+    """
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+#####################################################################################################################################################
+def _distinct_count(sketch: list[int], nulls_only: bool = False) -> int:
+    """Estimate the number of distinct values from a k minimum values sketch.
+
+    Args:
+        sketch (list[int]): The smallest hash values of the column in ascending order.
+        nulls_only (bool): The column contains only missing values.
+
+    Returns:
+        int: The exact number of distinct values if the sketch is not full, otherwise the estimate.
+    """
+    if nulls_only or len(sketch) < SKETCH_SIZE:
+        return len(sketch)
+    return int(round((SKETCH_SIZE - 1) * HASH_RANGE / (sketch[-1] + 1)))
+
+
+#####################################################################################################################################################
+def column_summary(values: pd.Series) -> dict:
+    """Compute the summary of a column in one vectorized pass per statistic.
+
+    Args:
+        values (pd.Series): The values of the column.
+
+    Returns:
+        dict: The summary, including the internal fields m2 and sketch that are needed to merge summaries.
+    """
+    present = values.dropna()
+    res = {"dtype": str(values.dtype), "count": len(present), "nulls": len(values) - len(present), "min": None, "max": None}
+    numeric = isinstance(values.dtype, np.dtype) and values.dtype.kind in "biuf"
+    # Numbers are hashed as float, so that the sketches still match after an integer column has been widened to float.
+    hashes = np.unique(pd.util.hash_pandas_object(present.astype(np.float64) if numeric else present, index=False).to_numpy())
+    res["sketch"] = [int(val) for val in hashes[:SKETCH_SIZE]]
+    if numeric:
+        numbers = present.to_numpy(dtype=np.float64)
+        numbers = numbers[np.isfinite(numbers)]
+        res["mean"] = _python_value(numbers.mean()) if len(numbers) else None
+        res["m2"] = float(((numbers - numbers.mean()) ** 2).sum()) if len(numbers) else 0.0
+        res["numbers"] = len(numbers)
+        if len(numbers):
+            counts, edges = np.histogram(numbers, bins=HISTOGRAM_BINS)
+            res["min"], res["max"] = _python_value(numbers.min()), _python_value(numbers.max())
+            res["histogram"] = {"edges": [float(val) for val in edges], "counts": [int(val) for val in counts]}
+        return res
+
+    if isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(values.dtype):
+        try:
+            res["min"], res["max"] = _python_value(present.min()), _python_value(present.max())
+        except TypeError:
+            pass
+        if not isinstance(res["min"], (bool, int, float, str)) or not isinstance(res["max"], (bool, int, float, str)):
+            res["min"], res["max"] = None, None
+    top = present.astype(str).value_counts().head(TOP_VALUES)
+    res["top"] = {str(key): int(val) for key, val in top.items()}
+    return res
+
+
+#####################################################################################################################################################
+def _merge_histograms(first: dict | None, second: dict | None, minimum: float, maximum: float) -> dict | None:
+    """Merge two histograms into a histogram over the combined range.
+
+    The counts of every bin are assigned to the new bin of the bin center, so that the merged histogram is an approximation.
+
+    Args:
+        first (dict | None): Edges and counts of the first histogram.
+        second (dict | None): Edges and counts of the second histogram.
+        minimum (float): The minimum of both columns.
+        maximum (float): The maximum of both columns.
+
+    Returns:
+        dict | None: Edges and counts of the merged histogram.
+    """
+    histograms = [val for val in (first, second) if val is not None]
+    if not histograms:
+        return None
+    centers = np.concatenate([(np.array(val["edges"][:-1]) + np.array(val["edges"][1:])) / 2 for val in histograms])
+    weights = np.concatenate([val["counts"] for val in histograms])
+    counts, edges = np.histogram(centers, bins=HISTOGRAM_BINS, range=(minimum, maximum), weights=weights)
+    return {"edges": [float(val) for val in edges], "counts": [int(val) for val in counts]}
+
+
+#####################################################################################################################################################
+def merge_summaries(first: dict | None, second: dict) -> dict:
+    """Merge the summary of stored rows with the summary of appended rows.
+
+    Mean and standard deviation are merged exactly, the histogram, the most frequent values and the distinct count are approximations.
+
+    Args:
+        first (dict | None): The summary of the stored rows, the second summary is used if None.
+        second (dict): The summary of the appended rows.
+
+    Returns:
+        dict: The merged summary.
+    """
+    if first is None:
+        return second
+    res = {"dtype": second["dtype"], "count": first["count"] + second["count"], "nulls": first["nulls"] + second["nulls"]}
+    res["sketch"] = sorted(set(first["sketch"]) | set(second["sketch"]))[:SKETCH_SIZE]
+    minimums = [val["min"] for val in (first, second) if val["min"] is not None]
+    maximums = [val["max"] for val in (first, second) if val["max"] is not None]
+    try:
+        res["min"], res["max"] = (min(minimums), max(maximums)) if minimums and maximums else (None, None)
+    except TypeError:
+        res["min"], res["max"] = None, None
+
+    if "numbers" in first and "numbers" in second:
+        numbers = first["numbers"] + second["numbers"]
+        res["numbers"] = numbers
+        if not first["numbers"] or not second["numbers"]:
+            res["mean"], res["m2"] = (first, second)[not first["numbers"]]["mean"], first["m2"] + second["m2"]
+        else:
+            delta = second["mean"] - first["mean"]
+            res["mean"] = first["mean"] + delta * second["numbers"] / numbers
+            res["m2"] = first["m2"] + second["m2"] + delta**2 * first["numbers"] * second["numbers"] / numbers
+        if res["min"] is not None:
+            res["histogram"] = _merge_histograms(first.get("histogram"), second.get("histogram"), res["min"], res["max"])
+        return res
+
+    top = pd.Series(first.get("top", {}), dtype=np.int64).add(pd.Series(second.get("top", {}), dtype=np.int64), fill_value=0)
+    res["top"] = {str(key): int(val) for key, val in top.sort_values(ascending=False).head(TOP_VALUES).items()}
+    return res
+
+
+#####################################################################################################################################################
+def public_summary(summary: dict) -> dict:
+    """Remove the internal fields of a summary and add the derived statistics.
+
+    Args:
+        summary (dict): The stored summary.
+
+    Returns:
+        dict: dtype, count, nulls, min, max, mean, std, distinct and histogram or top values of the column.
+    """
+    res = {key: val for key, val in summary.items() if key not in ["m2", "sketch", "numbers"]}
+    res["distinct"] = _distinct_count(summary["sketch"], summary["count"] == 0)
+    if "numbers" in summary:
+        res["std"] = math.sqrt(summary["m2"] / (summary["numbers"] - 1)) if summary["numbers"] > 1 else None
+    return res
@@ -4,7 +4,7 @@ import dash_bootstrap_components as dbc
 from dash import dcc, html
 
 
-from plot_page.data.panda_data import list_dataframes, load_dataframe
+from plot_page.data.panda_data import read_catalog
 
 
 #####################################################################################################################################################
@@ -34,8 +34,7 @@ def page_layout() -> html.Div:
     Returns:
         html.Div: Div that contains the base layout.
     """
-    load_dataframe
-    existing_data = {key[:-4]: list(load_dataframe(key).columns) for key in list_dataframes() if key.endswith(".pkl")}
+    existing_data = {key: val["columns"] for key, val in read_catalog().items()}
     return html.Div(
         [
             dcc.Location(id="url", refresh=False),
@@ -48,13 +47,14 @@ def page_layout() -> html.Div:
 
 
 #####################################################################################################################################################
-def get_upload_component() -> dcc.Upload:
+def get_upload_component() -> html.Div:
     """Create a dcc component that allows to upload a file.
 
     Returns:
-        dcc.Upload: The created upload component.
+        html.Div: The created upload component, the button and progress bar for chunked uploads of large files, the option to append the
+            uploaded rows to existing tables, the progress of the running ingest and the upload errors.
     """
-    return dcc.Upload(
+    upload = dcc.Upload(
         id="upload-plot",
         children=html.Div(["Drag and Drop or ", html.A("Select Files")]),
         style={
@@ -71,3 +71,38 @@ def get_upload_component() -> dcc.Upload:
         },
         multiple=True,
     )
+    chunked_upload = html.Div(
+        [
+            dbc.Button("Upload large files", id="chunked-upload-button"),
+            dbc.Progress(value=0, id="chunked-upload-progress", style={"margin": "10px"}),
+            dcc.Store(id="chunked-upload-finished"),
+        ]
+    )
+    return html.Div(
+        [
+            upload,
+            chunked_upload,
+            dbc.Checkbox(label="Append rows to existing tables", value=False, id="upload-append"),
+            html.Div(
+                dbc.Row(
+                    [
+                        dbc.Col(dbc.Input(placeholder="Store only columns (e.g. age, type)", type="text", id="upload-include-columns"), width=4),
+                        dbc.Col(dbc.Input(placeholder="Skip columns (e.g. comment)", type="text", id="upload-exclude-columns"), width=4),
+                        dbc.Col(dbc.Input(placeholder="Store only rows (e.g. age < 20)", type="text", id="upload-row-filter"), width=4),
+                    ]
+                ),
+                style={"margin": "10px"},
+            ),
+            html.Div(
+                dbc.Row(
+                    [
+                        dbc.Col(dbc.Progress(value=0, id="ingest-progress"), width=10),
+                        dbc.Col(dbc.Button("Cancel", id="ingest-cancel", disabled=True, style={"width": "100%"}), width=2),
+                    ]
+                ),
+                style={"margin": "10px"},
+            ),
+            dcc.Store(id="ingest-job"),
+            html.Div(children=[], id="upload-status"),
+        ]
+    )
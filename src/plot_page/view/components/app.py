@@ -1,9 +1,125 @@
 """App components that need to be used by all pages."""
 
+import os
+from urllib.parse import quote
+
 import dash_bootstrap_components as dbc
-from dash import Dash
+import diskcache
+from dash import Dash, DiskcacheManager
+from flask import Response, jsonify, request
+
+from plot_page.control.data_operation.chunked_upload import (
+    CHUNK_MAX_BYTES,
+    UPLOAD_MAX_BYTES,
+    create_upload,
+    received_bytes,
+    upload_exists,
+    write_chunk,
+)
+from plot_page.control.data_operation.export_data import EXPORT_FORMATS, export_dataset
+from plot_page.data.panda_data import check_dataset_name, read_catalog
+
+JOB_DIRECTORY = os.path.join(".", "Jobs")
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+background_callback_manager = DiskcacheManager(diskcache.Cache(JOB_DIRECTORY))
+app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], background_callback_manager=background_callback_manager)
 app.title = "Analyse Dash App"
 app.config.suppress_callback_exceptions = True
 server = app.server
+
+
+#####################################################################################################################################################
+@server.route("/upload_chunks", methods=["POST"])
+def upload_chunks_create() -> Response:
+    """Create a chunked upload for a file with the size given as json body, e.g. {"size": 1024}.
+
+    Returns:
+        Response: Json with the random id of the upload, status 413 if the file is too large.
+    """
+    size = (request.get_json(silent=True) or {}).get("size")
+    if not isinstance(size, int):
+        return jsonify(error="The size of the file is missing"), 400
+    try:
+        return jsonify(upload_id=create_upload(size))
+    except ValueError as error:
+        return jsonify(error=str(error)), 413
+
+
+#####################################################################################################################################################
+@server.route("/upload_chunks/<upload_id>", methods=["GET"])
+def upload_chunks_state(upload_id: str) -> Response:
+    """Get the number of received bytes of a chunked upload, used to resume an upload.
+
+    Args:
+        upload_id (str): Id of the upload.
+
+    Returns:
+        Response: Json with the number of received bytes, status 404 if the upload does not exist.
+    """
+    try:
+        if not upload_exists(upload_id):
+            return jsonify(error=f"Unknown upload {upload_id}"), 404
+        return jsonify(received=received_bytes(upload_id))
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+
+
+#####################################################################################################################################################
+@server.route("/upload_chunks/<upload_id>", methods=["POST"])
+def upload_chunks_write(upload_id: str) -> Response:
+    """Write the request body as chunk of an upload at the offset given as query parameter.
+
+    Args:
+        upload_id (str): Id of the upload.
+
+    Returns:
+        Response: Json with the number of received bytes, status 404 if the upload does not exist, 413 if the chunk or the upload is too
+            large and 409 if the offset does not match the received bytes.
+    """
+    try:
+        if not upload_exists(upload_id):
+            return jsonify(error=f"Unknown upload {upload_id}"), 404
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+    offset = request.args.get("offset", type=int)
+    if offset is None:
+        return jsonify(error="The offset of the chunk is missing"), 400
+    if request.content_length is None or request.content_length > CHUNK_MAX_BYTES:
+        return jsonify(error=f"A chunk has to be sent with its length and can contain at most {CHUNK_MAX_BYTES} bytes"), 413
+    chunk = request.get_data(cache=False)
+    if offset + len(chunk) > UPLOAD_MAX_BYTES:
+        return jsonify(error=f"The upload exceeds the maximum size of {UPLOAD_MAX_BYTES} bytes"), 413
+    try:
+        return jsonify(received=write_chunk(upload_id, offset, chunk))
+    except FileNotFoundError as error:
+        return jsonify(error=str(error)), 404
+    except ValueError as error:
+        return jsonify(error=str(error), received=received_bytes(upload_id)), 409
+
+
+#####################################################################################################################################################
+@server.route("/export/<name_dataset>", methods=["GET"])
+def export_table(name_dataset: str) -> Response:
+    """Stream a dataset as file, the format is given as query parameter "format" and every query as query parameter "query".
+
+    The file is written chunk by chunk while it is sent, so the memory usage does not depend on the size of the dataset.
+
+    Args:
+        name_dataset (str): Name of the dataset or view.
+
+    Returns:
+        Response: The file as attachment, status 404 if the dataset does not exist and 400 if the name, the format or a query is invalid.
+    """
+    try:
+        check_dataset_name(name_dataset)
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+    if name_dataset not in read_catalog():
+        return jsonify(error=f"Unknown dataset {name_dataset}"), 404
+    export_format = request.args.get("format", "csv")
+    try:
+        content = export_dataset(name_dataset, request.args.getlist("query"), export_format)
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+    file_name = quote(f"{name_dataset}.{export_format}")
+    return Response(content, mimetype=EXPORT_FORMATS[export_format], headers={"Content-Disposition": f"attachment; filename*=UTF-8''{file_name}"})
@@ -0,0 +1,126 @@
+// Upload of large files in chunks to the /upload_chunks route, see plot_page.control.data_operation.chunked_upload.
+// The server issues a random id for every upload. The id is kept in the session storage, so that an interrupted upload of the same file is
+// resumed at the number of bytes the server has received.
+
+const UPLOAD_URL = "/upload_chunks";
+const CHUNK_BYTES = 8 * 1024 * 1024;
+const MAX_RETRIES = 5;
+const RETRY_DELAY_MS = 500;
+
+function fileKey(file) {
+    return `chunked_upload:${file.size}:${file.lastModified}:${file.name}`;
+}
+
+async function createUpload(file) {
+    const response = await fetch(UPLOAD_URL, {
+        method: "POST",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify({size: file.size}),
+    });
+    const result = await response.json();
+    if (!response.ok) {
+        throw new Error(result.error);
+    }
+    window.sessionStorage.setItem(fileKey(file), result.upload_id);
+    return result.upload_id;
+}
+
+async function receivedBytes(id) {
+    const response = await fetch(`${UPLOAD_URL}/${id}`);
+    const result = await response.json();
+    if (!response.ok) {
+        throw new Error(result.error);
+    }
+    return result.received;
+}
+
+async function startUpload(file) {
+    const id = window.sessionStorage.getItem(fileKey(file));
+    if (id) {
+        try {
+            return {id: id, offset: await receivedBytes(id)};
+        } catch (error) {
+            // The upload has been ingested or removed, the file is uploaded again.
+        }
+    }
+    return {id: await createUpload(file), offset: 0};
+}
+
+async function sendFile(file, onProgress) {
+    let {id, offset} = await startUpload(file);
+    let failures = 0;
+    do {
+        try {
+            const response = await fetch(`${UPLOAD_URL}/${id}?offset=${offset}`, {
+                method: "POST",
+                body: file.slice(offset, offset + CHUNK_BYTES),
+            });
+            const result = await response.json();
+            if (response.status === 404 || response.status === 413) {
+                // The upload has been removed or is too large, sending the chunk again does not help.
+                window.sessionStorage.removeItem(fileKey(file));
+                throw Object.assign(new Error(result.error), {retry: false});
+            }
+            if (!response.ok && response.status !== 409) {
+                throw new Error(result.error);
+            }
+            offset = result.received;
+            failures = 0;
+        } catch (error) {
+            failures += 1;
+            if (error.retry === false || failures > MAX_RETRIES) {
+                throw error;
+            }
+            await new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS * 2 ** failures));
+            try {
+                offset = await receivedBytes(id);
+            } catch (stateError) {
+                // The connection is still down, the next chunk is sent again from the last known offset.
+            }
+        }
+        onProgress(offset);
+    } while (offset < file.size);
+    window.sessionStorage.removeItem(fileKey(file));
+    return {upload_id: id, filename: file.name};
+}
+
+async function sendFiles(files) {
+    const totalBytes = files.reduce((total, file) => total + file.size, 0) || 1;
+    let finishedBytes = 0;
+    const uploads = [];
+    const errors = [];
+    for (const file of files) {
+        try {
+            uploads.push(
+                await sendFile(file, (offset) => {
+                    const value = Math.floor((100 * (finishedBytes + offset)) / totalBytes);
+                    window.dash_clientside.set_props("chunked-upload-progress", {value: value, label: `${file.name} ${value}%`});
+                })
+            );
+        } catch (error) {
+            errors.push(`${file.name}: ${error.message}`);
+        }
+        finishedBytes += file.size;
+    }
+    const label = errors.length ? `Failed: ${errors.join(", ")}` : "Upload finished, storing the data";
+    window.dash_clientside.set_props("chunked-upload-progress", {value: 100, label: label});
+    if (uploads.length) {
+        window.dash_clientside.set_props("chunked-upload-finished", {data: uploads});
+    }
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    chunked_upload: {
+        select_files: function (n_clicks) {
+            if (!n_clicks) {
+                return window.dash_clientside.no_update;
+            }
+            const input = document.createElement("input");
+            input.type = "file";
+            input.multiple = true;
+            input.onchange = () => sendFiles(Array.from(input.files));
+            input.click();
+            return 0;
+        },
+    },
+});
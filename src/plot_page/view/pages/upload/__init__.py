@@ -1,16 +1,29 @@
 """Page to update and modify data.."""
 
+import math
+from urllib.parse import quote, urlencode
+
 import dash
 import dash_bootstrap_components as dbc
 from dash import Input, Output, State, dash_table, dcc, html
 
-from plot_page.control.data_operation.extract_information import query_table
+from plot_page.control.data_operation.extract_information import (
+    get_memory_records,
+    get_summary_records,
+    get_table_columns,
+    materialize_dependent_views,
+    query_page,
+    translate_table_filter,
+)
 from plot_page.control.visualisation.gui_control import upload_create_filtered_dataset
 from plot_page.data.panda_data import remove_dataframe
 from plot_page.view.components.app import app
 
 from plot_page.view.components import get_upload_component
 
+SUMMARY_COLUMNS = ["column", "dtype", "count", "nulls", "distinct", "min", "max", "mean", "std", "distribution"]
+TABLE_PAGE_SIZE = 20
+
 
 #####################################################################################################################################################
 def explanation_card() -> html.Div:
@@ -23,7 +36,14 @@ def explanation_card() -> html.Div:
         [
             html.H4("Data Manager", style={"text-align": "center"}),
             html.P("This page is used to upload data for analysis purposes. The uploaded data can be viewed in more detail in the table below."),
-            html.P("Currently only json-files are allowed with the structure {'table_names': list[dict[str, val]]}"),
+            html.P(
+                "Allowed are json-files with the structure {'table_names': list[dict[str, val]]} and csv-, ndjson- and parquet-files,"
+                " that are stored as a table with the name of the file."
+            ),
+            html.P(
+                "Large files can be reduced while they are uploaded: only the listed columns are stored, listed columns are skipped and only"
+                " the rows that fulfill the row filter are stored. The row filter uses the same syntax as the queries below."
+            ),
             html.H5("Upload Files", style={"text-align": "center"}),
             html.Div(get_upload_component(), style={"text-align": "center"}),
         ]
@@ -75,11 +95,71 @@ def create_table_card() -> dbc.Card:
                     [
                         dbc.Col(dbc.Input(placeholder="Save filtered dataset as", type="text", id="upload_save_name"), width=3),
                         dbc.Col(dbc.Button("Save dataset", id="upload_save_dataset"), width=2),
+                        dbc.Col(dbc.Checkbox(label="Save as view", value=False, id="upload_save_as_view"), width=2),
                     ]
                 ),
                 style={"padding": "20px"},
             ),
-            dash_table.DataTable(data=[], id="plot_table", page_size=20, export_format="csv"),
+            html.Div(
+                dbc.Row(
+                    [
+                        dbc.Col(html.P(id="upload_table_rows"), width=8),
+                        dbc.Col(dbc.Button("Export CSV", id="upload_export_csv", external_link=True, style={"width": "100%"}), width=2),
+                        dbc.Col(dbc.Button("Export Parquet", id="upload_export_parquet", external_link=True, style={"width": "100%"}), width=2),
+                    ]
+                ),
+                style={"padding": "0px 20px"},
+            ),
+            dash_table.DataTable(
+                data=[],
+                id="plot_table",
+                page_current=0,
+                page_size=TABLE_PAGE_SIZE,
+                page_action="custom",
+                sort_action="custom",
+                sort_mode="multi",
+                sort_by=[],
+                filter_action="custom",
+                filter_query="",
+            ),
+        ]
+    )
+
+
+#####################################################################################################################################################
+def create_summary_card() -> dbc.Card:
+    """Create a card that shows the summary statistics of the selected table.
+
+    Returns:
+        dbc.Card: The card with a table that has one row per column of the selected table.
+    """
+    return dbc.Card(
+        [
+            html.H2("Column Summary", style={"text-align": "center"}),
+            html.Div(children=[], id="upload_summary_info", style={"padding": "0px 20px"}),
+            dash_table.DataTable(
+                data=[],
+                columns=[{"name": val, "id": val} for val in SUMMARY_COLUMNS],
+                id="upload_summary_table",
+                page_size=20,
+                style_cell={"textAlign": "left", "maxWidth": "300px", "overflow": "hidden", "textOverflow": "ellipsis"},
+            ),
+        ]
+    )
+
+
+#####################################################################################################################################################
+def create_memory_card() -> dbc.Card:
+    """Create a card that shows how much of the memory budget every dataset uses.
+
+    Returns:
+        dbc.Card: The card with the total usage and a table with one row per dataset.
+    """
+    return dbc.Card(
+        [
+            html.H2("Memory Usage", style={"text-align": "center"}),
+            html.P(id="upload_memory_total", style={"text-align": "center"}),
+            dash_table.DataTable(data=[], id="upload_memory_table", page_size=10, sort_action="native"),
         ]
     )
 
@@ -98,6 +178,8 @@ def upload_layout() -> html.Div:
             html.H1("Analyse Page", style={"text-align": "center"}),
             html.Div(explanation_card(), style={"padding": "20px"}),
             html.Div(create_table_card(), style={"padding": "20px"}),
+            html.Div(create_summary_card(), style={"padding": "20px"}),
+            html.Div(create_memory_card(), style={"padding": "20px"}),
         ]
     )
 
@@ -111,7 +193,7 @@ def upload_layout() -> html.Div:
     prevent_initial_call=True,
 )
 def upload_remove_selected_table(n_clicks: int, selected_table: str | None, table_data: dict[str, list]) -> dict[str, list]:
-    """Remove a stored dataframe.
+    """Remove a stored dataframe, views on the dataframe are materialized before.
 
     Args:
         n_clicks (int): Remove clicke event.
@@ -123,6 +205,7 @@ def upload_remove_selected_table(n_clicks: int, selected_table: str | None, tabl
     """
     if n_clicks is None or selected_table is None:
         return dash.no_update
+    materialize_dependent_views(selected_table)
     remove_dataframe(selected_table)
     if selected_table in table_data:
         table_data.pop(selected_table)
@@ -131,17 +214,25 @@ def upload_remove_selected_table(n_clicks: int, selected_table: str | None, tabl
 
 ####################################################################################################################################################
 @app.callback(
-    Output("table_data", "data"),
+    Output("table_data", "data", allow_duplicate=True),
     Output("upload_save_name", "value"),
+    Output("upload-status", "children", allow_duplicate=True),
     Input("upload_save_dataset", "n_clicks"),
     State("upload_selected_table", "value"),
     State("upload_save_name", "value"),
     State("upload_query_list", "data"),
     State("table_data", "data"),
+    State("upload_save_as_view", "value"),
+    prevent_initial_call=True,
 )
 def upload_save_filtered_dataset(
-    n_clicks: int | None, selected_table: str | None, table_name: str | None, query_list: list[str], table_data: dict[str, list]
-) -> tuple[dict[str, list], str]:
+    n_clicks: int | None,
+    selected_table: str | None,
+    table_name: str | None,
+    query_list: list[str],
+    table_data: dict[str, list],
+    save_as_view: bool | None,
+) -> tuple[dict[str, list], str, list]:
     """Save the modified dataset.
 
     Args:
@@ -150,27 +241,160 @@ def upload_save_filtered_dataset(
         table_name (str | None): The name for the new dataset.
         query_list (list[str]): List of queries that where executed on the dataset.
         table_data (dict[str, list]): The existing dict of dataset.
+        save_as_view (bool | None): Store only the queries instead of the filtered data.
 
     Returns:
-        tuple[dict[str, list], str]: The updated dictionary of dataset and default value for input component.
+        tuple[dict[str, list], str, list]: The updated dictionary of dataset, default value for input component and the error message.
     """
-    res, res_string = upload_create_filtered_dataset(n_clicks, selected_table, table_name, query_list, table_data)
-    return res if res else dash.no_update
+    try:
+        res, res_string = upload_create_filtered_dataset(n_clicks, selected_table, table_name, query_list, table_data, bool(save_as_view))
+    except ValueError as error:
+        return dash.no_update, dash.no_update, [html.P(str(error))]
+    return (res, res_string, []) if res else (dash.no_update, dash.no_update, dash.no_update)
 
 
 ####################################################################################################################################################
-@app.callback(Output("plot_table", "data"), Input("upload_selected_table", "value"), Input("upload_query_list", "data"))
-def upload_update_plot(selected_table: str | None, query_list: list[str]) -> list[dict]:
-    """Update data that should be shown.
+@app.callback(
+    Output("plot_table", "columns"),
+    Output("plot_table", "filter_query"),
+    Output("plot_table", "sort_by"),
+    Input("upload_selected_table", "value"),
+)
+def upload_update_table_columns(selected_table: str | None) -> tuple[list[dict], str, list]:
+    """Show the columns of the selected table and reset the filters and the sorting of the previous table.
+
+    Args:
+        selected_table (str | None): The current selected table.
+
+    Returns:
+        tuple[list[dict], str, list]: The columns of the table, an empty filter expression and no sorting.
+    """
+    return (get_table_columns(selected_table) if selected_table else []), "", []
+
+
+####################################################################################################################################################
+@app.callback(
+    Output("plot_table", "data"),
+    Output("plot_table", "page_count"),
+    Output("plot_table", "page_current"),
+    Output("upload_table_rows", "children"),
+    Output("upload-status", "children", allow_duplicate=True),
+    Input("upload_selected_table", "value"),
+    Input("upload_query_list", "data"),
+    Input("plot_table", "page_current"),
+    Input("plot_table", "sort_by"),
+    Input("plot_table", "filter_query"),
+    State("plot_table", "page_size"),
+    prevent_initial_call=True,
+)
+def upload_update_plot(
+    selected_table: str | None, query_list: list[str], page_current: int | None, sort_by: list[dict] | None, filter_query: str | None, page_size: int
+) -> tuple[list[dict], int, int, str, list]:
+    """Update the page of data that should be shown.
+
+    Only the rows of the current page are sent to the browser. The column filters of the table are applied as additional queries. The
+    first page is shown whenever the table, the queries, the filters or the sorting change.
 
     Args:
         selected_table (str | None): The current selected table.
         query_list (list[str]): List of all queries that should be applied on the selected table.
+        page_current (int | None): The page that should be shown.
+        sort_by (list[dict] | None): The sort columns and directions of the table.
+        filter_query (str | None): The filter expression of the column filters.
+        page_size (int): Number of rows per page.
+
+    Returns:
+        tuple[list[dict], int, int, str, list]: Data records of the page, number of pages, the shown page, the number of selected rows and the
+            error message if the table can not be loaded.
+    """
+    if not selected_table:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    page = (page_current or 0) if list(dash.ctx.triggered_prop_ids) == ["plot_table.page_current"] else 0
+    try:
+        page_data, rows = query_page(selected_table, query_list + translate_table_filter(filter_query), page, page_size, sort_by)
+    except ValueError as error:
+        return [], 1, 0, "", [html.P(str(error))]
+    page_current = dash.no_update if page == page_current else page
+    return page_data.to_dict("records"), max(math.ceil(rows / page_size), 1), page_current, f"{rows} rows", dash.no_update
+
+
+####################################################################################################################################################
+@app.callback(
+    Output("upload_export_csv", "href"),
+    Output("upload_export_parquet", "href"),
+    Output("upload_export_csv", "disabled"),
+    Output("upload_export_parquet", "disabled"),
+    Input("upload_selected_table", "value"),
+    Input("upload_query_list", "data"),
+    Input("plot_table", "filter_query"),
+)
+def upload_update_export_links(
+    selected_table: str | None, query_list: list[str] | None, filter_query: str | None
+) -> tuple[str | None, str | None, bool, bool]:
+    """Link the export buttons to the export of the selected table with the queries and the column filters of the table.
+
+    The file is written by the server, see export_table, so the whole filtered table is exported and not only the shown page.
+
+    Args:
+        selected_table (str | None): The current selected table.
+        query_list (list[str] | None): List of all queries that are applied on the selected table.
+        filter_query (str | None): The filter expression of the column filters.
+
+    Returns:
+        tuple[str | None, str | None, bool, bool]: The links of the csv- and the parquet-export and whether the buttons are disabled.
+    """
+    try:
+        queries = (query_list or []) + translate_table_filter(filter_query)
+    except ValueError:
+        queries = None
+    if not selected_table or queries is None:
+        return None, None, True, True
+    links = [
+        f"/export/{quote(selected_table, safe='')}?{urlencode([('format', val)] + [('query', query) for query in queries])}"
+        for val in ["csv", "parquet"]
+    ]
+    return links[0], links[1], False, False
+
+
+####################################################################################################################################################
+@app.callback(
+    Output("upload_summary_table", "data"),
+    Output("upload_summary_info", "children"),
+    Input("upload_selected_table", "value"),
+    Input("table_data", "data"),
+)
+def upload_update_summary(selected_table: str | None, table_data: dict[str, list] | None) -> tuple[list[dict], list]:
+    """Show the summary statistics of the selected table, they are read from the store without loading the data.
+
+    Args:
+        selected_table (str | None): The current selected table.
+        table_data (dict[str, list] | None): The current Information about the datasets, the summary is updated when data is appended.
+
+    Returns:
+        tuple[list[dict], list]: One row per column of the table and a message if no summary is available.
+    """
+    if not selected_table or not table_data or selected_table not in table_data:
+        return [], []
+    records = get_summary_records(selected_table)
+    return records, [] if records else [html.P("No summary is available for views, the statistics are shown for the underlying table.")]
+
+
+####################################################################################################################################################
+@app.callback(
+    Output("upload_memory_table", "data"),
+    Output("upload_memory_total", "children"),
+    Input("table_data", "data"),
+)
+def upload_update_memory(table_data: dict[str, list] | None) -> tuple[list[dict], str]:
+    """Show the memory usage of the stored datasets, it is updated whenever datasets are added or removed.
+
+    Args:
+        table_data (dict[str, list] | None): The current Information about the datasets.
 
     Returns:
-        list[dict]: List of data records that should be shown.
+        tuple[list[dict], str]: One row per dataset and the total usage of the memory budget.
     """
-    return query_table(selected_table, query_list).to_dict("records") if selected_table else dash.no_update
+    return get_memory_records()
 
 
 ####################################################################################################################################################
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from plot_page.control.data_operation.compiled_query import compile_queries
+from plot_page.control.data_operation.modify_data import compact_dtypes
+
+
+#####################################################################################################################################################
+def test_arithmetic_on_downcasted_column():
+    iteration = np.tile(np.arange(100, dtype=np.int64), 4)
+    data, _ = compact_dtypes(pd.DataFrame({"iteration": iteration}))
+    assert data["iteration"].dtype == np.int8
+
+    mask = compile_queries(("iteration*10 > 200",)).evaluate(data)
+
+    assert mask.tolist() == (iteration * 10 > 200).tolist()
+    assert mask.sum() == 316
+    assert data["iteration"].dtype == np.int8
+
+
+#####################################################################################################################################################
+def test_arithmetic_on_downcasted_nullable_column():
+    data = pd.DataFrame({"iteration": pd.array([100, None, 120], dtype="Int8")})
+
+    mask = compile_queries(("iteration * 2 >= 200",)).evaluate(data)
+
+    assert mask.tolist() == [True, False, True]